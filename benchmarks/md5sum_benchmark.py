@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reports the throughput in GB/s of the local file hashing in ``igvf_utils.utils``, comparing the
+former 64 KiB read loop with ``md5sum_local_file()`` at various buffer sizes, with and without
+mmap. Either pass a file to hash with --file, or a temporary file of --size GB is created.
+A freshly written temporary file is likely to be in the page cache, so it measures hashing
+rather than disk throughput; pass a file on the storage of interest to measure the latter.
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from igvf_utils import utils
+
+
+def md5sum_64k_loop(file_path):
+    """The original implementation of ``igvf_utils.utils.calculate_md5sum()`` for local files."""
+    m = hashlib.md5()
+    with open(file_path, "rb") as fh:
+        while True:
+            chunk = fh.read(2**16)
+            if not chunk:
+                break
+            m.update(chunk)
+    return m.hexdigest()
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--file", help="The file to hash.")
+    parser.add_argument("--size", type=float, default=1, help="""
+    The size in GB of the temporary file to hash when --file isn't given.""")
+    parser.add_argument("--buffer-sizes", default="8,16,64", help="""
+    Comma-separated buffer sizes in MiB to benchmark md5sum_local_file() with.""")
+    return parser
+
+
+def bench(label, func, file_path, file_size):
+    start = time.perf_counter()
+    md5sum = func(file_path)
+    elapsed = time.perf_counter() - start
+    print("{:<28} {:>8.2f} GB/s  {}".format(label, file_size / elapsed / 1e9, md5sum))
+
+
+def main():
+    args = get_parser().parse_args()
+    tmp_path = None
+    file_path = args.file
+    if not file_path:
+        fd, tmp_path = tempfile.mkstemp(prefix="iu_md5_bench_")
+        with os.fdopen(fd, "wb") as fh:
+            block = os.urandom(2**20)
+            for _ in range(int(args.size * 1e9) // len(block)):
+                fh.write(block)
+        file_path = tmp_path
+    try:
+        file_size = os.path.getsize(file_path)
+        print("Hashing {} ({:.2f} GB)".format(file_path, file_size / 1e9))
+        bench("64 KiB read loop", md5sum_64k_loop, file_path, file_size)
+        for mib in [int(x) for x in args.buffer_sizes.split(",")]:
+            buffer_size = mib * 2**20
+            bench("readinto, {} MiB buffer".format(mib),
+                  lambda p: utils.md5sum_local_file(p, buffer_size=buffer_size),
+                  file_path, file_size)
+            bench("mmap, {} MiB slices".format(mib),
+                  lambda p: utils.md5sum_local_file(p, buffer_size=buffer_size, use_mmap=True),
+                  file_path, file_size)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,8 @@ and the `attachment` object will be constructed for you.
 """
 
 import argparse
+import collections
+import concurrent.futures
 import json
 import os
 import re
@@ -40,6 +42,7 @@ import sys
 import requests
 from packaging.version import Version
 
+import igvf_utils as iu
 import igvf_utils.utils as iuu
 import igvf_utils.connection as iuc
 from igvf_utils.parent_argparser import igvf_login_parser
@@ -57,6 +60,29 @@ if v < (3, 3):
 #: It is used when patching objects to indicate the identifier of the record to patch.
 RECORD_ID_FIELD = "record_id"
 
+#: Status of a row that was successfully submitted, see :func:`submit_payloads`.
+SUCCESS = "success"
+#: Status of a row whose POST conflicted with an existing record, see :func:`submit_payloads`.
+CONFLICT = "conflict"
+#: Status of a row that failed to be submitted, see :func:`submit_payloads`.
+FAILED = "failed"
+#: Status of a row that wasn't submitted because the submission journal records it as already
+#: submitted, see :func:`journal_submissions`.
+SKIPPED = "skipped"
+#: Status of a row that wasn't POSTed because a record with one of its aliases or its md5sum
+#: already exists on the Portal, see :func:`skip_existing_records`.
+EXISTS = "exists"
+#: Status recorded in the submission journal for a row whose File record was POSTed while the
+#: upload of its file is still queued, see :func:`journal_submissions`. It's replaced by
+#: :data:`SUCCESS` once the upload succeeds.
+UPLOAD_PENDING = "upload_pending"
+
+#: The outcome of submitting a single input row, as returned by :func:`submit_payloads`. `row` is
+#: the 1-based position of the payload in the input, `status` one of :data:`SUCCESS`,
+#: :data:`CONFLICT`, :data:`FAILED`, :data:`SKIPPED` or :data:`EXISTS`, `record_id` the identifier
+#: of the record on the Portal (if any), and `error` the error message of a failed row.
+RowResult = collections.namedtuple("RowResult", ["row", "status", "record_id", "error"])
+
 
 def get_parser():
     parser = argparse.ArgumentParser(
@@ -161,6 +187,47 @@ def get_parser():
 
     parser.add_argument("--backoff", type=int, default=2, help="""
     Backoff multiplier, by default will double the delay each retry.""")
+
+    parser.add_argument("--workers", type=int, default=1, help="""
+    Number of rows to submit concurrently. The default of 1 submits one row at a time. Either way,
+    a failing row doesn't stop the others from being submitted, a summary of the successful,
+    conflicting and failed rows is reported at the end, and the exit status is non-zero if any row
+    failed.""")
+
+    parser.add_argument("--resume", action="store_true", help="""
+    Skip the rows that an earlier run already submitted, without contacting the Portal. Each row
+    submitted successfully (or found to exist already) is recorded in a submission journal in the
+    IU_Logs directory, keyed by a hash of the row's content and of whether it was POSTed or
+    PATCHed; rows that were modified since are submitted again. With --upload-workers, a File row
+    is only recorded as done once its file is uploaded, and the uploads that didn't finish are
+    retried.""")
+
+    parser.add_argument("--check-existing", action="store_true", help="""
+    When POSTing, look up the aliases and md5sums of all rows on the Portal in bulk before
+    submitting any row, and skip the rows for which a record already exists, instead of attempting
+    to POST them and getting a conflict. The lookup only uses the search endpoint, so it costs one
+    request per batch of rows; records that aren't indexed yet, i.e. ones POSTed moments ago,
+    aren't found by it and are handled by the usual conflict check of the POST. This reads the
+    whole input file into memory first.""")
+
+    parser.add_argument("--diff-existing", action="store_true", help="""
+    Only has meaning in combination with the --check-existing option. Logs the properties of each
+    skipped row whose values differ from those of the existing record. Link properties aren't
+    compared.""")
+
+    parser.add_argument("--hash-workers", type=int, default=0, help="""
+    When POSTing file objects, calculate the md5sums of all the files in the input concurrently
+    with this many threads before submitting any rows, rather than one file at a time as each row is
+    submitted. This reads the whole input file into memory first.""")
+
+    parser.add_argument("--upload-workers", type=int, default=0, help="""
+    Number of files to upload concurrently in the background when POSTing file objects. By default,
+    each file is uploaded right after its record is POSTed, before moving on to the next row.
+    Failed uploads are reported once all rows are submitted and all uploads have completed.""")
+
+    parser.add_argument("--max-upload-bandwidth", type=float, help="""
+    The maximum upload rate in MiB per second, shared by all the uploads when --upload-workers is
+    set. Defaults to no limit.""")
     return parser
 
 ##decorator for preventing time out##
@@ -197,6 +264,433 @@ def retry(tries=1, delay=5, backoff=2):
 
     return deco_retry 
 
+def _submit_row(submit, row, payload):
+    """
+    Submits a single payload for :func:`submit_payloads`, capturing any error.
+
+    Returns:
+        `RowResult`.
+    """
+    try:
+        record, status_code = submit(payload)
+    except Exception as e:
+        return RowResult(row=row, status=FAILED, record_id="", error=str(e))
+    if status_code in (SKIPPED, EXISTS):
+        return RowResult(row=row, status=status_code, record_id=record, error="")
+    status = SUCCESS
+    if status_code == requests.codes.CONFLICT:
+        status = CONFLICT
+    record_id = iuu.get_record_id(record) if record else ""
+    return RowResult(row=row, status=status, record_id=record_id, error="")
+
+
+def submit_payloads(payloads, submit, workers=1):
+    """
+    Submits payloads concurrently with a pool of threads. At most `workers` payloads are being
+    submitted at any time, and only a bounded number of payloads are read ahead from `payloads`,
+    so that it can be a generator over a large input file. An error in one payload doesn't
+    prevent the other payloads from being submitted.
+
+    Args:
+        payloads: iterable of `dict`. The payloads to submit, i.e. as generated by
+            :func:`create_payloads`.
+        submit: callable. Called with each payload, and must return a two-item tuple of the
+            JSON response of the Portal and the HTTP status code of the submission (which may be
+            `None` when unknown). For a row that was skipped, it returns the record identifier
+            and :data:`SKIPPED` or :data:`EXISTS` instead; see :func:`journal_submissions` and
+            :func:`skip_existing_records`.
+        workers: `int`. The number of payloads to submit concurrently.
+
+    Returns:
+        `list` of :data:`RowResult`, one per payload, in the same order as `payloads`.
+    """
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for row, payload in enumerate(payloads, start=1):
+            pending.append(executor.submit(_submit_row, submit, row, payload))
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    return results
+
+
+def journal_submissions(submit, journal, method, resume=False, conn=None):
+    """
+    Wraps a submit function, as taken by :func:`submit_payloads`, so that each row it submits is
+    recorded in a submission journal.
+
+    When the files of File records are uploaded in the background through ``conn.upload_queue``,
+    a POSTed File record is journaled as :data:`UPLOAD_PENDING` until its upload succeeds. On a
+    resumed run, the upload of such a row is retried rather than the row skipped outright.
+
+    Args:
+        submit: callable. See :func:`submit_payloads`.
+        journal: `igvf_utils.utils.SubmissionJournal`.
+        method: `str`. The method the rows are submitted with, i.e. 'post', which is part of the
+            key of each row in the journal.
+        resume: `bool`. True means that rows recorded in the journal aren't submitted again;
+            the wrapped function returns their record identifier and :data:`SKIPPED` instead.
+        conn: `igvf_utils.connection.Connection` instance that `submit` submits through. Needed
+            to track the uploads queued in ``conn.upload_queue`` and to retry pending uploads.
+
+    Returns:
+        callable: The wrapped submit function.
+    """
+    def track_upload(row_key, profile, record_id):
+        upload_queue = conn.upload_queue if conn is not None else None
+        future = upload_queue.get_future(record_id) if upload_queue is not None else None
+        if future is None:
+            journal.record(row_key, profile, record_id, SUCCESS)
+            return
+        journal.record(row_key, profile, record_id, UPLOAD_PENDING)
+
+        def on_done(f):
+            if not f.result().error:
+                journal.record(row_key, profile, record_id, SUCCESS)
+
+        # Runs right away if the upload already finished.
+        future.add_done_callback(on_done)
+
+    def journaled_submit(payload):
+        row_key = journal.row_key(payload, method)
+        if resume:
+            entry = journal.get(row_key)
+            if entry and entry[1] == UPLOAD_PENDING and conn is not None:
+                profile = payload.get(iuc.Connection.PROFILE_KEY, "")
+                conn.after_submit_file_cloud_upload(entry[0], profile)
+                track_upload(row_key, profile, entry[0])
+                return entry[0], SKIPPED
+            if entry:
+                return entry[0], SKIPPED
+        profile = payload.get(iuc.Connection.PROFILE_KEY, "")
+        record, status_code = submit(payload)
+        if status_code == EXISTS:
+            journal.record(row_key, profile, record, EXISTS)
+        # Nothing is returned in dry-run mode.
+        elif record:
+            record_id = iuu.get_record_id(record)
+            if status_code == requests.codes.CONFLICT:
+                journal.record(row_key, profile, record_id, CONFLICT)
+            else:
+                track_upload(row_key, profile, record_id)
+        return record, status_code
+
+    return journaled_submit
+
+
+def get_payload_identifiers(payload):
+    """
+    Returns:
+        `list`: The aliases of the payload, followed by its md5sum if it has one.
+    """
+    identifiers = list(payload.get(iu.ALIAS_PROP_NAME, []))
+    md5sum = payload.get(Profiles.MD5SUM_NAME_PROP_NAME)
+    if md5sum:
+        identifiers.append(md5sum)
+    return identifiers
+
+
+def find_existing_records(conn, payloads):
+    """
+    Looks up the aliases and md5sums of the payloads on the Portal in bulk with
+    ``igvf_utils.connection.Connection.get_many()``, through search only. Records that aren't
+    indexed yet aren't found, and are left to the conflict check of the POST rather than looked
+    up one by one.
+
+    Args:
+        conn: `igvf_utils.connection.Connection` instance.
+        payloads: `list` of `dict`. The payloads to POST.
+
+    Returns:
+        `dict`: Each key is an alias or md5sum of a payload, and each value the record that has it
+        on the Portal, in the object frame. Identifiers without a record are left out.
+    """
+    identifiers = []
+    for payload in payloads:
+        identifiers.extend(get_payload_identifiers(payload))
+    records = conn.get_many(
+        list(collections.OrderedDict.fromkeys(identifiers)), frame="object", fallback=False)
+    return {identifier: rec for identifier, rec in records.items() if rec}
+
+
+def diff_existing_record(payload, record, schema):
+    """
+    Compares a payload to the existing record that it would have POSTed.
+
+    Args:
+        payload: `dict`. The payload.
+        record: `dict`. The existing record, in the object frame.
+        schema: `IgvfSchema`. The schema of the payload.
+
+    Returns:
+        `dict`: Each key is a property of the payload whose value differs from that of the record,
+        and each value a two-item tuple of the value in the payload and the value in the record
+        (`None` if the record doesn't have the property). Link properties, whose values are
+        identifiers of other records in different forms, aren't compared, and neither is the order
+        of array values.
+    """
+    def normalize(value):
+        if isinstance(value, list):
+            return sorted(json.dumps(v, sort_keys=True) for v in value)
+        return value
+
+    diff = {}
+    for prop_name, value in payload.items():
+        if prop_name not in schema.property_names or prop_name in schema.link_property_names:
+            continue
+        existing = record.get(prop_name)
+        if normalize(value) != normalize(existing):
+            diff[prop_name] = (value, existing)
+    return diff
+
+
+def skip_existing_records(conn, submit, existing, schema=None):
+    """
+    Wraps a submit function, as taken by :func:`submit_payloads`, so that rows for which a
+    record already exists, as found by :func:`find_existing_records`, aren't POSTed.
+
+    Args:
+        conn: `igvf_utils.connection.Connection` instance.
+        submit: callable. See :func:`submit_payloads`.
+        existing: `dict`. The existing records returned by :func:`find_existing_records`.
+        schema: `IgvfSchema`. If set, the differences between each skipped row and its existing
+            record are logged; see :func:`diff_existing_record`.
+
+    Returns:
+        callable: The wrapped submit function, which returns the identifier of the existing
+        record and :data:`EXISTS` for a skipped row.
+    """
+    def submit_new(payload):
+        for identifier in get_payload_identifiers(payload):
+            record = existing.get(identifier)
+            if not record:
+                continue
+            record_id = iuu.get_record_id(record)
+            if schema is not None:
+                for prop_name, (value, existing_value) in diff_existing_record(
+                        payload, record, schema).items():
+                    conn.debug_logger.debug("{} differs from existing record {}: {!r} != {!r}".format(
+                        prop_name, record_id, value, existing_value))
+            return record_id, EXISTS
+        return submit(payload)
+
+    return submit_new
+
+
+def get_link_references(payload, schema):
+    """
+    Returns:
+        `set`: The string values of the link properties of the payload (see
+        ``igvf_utils.profiles.IgvfSchema.link_property_names``), i.e. the aliases, accessions or
+        other identifiers of the records that it references.
+    """
+    refs = set()
+    for prop_name in schema.link_property_names:
+        value = payload.get(prop_name)
+        if value is None:
+            continue
+        values = value if isinstance(value, list) else [value]
+        refs.update(v for v in values if isinstance(v, str))
+    return refs
+
+
+def plan_submission(payloads, schemas):
+    """
+    Orders payloads of several profiles for submission, based on the references between them.
+    A payload depends on another payload when one of its link properties references an alias of
+    the other payload, i.e. a library payload whose `samples` property lists the alias of a
+    biosample payload in the same submission. The payloads are grouped into levels, such that the
+    payloads of a level only depend on payloads of earlier levels and can thus be submitted
+    concurrently.
+
+    Args:
+        payloads: `list` of `dict`. The payloads to submit, each with the
+            ``igvf_utils.connection.Connection.PROFILE_KEY`` key set.
+        schemas: `dict`. Each key is a profile name, and each value its
+            ``igvf_utils.profiles.IgvfSchema``.
+
+    Returns:
+        `tuple`: Two items, the `list` of levels, each a `list` of indices into `payloads`, and a
+        `dict` mapping the index of each payload to the `set` of indices of the payloads that it
+        depends on.
+
+    Raises:
+        ValueError: An alias is set on more than one payload, or the payloads reference each other
+            in a cycle.
+    """
+    alias_index = {}
+    for index, payload in enumerate(payloads):
+        for alias in payload.get(iu.ALIAS_PROP_NAME, []):
+            if alias in alias_index and alias_index[alias] != index:
+                raise ValueError("Alias '{}' is set on rows {} and {}.".format(
+                    alias, alias_index[alias] + 1, index + 1))
+            alias_index[alias] = index
+
+    dependencies = {}
+    dependents = {index: [] for index in range(len(payloads))}
+    for index, payload in enumerate(payloads):
+        schema = schemas[payload[iuc.Connection.PROFILE_KEY]]
+        dependencies[index] = {
+            alias_index[ref] for ref in get_link_references(payload, schema)
+            if ref in alias_index and alias_index[ref] != index
+        }
+        for dependency in dependencies[index]:
+            dependents[dependency].append(index)
+
+    levels = []
+    remaining = {index: len(deps) for index, deps in dependencies.items()}
+    level = [index for index, count in remaining.items() if count == 0]
+    while level:
+        levels.append(level)
+        next_level = []
+        for index in level:
+            for dependent in dependents[index]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_level.append(dependent)
+        level = sorted(next_level)
+    planned = sum(len(level) for level in levels)
+    if planned < len(payloads):
+        cycle_rows = sorted(index + 1 for index, count in remaining.items() if count > 0)
+        raise ValueError("Rows {} reference each other in a cycle.".format(cycle_rows))
+    return levels, dependencies
+
+
+def submit_planned_payloads(payloads, levels, dependencies, submit, workers=1):
+    """
+    Submits the payloads planned by :func:`plan_submission` one level at a time, the payloads
+    of each level concurrently with :func:`submit_payloads`. A payload that depends on a payload
+    that failed isn't submitted, and is reported as failed itself.
+
+    Args:
+        payloads: `list` of `dict`. The payloads to submit.
+        levels: `list`. The levels returned by :func:`plan_submission`.
+        dependencies: `dict`. The dependencies returned by :func:`plan_submission`.
+        submit: callable. See :func:`submit_payloads`.
+        workers: `int`. The number of payloads to submit concurrently.
+
+    Returns:
+        `list` of :data:`RowResult`, one per payload, in the same order as `payloads`.
+    """
+    results = [None] * len(payloads)
+    failed = set()
+    for level in levels:
+        ready = []
+        for index in level:
+            failed_dependencies = sorted(d + 1 for d in dependencies[index] if d in failed)
+            if failed_dependencies:
+                results[index] = RowResult(
+                    row=index + 1, status=FAILED, record_id="",
+                    error="Depends on failed rows {}.".format(failed_dependencies))
+                failed.add(index)
+            else:
+                ready.append(index)
+        level_results = submit_payloads((payloads[i] for i in ready), submit, workers=workers)
+        for index, result in zip(ready, level_results):
+            results[index] = result._replace(row=index + 1)
+            if result.status == FAILED:
+                failed.add(index)
+    return results
+
+
+def report_results(conn, results):
+    """
+    Logs a summary of the results of :func:`submit_payloads`, listing the rows that conflicted
+    with existing records and the rows that failed.
+
+    Args:
+        conn: `igvf_utils.connection.Connection` instance.
+        results: `list` of :data:`RowResult`.
+    """
+    counts = collections.Counter(r.status for r in results)
+    for result in results:
+        if result.status == SKIPPED:
+            conn.debug_logger.debug(
+                "Row {} was already submitted as {}.".format(result.row, result.record_id))
+        elif result.status == EXISTS:
+            conn.debug_logger.debug(
+                "Row {} already exists as {}; not POSTed.".format(result.row, result.record_id))
+        elif result.status == CONFLICT:
+            conn.debug_logger.debug(
+                "Row {} already exists as {}.".format(result.row, result.record_id))
+        elif result.status == FAILED:
+            conn.log_error("Row {} failed: {}".format(result.row, result.error))
+    conn.debug_logger.debug(
+        "Submitted {} rows: {} succeeded, {} conflicted, {} failed, {} skipped, {} existed.".format(
+            len(results), counts[SUCCESS], counts[CONFLICT], counts[FAILED], counts[SKIPPED],
+            counts[EXISTS]))
+
+
+def report_uploads(conn, upload_results):
+    """
+    Logs the outcome of the file uploads run through ``conn.upload_queue``.
+
+    Args:
+        conn: `igvf_utils.connection.Connection` instance.
+        upload_results: `list` of ``igvf_utils.upload_queue.UploadResult``.
+
+    Returns:
+        `bool`: `True` if all uploads succeeded.
+    """
+    failed = [r for r in upload_results if r.error]
+    for result in failed:
+        conn.log_error("Upload of the file for {} failed: {}".format(result.file_id, result.error))
+    conn.debug_logger.debug("Uploaded {} files: {} succeeded, {} failed.".format(
+        len(upload_results), len(upload_results) - len(failed), len(failed)))
+    return not failed
+
+
+def set_file_checksums(payloads, workers):
+    """
+    Sets the `md5sum` and `file_size` properties of the file payloads that don't have them yet,
+    by hashing their files, given by the `submitted_file_name` property, concurrently. This does
+    the work of ``igvf_utils.connection.Connection.before_post_file()`` for all payloads up
+    front.
+
+    Args:
+        payloads: `list` of `dict`. The payloads to submit.
+        workers: `int`. The maximum number of files hashed at the same time.
+
+    Returns:
+        `list`: `payloads`, modified in place.
+    """
+    md5_prop = Profiles.MD5SUM_NAME_PROP_NAME
+    size_prop = Profiles.FILE_SIZE_PROP_NAME
+    file_prop = Profiles.SUBMITTED_FILE_PROP_NAME
+    to_hash = [
+        p for p in payloads
+        if p.get(iuc.Connection.PROFILE_KEY) in Profiles.FILE_PROFILE_ID and p.get(file_prop)
+    ]
+    md5sums = iuu.calculate_md5sums(
+        [p[file_prop] for p in to_hash if not p.get(md5_prop)], workers=workers)
+    for payload in to_hash:
+        if not payload.get(md5_prop):
+            payload[md5_prop] = md5sums[payload[file_prop]]
+        if not payload.get(size_prop):
+            payload[size_prop] = iuu.calculate_file_size(payload[file_prop])
+    return payloads
+
+
+def set_patch_record_id(conn, payload):
+    """
+    Moves the value of the :data:`RECORD_ID_FIELD` field in the payload to the key
+    ``igvf_utils.connection.Connection.IGVFID_KEY``, which indicates the record to PATCH.
+
+    Raises:
+        ValueError: The payload doesn't have the :data:`RECORD_ID_FIELD` field set.
+    """
+    record_id = payload.get(RECORD_ID_FIELD, False)
+    if not record_id:
+        raise ValueError(
+            "Can't patch payload {} since there isn't a '{}' field indicating an identifier for the record to be PATCHED.".format(
+                iuu.print_format_dict(payload), RECORD_ID_FIELD))
+    payload.pop(RECORD_ID_FIELD)
+    payload.update({conn.IGVFID_KEY: record_id})
+    return payload
+
+
 def main():
     parser = get_parser()
     args = parser.parse_args()
@@ -204,6 +698,14 @@ def main():
         parser.error("No properties to remove were specified. Use --patch if only patching is needed.")
     if args.remove_property and not args.rm_patch:
         parser.error("Properties to remove were specified, but --rm-patch flag was not set.")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.max_upload_bandwidth and not args.upload_workers:
+        parser.error("--max-upload-bandwidth requires --upload-workers.")
+    if args.check_existing and (args.patch or args.rm_patch):
+        parser.error("--check-existing only applies when POSTing.")
+    if args.diff_existing and not args.check_existing:
+        parser.error("--diff-existing requires --check-existing.")
 
     profile_id = args.profile_id
     igvf_mode = args.igvf_mode
@@ -213,23 +715,30 @@ def main():
     tries = args.tries
     delay = args.delay
     backoff = args.backoff
+    workers = args.workers
 
     @retry(tries,delay,backoff)
     def do_connection(igvf_mode, dry_run):
-        conn = iuc.Connection(igvf_mode=igvf_mode, dry_run=dry_run)
+        conn = iuc.Connection(igvf_mode=igvf_mode, dry_run=dry_run,
+                              pool_maxsize=max(workers, iu.POOL_MAXSIZE))
         return conn
 
     @retry(tries,delay,backoff)
     def do_post(conn,payload,no_aliases,args):
-        conn.post(payload,require_aliases=not no_aliases,upload_file=not args.no_upload_file)
+        res = conn.post(payload,require_aliases=not no_aliases,upload_file=not args.no_upload_file,
+                        return_original_status_code=True)
+        if isinstance(res, tuple):
+            return res
+        # Dry-run mode, in which case there isn't a status code.
+        return res, None
 
     @retry(tries,delay,backoff)
     def do_remove_and_patch(conn,props_to_remove,payload,overwrite_array_values):
-        conn.remove_and_patch(props=props_to_remove, patch=payload, extend_array_values=not overwrite_array_values)
+        return conn.remove_and_patch(props=props_to_remove, patch=payload, extend_array_values=not overwrite_array_values)
 
     @retry(tries,delay,backoff)
     def do_patch(conn,payload,overwrite_array_values):
-        conn.patch(payload=payload, extend_array_values=not overwrite_array_values)
+        return conn.patch(payload=payload, extend_array_values=not overwrite_array_values)
 
     current_local_version = __version__
     repo_tags = 'https://api.github.com/repos/IGVF-DACC/igvf_utils/tags'
@@ -248,6 +757,11 @@ def main():
     conn = do_connection(igvf_mode, dry_run)
     # Put conn into submit mode:
     conn.set_submission(True)
+    if args.upload_workers:
+        max_bandwidth = None
+        if args.max_upload_bandwidth:
+            max_bandwidth = int(args.max_upload_bandwidth * 2**20)
+        conn.enable_upload_queue(workers=args.upload_workers, max_bandwidth=max_bandwidth)
 
     schema = conn.profiles.get_profile_from_id(profile_id)
     infile = args.infile
@@ -256,37 +770,48 @@ def main():
     if args.remove_property is not None:
         props_to_remove = args.remove_property.split(",")
 
+    def submit(payload):
+        try:
+            if not patch and not rmpatch:
+                return do_post(conn, payload, no_aliases, args)
+            payload = set_patch_record_id(conn, payload)
+            if rmpatch:
+                return do_remove_and_patch(conn, props_to_remove, payload, overwrite_array_values), None
+            return do_patch(conn, payload, overwrite_array_values), None
+        except json.decoder.JSONDecodeError:
+            raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
+
     gen = create_payloads(schema=schema, infile=infile)
-    for payload in gen:
-        if not patch and not rmpatch:
-            try:
-                do_post(conn, payload, no_aliases,args)
-            except json.decoder.JSONDecodeError:
-                raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
-        elif rmpatch:
-            record_id = payload.get(RECORD_ID_FIELD, False)
-            if not record_id:
-                raise ValueError(
-                    "Can't patch payload {} since there isn't a '{}' field indicating an identifier for the record to be PATCHED.".format(
-                        iuu.print_format_dict(payload), RECORD_ID_FIELD))
-            payload.pop(RECORD_ID_FIELD)
-            payload.update({conn.IGVFID_KEY: record_id})
-            try:
-                do_remove_and_patch(conn, props_to_remove, payload, overwrite_array_values)
-            except json.decoder.JSONDecodeError:
-                raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
-        elif patch:
-            record_id = payload.get(RECORD_ID_FIELD, False)
-            if not record_id:
-                raise ValueError(
-                    "Can't patch payload {} since there isn't a '{}' field indicating an identifier for the record to be PATCHED.".format(
-                        iuu.print_format_dict(payload), RECORD_ID_FIELD))
-            payload.pop(RECORD_ID_FIELD)
-            payload.update({conn.IGVFID_KEY: record_id})
-            try:
-                do_patch(conn, payload, overwrite_array_values)
-            except json.decoder.JSONDecodeError:
-                raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
+    if args.hash_workers and not patch and not rmpatch:
+        gen = set_file_checksums(list(gen), workers=args.hash_workers)
+    if args.check_existing:
+        gen = list(gen)
+        existing = find_existing_records(conn, gen)
+        submit = skip_existing_records(
+            conn, submit, existing, schema=schema if args.diff_existing else None)
+
+    if not dry_run:
+        # A row submitted with other options is a different submission.
+        method = "post"
+        if patch or rmpatch:
+            method = "rm-patch {}".format(args.remove_property) if rmpatch else "patch"
+            if overwrite_array_values:
+                method += " overwrite-array-values"
+        submit = journal_submissions(
+            submit, conn.get_submission_journal(), method, resume=args.resume, conn=conn)
+    elif args.resume:
+        conn.debug_logger.debug("Ignoring --resume in dry-run mode.")
+
+    failed = False
+    try:
+        results = submit_payloads(gen, submit, workers=workers)
+        report_results(conn, results)
+        failed = any(r.status == FAILED for r in results)
+    finally:
+        if conn.upload_queue is not None:
+            failed = not report_uploads(conn, conn.upload_queue.drain()) or failed
+    if failed:
+        sys.exit(1)
 
 
 def check_valid_json(prop, val, row_count):
@@ -382,7 +907,7 @@ def create_payloads_from_json(schema, payloads):
     """
     if isinstance(payloads, dict):
         payloads = [payloads]
-    schema_props = [prop.name for prop in schema.properties]
+    schema_props = schema.property_names
     for payload in payloads:
         for key in payload:
             if key not in schema_props:
@@ -403,7 +928,7 @@ def create_payloads_from_jsonl(schema, infile):
     Yields: dict. The payload that can be used to either register or patch the
     metadata for each row.
     """
-    schema_props = [prop.name for prop in schema.properties]
+    schema_props = schema.property_names
     fh = open(infile, 'r')
     for row in fh:
         payload = json.loads(row)
@@ -429,7 +954,7 @@ def create_payloads_from_tsv(schema, infile):
     STR_REGX = re.compile(r'\'|"')
     # Fetch the schema from the IGVF Portal so we can set attr values to the
     # right type when generating the payload (dict).
-    schema_props = [prop.name for prop in schema.properties]
+    schema_props = schema.property_names
     field_index = {}
     fh = open(infile, 'r')
     header_fields = fh.readline().strip("\n").split("\t")
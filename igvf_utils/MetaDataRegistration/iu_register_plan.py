@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+POSTs the records of several input files at once, each holding records of one of the profiles
+listed on the IGVF Portal, i.e. biosamples, the libraries made from them and the files sequenced
+from those. This takes the place of running ``iu_register.py`` on each input file in turn.
+
+The records are ordered by the references between them: a record whose link properties (such as
+the `samples` property of a library) reference the alias of another record in the input files is
+only submitted once that record has been submitted. Records that don't depend on each other are
+submitted concurrently, in levels: first all records that don't reference any other input record,
+then all records that only reference records of the first level, and so on. A record isn't
+submitted when a record that it references failed to be submitted.
+
+The input files have the same formats as those of ``iu_register.py``; see ``iu_register.py -h``.
+
+|
+"""
+
+import argparse
+import sys
+
+import igvf_utils as iu
+import igvf_utils.connection as iuc
+from igvf_utils.MetaDataRegistration import iu_register
+from igvf_utils.parent_argparser import igvf_login_parser
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        parents=[igvf_login_parser],
+        formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-i", "--input", nargs=2, action="append", required=True,
+                        metavar=("PROFILE_ID", "INFILE"), help="""
+    The ID of a profile, i.e. 'tissue' for https://sandbox.igvf.org/profiles/tissue.json, and the
+    JSON, JSONL or tab-delimited input file with records of that profile. Repeat this option for
+    each input file, in any order. Rows are numbered across the input files in the order given.""")
+
+    parser.add_argument("-d", "--dry-run", action="store_true", help="""
+    Set this option to enable the dry-run feature, such that no modifications are performed on the
+    IGVF Portal.""")
+
+    parser.add_argument("--no-aliases", action="store_true", help="""
+    Setting this option is NOT advised. See the option of the same name of iu_register.py.""")
+
+    parser.add_argument("--no-upload-file", action="store_true", help="""
+    Don't upload files when POSTing file objects.""")
+
+    parser.add_argument("--workers", type=int, default=4, help="""
+    Number of records to submit concurrently within a level. Defaults to 4.""")
+
+    parser.add_argument("--resume", action="store_true", help="""
+    Skip the rows that an earlier run already submitted, without contacting the Portal. See the
+    option of the same name of iu_register.py.""")
+
+    parser.add_argument("--tries", type=int, default=1, help="""
+    Number of times to try each POST before giving up.""")
+
+    parser.add_argument("--delay", type=int, default=5, help="""
+    Initial delay between retries in seconds.""")
+
+    parser.add_argument("--backoff", type=int, default=2, help="""
+    Backoff multiplier, by default will double the delay each retry.""")
+    return parser
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    workers = args.workers
+
+    conn = iuc.Connection(igvf_mode=args.igvf_mode, dry_run=args.dry_run,
+                          pool_maxsize=max(workers, iu.POOL_MAXSIZE))
+    # Put conn into submit mode:
+    conn.set_submission(True)
+
+    payloads = []
+    schemas = {}
+    for profile_id, infile in args.input:
+        schema = conn.profiles.get_profile_from_id(profile_id)
+        schemas[schema.name] = schema
+        payloads.extend(iu_register.create_payloads(schema=schema, infile=infile))
+
+    try:
+        levels, dependencies = iu_register.plan_submission(payloads, schemas)
+    except ValueError as e:
+        parser.error(str(e))
+    conn.debug_logger.debug("Planned the submission of {} rows in {} levels of {} rows.".format(
+        len(payloads), len(levels), ", ".join(str(len(level)) for level in levels)))
+
+    @iu_register.retry(args.tries, args.delay, args.backoff)
+    def submit(payload):
+        res = conn.post(payload, require_aliases=not args.no_aliases,
+                        upload_file=not args.no_upload_file, return_original_status_code=True)
+        if isinstance(res, tuple):
+            return res
+        # Dry-run mode, in which case there isn't a status code.
+        return res, None
+
+    if not args.dry_run:
+        submit = iu_register.journal_submissions(
+            submit, conn.get_submission_journal(), "post", resume=args.resume)
+
+    results = iu_register.submit_planned_payloads(
+        payloads, levels, dependencies, submit, workers=workers)
+    iu_register.report_results(conn, results)
+    if any(r.status == iu_register.FAILED for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
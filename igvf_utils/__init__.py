@@ -78,6 +78,22 @@ IGVF_MODES = {
 #: The timeout in seconds when making HTTP requests via the ``requests`` module.
 TIMEOUT = 60
 
+#: The default number of keep-alive connections that ``igvf_utils.connection.Connection`` keeps
+#: open to the Portal. Raise this when making many concurrent requests from a single connection.
+POOL_MAXSIZE = 10
+
+#: The directory in which downloaded Portal profiles (schemas) are cached, one file per Portal
+#: host. Set from the environment variable `IGVF_UTILS_CACHE_DIR` if present, otherwise defaults
+#: to `~/.cache/igvf_utils`.
+CACHE_DIR = os.environ.get(
+    "IGVF_UTILS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "igvf_utils")
+)
+
+#: bool. When the environment variable `IGVF_UTILS_OFFLINE` is set to a non-empty value, the
+#: cached profiles in ``CACHE_DIR`` are used as is, without checking the Portal for changes.
+OFFLINE = bool(os.environ.get("IGVF_UTILS_OFFLINE"))
+
 #: The name of the debug ``logging`` instance.
 DEBUG_LOGGER_NAME = "iu_debug"
 #: The name of the error ``logging`` instance created in ``igvf_utils.connection.Connection()``,
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+"""
+Contains the ``AsyncConnection`` class, an ``asyncio`` counterpart of
+``igvf_utils.connection.Connection`` for running many Portal requests concurrently from a single
+event loop::
+
+    import asyncio
+    from igvf_utils.async_connection import AsyncConnection
+
+    async def main(accessions):
+        async with AsyncConnection("sandbox", max_connections=50) as conn:
+            return await asyncio.gather(*[conn.get(i) for i in accessions])
+
+Requires the `httpx <https://www.python-httpx.org>`_ package, which is installed with the `async`
+extra, i.e. ``pip install igvf-utils[async]``.
+"""
+
+import asyncio
+import functools
+import json
+import os
+
+import requests
+
+import igvf_utils as iu
+from igvf_utils.connection import Connection
+import igvf_utils.utils as iuu
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncConnection:
+    """
+    Mirrors the ``get()``, ``search()``, ``post()``, ``patch()`` and ``download()`` methods of
+    ``igvf_utils.connection.Connection`` as coroutines. Requests are sent through a single
+    ``httpx.AsyncClient`` with a pool of at most `max_connections` keep-alive connections; when
+    more requests are awaited at once, they wait for a free connection.
+
+    Everything that doesn't involve a request to the Portal, i.e. the profiles, the logging and
+    the payload checks, is delegated to a wrapped ``igvf_utils.connection.Connection`` instance,
+    available as :attr:`conn`. Its before-submit and after-submit hooks keep working: they are
+    called through the coroutines :meth:`before_submit_hooks` and :meth:`after_submit_hooks`,
+    which run them in a worker thread, as the hooks may read files or upload them. Subclasses can
+    override these coroutines with native async hooks.
+
+    Args:
+        igvf_mode: See ``igvf_utils.connection.Connection``.
+        dry_run: See ``igvf_utils.connection.Connection``.
+        submission: See ``igvf_utils.connection.Connection``.
+        no_log_file: See ``igvf_utils.connection.Connection``.
+        max_connections: `int`. The maximum number of concurrent connections to the Portal.
+            Defaults to ``igvf_utils.POOL_MAXSIZE``.
+    """
+
+    def __init__(self, igvf_mode=None, dry_run=False, submission=False, no_log_file=False,
+                 max_connections=None):
+        if httpx is None:
+            raise ImportError(
+                "AsyncConnection requires the httpx package; install it with "
+                "'pip install igvf-utils[async]'.")
+        #: The wrapped ``igvf_utils.connection.Connection`` instance.
+        self.conn = Connection(igvf_mode=igvf_mode, dry_run=dry_run, submission=submission,
+                               no_log_file=no_log_file)
+        self.max_connections = max_connections or iu.POOL_MAXSIZE
+        self.debug_logger = self.conn.debug_logger
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    @property
+    def client(self):
+        """
+        The ``httpx.AsyncClient`` used for all requests to the Portal. It is created on first use,
+        with the API keys set. The JSON request headers are sent per request, so that downloads
+        don't claim to accept JSON only.
+
+        Returns:
+            `httpx.AsyncClient`.
+        """
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+            self._client = httpx.AsyncClient(
+                auth=self.conn.auth,
+                verify=False,
+                follow_redirects=True,
+                limits=limits,
+                # Requests waiting for a free connection in the pool mustn't time out.
+                timeout=httpx.Timeout(iu.TIMEOUT, pool=None)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Closes :attr:`client` and any pooled connections it holds."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run_sync(self, func, *args, **kwargs):
+        """
+        Runs a blocking function in the default executor of the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def get(self, rec_ids, database=False, ignore404=True, frame=None):
+        """
+        Coroutine version of ``igvf_utils.connection.Connection.get()``.
+
+        Raises:
+            `Exception`: If the server responds with a FORBIDDEN status.
+            `httpx.HTTPStatusError`: The status code is not ok, and the
+                cause isn't due to a 404 (not found) status code when ``ignore404=True``.
+        """
+        if self.conn.submission:
+            database = True
+        if isinstance(rec_ids, str):
+            rec_ids = [rec_ids]
+        status_codes = {}  # key is return code, value is the record ID
+        for r in rec_ids:
+            r = r.strip("/")
+            url = self.conn._get_record_url(r, database=database, frame=frame)
+            self.debug_logger.debug(">>>>>>GET {rec_id} From DACC with URL {url}".format(
+                rec_id=r, url=url))
+            response = await self.client.get(url, headers=iuu.REQUEST_HEADERS_JSON)
+            if response.is_success:
+                return response.json()
+            status_codes[response.status_code] = r
+
+        if self.conn._is_ignorable_get_failure(status_codes, ignore404):
+            return {}
+        response.raise_for_status()
+
+    async def search(self, search_args=[], url=None, limit=None, fields=None):
+        """
+        Coroutine version of ``igvf_utils.connection.Connection.search()``.
+
+        Raises:
+            `httpx.HTTPStatusError`: The status code is not ok and != 404.
+        """
+        search_args = list(search_args) + self.conn._get_field_args(fields)
+        url = self.conn._get_search_url(search_args=search_args, url=url, limit=limit)
+        self.debug_logger.debug("Searching DACC with query {url}.".format(url=url))
+        response = await self.client.get(url, headers=iuu.REQUEST_HEADERS_JSON)
+        if not response.is_success and response.status_code != requests.codes.NOT_FOUND:
+            response.raise_for_status()
+        result = response.json()["@graph"]
+        self.debug_logger.debug("Search completed with {} hits.".format(len(result)))
+        return result
+
+    async def before_submit_hooks(self, payload, method=""):
+        """
+        Async variant of ``igvf_utils.connection.Connection.before_submit_hooks()``, which it
+        runs in a worker thread.
+
+        Returns:
+            `dict`: The potentially modified payload.
+        """
+        return await self._run_sync(self.conn.before_submit_hooks, payload, method=method)
+
+    async def after_submit_hooks(self, rec_id, profile_id, method="", upload_file=True):
+        """
+        Async variant of ``igvf_utils.connection.Connection.after_submit_hooks()``, which it
+        runs in a worker thread.
+        """
+        await self._run_sync(self.conn.after_submit_hooks, rec_id, profile_id, method=method,
+                             upload_file=upload_file)
+
+    async def post(
+        self,
+        payload,
+        require_aliases=True,
+        upload_file=True,
+        return_original_status_code=False,
+        truncate_long_strings_in_payload_log=False,
+    ):
+        """
+        Coroutine version of ``igvf_utils.connection.Connection.post()``; see the documentation
+        there for details on the arguments and return value.
+
+        Raises:
+            `httpx.HTTPStatusError`: The return status is not ok.
+        """
+        conn = self.conn
+        self.debug_logger.debug("\nIN post().")
+        profile, url, payload = await self._run_sync(conn._prepare_post_payload, payload)
+        # Run 'before' hooks:
+        payload = await self.before_submit_hooks(payload, method=conn.POST)
+        aliases, no_alias = conn._check_post_payload(
+            profile, url, payload, require_aliases, truncate_long_strings_in_payload_log)
+
+        if conn.check_dry_run():
+            return {}
+        response = await self.client.post(url, json=payload, headers=iuu.REQUEST_HEADERS_JSON)
+        response_json = response.json()
+        original_status_code = response.status_code
+
+        if response.is_success:
+            self.debug_logger.debug("Success.")
+            response_json = response_json["@graph"][0]
+            encid = conn._log_posted_record(response_json, aliases)
+            # Run 'after' hooks:
+            await self.after_submit_hooks(encid, profile.name, method=conn.POST,
+                                          upload_file=upload_file)
+            if return_original_status_code is True:
+                return (response_json, original_status_code)
+            return response_json
+        elif response.status_code == requests.codes.CONFLICT:
+            self.debug_logger.debug(response_json)
+            if not no_alias:
+                existing_record = await self.get(rec_ids=aliases, ignore404=True)
+                if existing_record:
+                    conn.log_error("Will not POST '{}' since it already exists with aliases '{}'.".format(
+                        aliases[0], existing_record["aliases"]))
+                    if return_original_status_code is True:
+                        return (existing_record, original_status_code)
+                    return existing_record
+        else:
+            conn.log_error("Failed to POST {}".format(aliases[0]))
+            self.debug_logger.debug("<<<<<< DACC POST RESPONSE: ")
+            self.debug_logger.debug(iuu.print_format_dict(response_json))
+        response.raise_for_status()
+
+    async def patch(self, payload, raise_403=True, extend_array_values=True):
+        """
+        Coroutine version of ``igvf_utils.connection.Connection.patch()``; see the documentation
+        there for details on the arguments and return value.
+
+        Raises:
+            `httpx.HTTPStatusError`: if the return status is not ok (excluding a
+                403 status if 'raise_403' is False.
+        """
+        conn = self.conn
+        payload = json.loads(json.dumps(payload))
+        self.debug_logger.debug("\nIN patch()")
+        igvf_id = payload[conn.IGVFID_KEY]
+        # Ensure that the record exists on the Portal:
+        rec_json = await self.get(rec_ids=igvf_id, frame="edit", ignore404=True)
+        if not rec_json:
+            return {}
+        if extend_array_values:
+            payload = await self._run_sync(conn._extend_patch_array_values, payload, rec_json)
+
+        # Run 'before' hooks:
+        payload = await self.before_submit_hooks(payload, method=conn.PATCH)
+        url = conn._prepare_patch_payload(igvf_id, payload)
+
+        if conn.check_dry_run():
+            return {}
+        response = await self.client.patch(url, json=payload, headers=iuu.REQUEST_HEADERS_JSON)
+        response_json = response.json()
+
+        if response.is_success:
+            self.debug_logger.debug("Success.")
+            response_json = response_json["@graph"][0]
+            uuid = response_json["uuid"]
+            profile_id = conn.profiles.get_profile_from_id(response_json["@id"]).name
+            # Run 'after' hooks:
+            await self.after_submit_hooks(uuid, profile_id, method=conn.PATCH)
+            return response_json
+        elif response.status_code == requests.codes.FORBIDDEN:
+            # Don't have permission to PATCH this object.
+            if not raise_403:
+                return rec_json
+
+        conn.log_error("Failed to PATCH {}".format(igvf_id))
+        self.debug_logger.debug("<<<<<< PATCH RESPONSE: ")
+        self.debug_logger.debug(iuu.print_format_dict(response_json))
+        response.raise_for_status()
+
+    async def download(self, rec_id, directory=None):
+        """
+        Coroutine version of ``igvf_utils.connection.Connection.download()``, without the
+        `get_stream` option. The file is written in a worker thread, so that slow disks don't
+        block the event loop.
+
+        Returns:
+            `str`. The full path to the downloaded file.
+        """
+        rec = await self.get(rec_id, ignore404=False)
+        rec_type = rec["@type"]
+        if "Document" in rec_type:
+            file_type = False
+            auth = None
+        elif "File" in rec_type:
+            file_type = True
+            auth = self.conn.auth
+        else:
+            raise Exception("This method can only download records of type 'File' and 'Document'; '{}' is neither of these.".format(rec_id))
+        if file_type:
+            url = iuu.url_join([self.conn.igvf_mode.url, rec["href"].lstrip("/")])
+        else:
+            url = iuu.url_join([self.conn.igvf_mode.url, "documents", rec["uuid"], rec["attachment"]["href"]])
+        self.debug_logger.debug("GET file {} from URL {}.".format(rec_id, url))
+        async with self.client.stream("GET", url, auth=auth) as r:
+            r.raise_for_status()
+            if file_type:
+                filename = r.headers["Content-Disposition"].split("filename=")[-1]
+            else:
+                filename = rec["attachment"]["download"]
+            if directory:
+                filename = os.path.join(directory, filename)
+            fout = await self._run_sync(open, filename, "wb")
+            try:
+                async for chunk in r.aiter_bytes():
+                    await self._run_sync(fout.write, chunk)
+            finally:
+                await self._run_sync(fout.close)
+        self.debug_logger.debug("Download complete: {}.".format(filename))
+        return filename
@@ -6,11 +6,419 @@
 # nathankw@stanford.edu                                                                                
 ### 
 
+import concurrent.futures
 import json
 import os
+import sys
+import threading
+import time
 import urllib
 
 import boto3
+import boto3.s3.transfer
+import botocore.exceptions
+
+#: boto3's default part size, in bytes, of a multipart upload; used as the minimum part size.
+DEFAULT_MULTIPART_CHUNKSIZE = 8_388_608
+#: The maximum number of parts of a multipart upload allowed by S3.
+MULTIPART_MAX_PARTS = 10_000
+#: The default number of threads that upload the parts of a single file concurrently.
+DEFAULT_MAX_CONCURRENCY = 10
+#: The size in bytes from which ``igvf_utils.connection.Connection.upload_file()`` uploads local
+#: files with ``S3FileUpload.upload_resumable()`` by default; smaller files use boto3's managed
+#: transfer, which is cheaper to restart than to journal.
+RESUMABLE_UPLOAD_THRESHOLD = 1_073_741_824
+#: The age in seconds after which the journal of an interrupted resumable upload is considered
+#: stale, and its multipart upload is aborted rather than resumed.
+STALE_UPLOAD_AGE = 7 * 24 * 3600
+#: The error codes that S3 responds with when temporary credentials have expired.
+EXPIRED_CREDENTIALS_ERROR_CODES = frozenset([
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidAccessKeyId",
+    "RequestExpired",
+    "TokenRefreshRequired",
+])
+
+
+def calculate_multipart_chunksize(file_size_bytes, min_chunksize=DEFAULT_MULTIPART_CHUNKSIZE):
+    """
+    Calculates the `multipart_chunksize` to use for a `boto3` `TransferConfig` to ensure that a
+    file can be uploaded successfully without exceeding the part limit of ``MULTIPART_MAX_PARTS``.
+
+    Args:
+        file_size_bytes: `int`. The size of the file to upload.
+        min_chunksize: `int`. The part size to use for files small enough to not exceed the part
+            limit with it. Larger files use a multiple of it.
+
+    Returns:
+        `int`: The part size in bytes.
+    """
+    return min_chunksize * (
+        max((file_size_bytes - 1), 0) // (MULTIPART_MAX_PARTS * min_chunksize) + 1
+    )
+
+
+class UploadProgressBar:
+    """
+    A `Callback` for `boto3` transfers that writes a progress bar to STDOUT. As `boto3` calls it
+    from each of its upload threads, updates are serialized with a lock.
+    """
+
+    #: The width of the bar in characters.
+    WIDTH = 50
+
+    def __init__(self, total_bytes, stream=sys.stdout):
+        """
+        Args:
+            total_bytes: `int`. The size of the file being uploaded.
+            stream: The file object to write the progress bar to.
+        """
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, num_bytes):
+        """
+        Args:
+            num_bytes: `int`. The number of bytes transferred since the last call.
+        """
+        with self._lock:
+            self.uploaded_bytes += num_bytes
+            pct_done = self.uploaded_bytes / self.total_bytes if self.total_bytes else 1
+            completed = int(pct_done * self.WIDTH)
+            self.stream.write(
+                "\rUploading: [{}{}] {:.2f}% done ({:.1f} MiB/{:.1f} MiB)".format(
+                    completed * "█", (self.WIDTH - completed) * " ", pct_done * 100,
+                    self.uploaded_bytes / 2**20, self.total_bytes / 2**20))
+            if self.uploaded_bytes >= self.total_bytes:
+                self.stream.write("\n")
+            self.stream.flush()
+
+
+class S3FileUpload:
+    """
+    Uploads a file to an S3 location with temporary credentials, such as the upload credentials
+    that the Portal issues for a file record, using `boto3`'s managed transfers. Large files are
+    uploaded in parts, by a pool of threads per file. The source can be a local file, an S3 object,
+    which is copied server-side, or any file-like object with a ``read()`` method, such as an
+    ``igvf_utils.gc_storage.GSFile``.
+
+    Local files can also be uploaded with :meth:`upload_resumable`, which keeps a journal of the
+    multipart upload so that an interrupted upload can be resumed rather than started over.
+    """
+
+    def __init__(self, upload_url, aws_creds, multipart_chunksize=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, progress=True, callback=None,
+                 refresh_credentials=None):
+        """
+        Args:
+            upload_url: `str`. The S3 URI to upload to, i.e. s3://bucket/path/to/key.
+            aws_creds: `dict`. The keys `AWS_ACCESS_KEY_ID`, `AWS_SECRET_ACCESS_KEY` and
+                `AWS_SESSION_TOKEN`, as returned by
+                ``igvf_utils.connection.Connection.extract_aws_upload_credentials()``.
+            multipart_chunksize: `int`. The minimum part size in bytes; the part size is raised for
+                large files as needed to stay within ``MULTIPART_MAX_PARTS``. Defaults to
+                ``DEFAULT_MULTIPART_CHUNKSIZE``.
+            max_concurrency: `int`. The number of threads uploading the parts of the file.
+            progress: `bool`. Whether to write a progress bar to STDOUT.
+            callback: callable. If set, called with the number of bytes transferred each time
+                `boto3` reports progress, from the upload threads. Blocking in it slows down the
+                upload, which ``igvf_utils.upload_queue.BandwidthLimiter`` relies on.
+            refresh_credentials: callable. Called without arguments when the credentials have
+                expired during :meth:`upload_resumable`, and must return new credentials in the
+                same form as `aws_creds`.
+        """
+        parse_result = urllib.parse.urlparse(upload_url)
+        self.upload_url = upload_url
+        self.bucket_name = parse_result.netloc
+        self.key = S3Object._process_key_name(parse_result.path)
+        self.multipart_chunksize = multipart_chunksize or DEFAULT_MULTIPART_CHUNKSIZE
+        self.max_concurrency = max_concurrency
+        self.progress = progress
+        self.callback = callback
+        self.refresh_credentials = refresh_credentials
+        self.client = self._make_client(aws_creds)
+        self._client_generation = 0
+        self._client_lock = threading.Lock()
+
+    @staticmethod
+    def _make_client(aws_creds):
+        return boto3.client(
+            "s3",
+            aws_access_key_id=aws_creds["AWS_ACCESS_KEY_ID"],
+            aws_secret_access_key=aws_creds["AWS_SECRET_ACCESS_KEY"],
+            aws_session_token=aws_creds["AWS_SESSION_TOKEN"],
+        )
+
+    def _call(self, method_name, **kwargs):
+        """
+        Calls a method of ``self.client``. If the credentials have expired and
+        ``self.refresh_credentials`` is set, then the client is recreated with new credentials and
+        the call is retried once. When several threads see the credentials expire at the same time,
+        only the first one refreshes them.
+        """
+        generation = self._client_generation
+        client = self.client
+        try:
+            return getattr(client, method_name)(**kwargs)
+        except botocore.exceptions.ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code not in EXPIRED_CREDENTIALS_ERROR_CODES or self.refresh_credentials is None:
+                raise
+        with self._client_lock:
+            if self._client_generation == generation:
+                self.client = self._make_client(self.refresh_credentials())
+                self._client_generation += 1
+            client = self.client
+        return getattr(client, method_name)(**kwargs)
+
+    def transfer_config(self, file_size):
+        """
+        Args:
+            file_size: `int`. The size in bytes of the file to upload.
+
+        Returns:
+            `boto3.s3.transfer.TransferConfig`: The configuration for uploading the file.
+        """
+        chunksize = calculate_multipart_chunksize(file_size, self.multipart_chunksize)
+        return boto3.s3.transfer.TransferConfig(
+            multipart_threshold=chunksize,
+            multipart_chunksize=chunksize,
+            max_concurrency=self.max_concurrency,
+            use_threads=self.max_concurrency > 1
+        )
+
+    def _callback(self, file_size):
+        callbacks = []
+        if self.progress:
+            callbacks.append(UploadProgressBar(file_size))
+        if self.callback is not None:
+            callbacks.append(self.callback)
+        if not callbacks:
+            return None
+        if len(callbacks) == 1:
+            return callbacks[0]
+
+        def callback(num_bytes):
+            for cb in callbacks:
+                cb(num_bytes)
+        return callback
+
+    def upload(self, file_path):
+        """
+        Uploads a local file or copies an S3 object.
+
+        Args:
+            file_path: `str`. A local path, or an S3 URI (i.e. s3://mybucket/test.txt).
+        """
+        if file_path.startswith("s3://"):
+            source = S3Object(s3_uri=file_path)
+            file_size = source.size()
+            self.client.copy(
+                {"Bucket": source.bucket_name, "Key": source.key},
+                self.bucket_name,
+                self.key,
+                Config=self.transfer_config(file_size),
+                Callback=self._callback(file_size)
+            )
+        else:
+            file_size = os.path.getsize(file_path)
+            self.client.upload_file(
+                file_path,
+                self.bucket_name,
+                self.key,
+                Config=self.transfer_config(file_size),
+                Callback=self._callback(file_size)
+            )
+
+    def upload_resumable(self, file_path, journal_path):
+        """
+        Uploads a local file with a multipart upload whose progress is recorded in a journal file.
+        If the journal of an earlier, interrupted upload of the same, unmodified file to the same
+        location exists, then the parts that S3 reports as already uploaded are skipped, and only
+        the missing parts are uploaded. The journal is removed once the upload is complete.
+
+        So that the parts of abandoned uploads don't linger in the bucket, the multipart upload of
+        a journal is aborted when the journal doesn't match the file anymore, when it is older than
+        ``STALE_UPLOAD_AGE``, or when S3 refuses to complete the upload from its parts.
+
+        The journal is a JSON Lines file: the first line describes the upload, i.e. the file, the
+        S3 `UploadId` and the part size, and each following line records a completed part number
+        and its ETag.
+
+        Args:
+            file_path: `str`. The path to a local file.
+            journal_path: `str`. The path to the journal file.
+        """
+        stat = os.stat(file_path)
+        file_size = stat.st_size
+        source = {
+            "file_path": os.path.realpath(file_path),
+            "file_size": file_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "upload_url": self.upload_url,
+        }
+        header, _ = self._read_journal(journal_path)
+        upload_id = None
+        uploaded_parts = {}
+        if header and (any(header.get(k) != v for k, v in source.items())
+                       or self._journal_age(journal_path) > STALE_UPLOAD_AGE):
+            self._abort(header["upload_id"])
+            header = None
+        if header:
+            upload_id = header["upload_id"]
+            part_size = header["part_size"]
+            try:
+                uploaded_parts = self._list_parts(upload_id)
+            except botocore.exceptions.ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    raise
+                upload_id = None
+        if upload_id is None:
+            part_size = calculate_multipart_chunksize(file_size, self.multipart_chunksize)
+            upload_id = self._call(
+                "create_multipart_upload", Bucket=self.bucket_name, Key=self.key)["UploadId"]
+            uploaded_parts = {}
+            header = dict(source, upload_id=upload_id, part_size=part_size)
+            self._write_journal_line(journal_path, header, mode="w")
+
+        num_parts = max(1, -(-file_size // part_size))
+
+        def part_length(part_number):
+            return min(part_size, file_size - (part_number - 1) * part_size)
+
+        # Only keep the parts that were uploaded in full.
+        etags = {
+            n: etag for n, (etag, size) in uploaded_parts.items()
+            if n <= num_parts and size == part_length(n)
+        }
+        callback = self._callback(file_size)
+        if callback and etags:
+            callback(sum(part_length(n) for n in etags))
+        journal_lock = threading.Lock()
+
+        def upload_part(part_number):
+            length = part_length(part_number)
+            with open(file_path, "rb") as fh:
+                fh.seek((part_number - 1) * part_size)
+                data = fh.read(length)
+            etag = self._call(
+                "upload_part",
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data
+            )["ETag"]
+            with journal_lock:
+                etags[part_number] = etag
+                self._write_journal_line(journal_path, {"part": part_number, "etag": etag})
+            if callback:
+                callback(length)
+
+        missing = [n for n in range(1, num_parts + 1) if n not in etags]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for future in [executor.submit(upload_part, n) for n in missing]:
+                future.result()
+        try:
+            self._call(
+                "complete_multipart_upload",
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [{"ETag": etags[n], "PartNumber": n} for n in sorted(etags)]
+                }
+            )
+        except botocore.exceptions.ClientError:
+            # The recorded parts can't make up the file, so resuming from them would fail again.
+            self._abort(upload_id)
+            os.remove(journal_path)
+            raise
+        os.remove(journal_path)
+
+    @staticmethod
+    def _journal_age(journal_path):
+        """
+        Returns:
+            `float`: The number of seconds since the journal was last written to.
+        """
+        return time.time() - os.path.getmtime(journal_path)
+
+    def _abort(self, upload_id):
+        """
+        Aborts a multipart upload, so that S3 discards its parts. Failures are ignored, i.e. when
+        the upload was already aborted or completed.
+        """
+        try:
+            self._call(
+                "abort_multipart_upload", Bucket=self.bucket_name, Key=self.key, UploadId=upload_id)
+        except botocore.exceptions.ClientError:
+            pass
+
+    def _list_parts(self, upload_id):
+        """
+        Returns:
+            `dict`: Each key is the number of a part already uploaded for the multipart upload,
+            and each value a two-item tuple of its ETag and size.
+        """
+        parts = {}
+        kwargs = {"Bucket": self.bucket_name, "Key": self.key, "UploadId": upload_id}
+        while True:
+            response = self._call("list_parts", **kwargs)
+            for part in response.get("Parts", []):
+                parts[part["PartNumber"]] = (part["ETag"], part["Size"])
+            if not response.get("IsTruncated"):
+                return parts
+            kwargs["PartNumberMarker"] = response["NextPartNumberMarker"]
+
+    @staticmethod
+    def _read_journal(journal_path):
+        """
+        Returns:
+            `tuple`: The header of the journal and the `dict` of recorded part ETags, or
+            ``(None, {})`` if there is no readable journal.
+        """
+        if not os.path.exists(journal_path):
+            return None, {}
+        header = None
+        parts = {}
+        with open(journal_path) as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by the interruption.
+                    continue
+                if header is None:
+                    header = entry
+                else:
+                    parts[entry["part"]] = entry["etag"]
+        return header, parts
+
+    @staticmethod
+    def _write_journal_line(journal_path, entry, mode="a"):
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        with open(journal_path, mode) as fh:
+            fh.write(json.dumps(entry) + "\n")
+
+    def upload_fileobj(self, fileobj, file_size):
+        """
+        Uploads the content of a file-like object.
+
+        Args:
+            fileobj: A file-like object opened for reading in binary mode.
+            file_size: `int`. The number of bytes to be read from `fileobj`.
+        """
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket_name,
+            self.key,
+            Config=self.transfer_config(file_size),
+            Callback=self._callback(file_size)
+        )
 
 class S3Upload:
   """
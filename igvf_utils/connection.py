@@ -7,20 +7,24 @@
 ###
 
 import base64
+import collections
+import concurrent.futures
 import json
 import logging
 import mimetypes
 import os
+import re
 import requests
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
-import subprocess
-import sys
 import urllib
 import boto3
-import io
+import botocore.exceptions
 
 # inhouse libraries
+import igvf_utils.aws_storage
+import igvf_utils.ranged_download
 import igvf_utils.transfer_to_gcp
+import igvf_utils.upload_queue
 import igvf_utils as iu
 from igvf_utils.exceptions import (
     AwardPropertyMissing,
@@ -29,6 +33,8 @@ from igvf_utils.exceptions import (
     MissingAlias,
     ProfileNotSpecified,
     RecordIdNotPresent,
+    RecordNotFound,
+    SearchIncomplete,
 )
 from igvf_utils.profiles import Profiles
 import igvf_utils.utils as iuu
@@ -40,8 +46,13 @@ mimetypes.add_type('text/autosql', '.as')
 #: The directory that contains the log files created by the `Connection` class.
 LOG_DIR = "IU_Logs"
 
-BOTO3_DEFAULT_MULTIPART_CHUNKSIZE = 8_388_608
-BOTO3_MULTIPART_MAX_PARTS = 10_000
+#: The number of record identifiers that ``Connection.get_many()`` looks up per search request.
+#: Kept well below the number of identifiers that would make the search URL too long for the
+#: Portal to accept.
+GET_MANY_CHUNK_SIZE = 200
+
+#: The default number of search results fetched per request by ``Connection.search_iter()``.
+SEARCH_PAGE_SIZE = 1000
 
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 # urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -69,6 +80,13 @@ class Connection:
        the `accession` property doesn't exist for the profile of the record at hand). Note that if a
        record has several aliases, then only the first one in the list for the `aliases` property is
        used.
+
+    All requests to the Portal are sent through a single ``requests.Session`` (see :attr:`session`),
+    so that TCP and TLS connections are pooled and kept alive between calls. Call :meth:`close` when
+    done with the connection, or use it as a context manager::
+
+        with Connection("sandbox") as conn:
+            conn.get("IGVFSM9352WYNZ")
     """
 
     #: Identifies the name of the key in the payload that stores a valid IGVF-assigned
@@ -87,7 +105,8 @@ class Connection:
     #: Constant
     PATCH = "patch"
 
-    def __init__(self, igvf_mode=None, dry_run=False, submission=False, no_log_file=False):
+    def __init__(self, igvf_mode=None, dry_run=False, submission=False, no_log_file=False,
+                 pool_maxsize=None):
 
         #: A reference to the `debug` logging instance that was created earlier in ``igvf_utils.debug_logger``.
         #: This class adds a file handler, such that all messages sent to it are logged to this
@@ -144,10 +163,73 @@ class Connection:
         self.set_submission(submission)  #sets self.submission attribute.
         self._auth = None
 
+        #: The maximum number of keep-alive connections to the Portal held in the pool of
+        #: :attr:`session`. Defaults to ``igvf_utils.POOL_MAXSIZE``.
+        self.pool_maxsize = pool_maxsize or iu.POOL_MAXSIZE
+        self._session = None
+
+        #: An ``igvf_utils.upload_queue.UploadQueue`` that file uploads are submitted to after a
+        #: POST, or `None` to upload files synchronously. See ``self.enable_upload_queue()``.
+        self.upload_queue = None
+
+        #: The size in bytes from which ``self.upload_file()`` uploads local files resumably by
+        #: default, keeping a journal per file in ``self.upload_journal_dir``. `None` disables
+        #: resumable uploads unless requested per upload.
+        self.resumable_upload_threshold = igvf_utils.aws_storage.RESUMABLE_UPLOAD_THRESHOLD
+
+        #: The directory holding the journals of resumable uploads. Resumable uploads are disabled
+        #: when `None`, which is the default when ``igvf_utils.CACHE_DIR`` is empty.
+        self.upload_journal_dir = os.path.join(iu.CACHE_DIR, "uploads") if iu.CACHE_DIR else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        The ``requests.Session`` used for all requests to the Portal. It is created on first use
+        and is shared by all instance methods, such that connections to the Portal are pooled and
+        kept alive rather than re-established for each request. The API keys (see :attr:`auth`)
+        and the JSON request headers are set on the session, so they needn't be passed for each
+        request.
+
+        Returns:
+            `requests.Session`.
+        """
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.pool_maxsize,
+                pool_maxsize=self.pool_maxsize
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.auth = self.auth
+            session.headers.update(iuu.REQUEST_HEADERS_JSON)
+            session.verify = False
+            self._session = session
+        return self._session
+
+    def close(self):
+        """
+        Closes :attr:`session` and any pooled connections it holds. The connection can still be
+        used afterwards, in which case a new session is created. If ``self.upload_queue`` is set,
+        waits for its uploads to complete first.
+        """
+        if self.upload_queue is not None:
+            self.upload_queue.drain()
+            self.upload_queue = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
     @property
     def profiles(self):
         if self._profiles is None:
-            self._profiles = Profiles(self.igvf_mode.url)
+            self._profiles = Profiles(self.igvf_mode.url, session=self.session)
         return self._profiles
 
     @property
@@ -190,7 +272,7 @@ class Connection:
             )
             raise
 
-    def _get_logfile_name(self, tag):
+    def _get_logfile_name(self, tag, extension=".txt"):
         """
         Creates a name for a log file that is meant to be used in a call to
         ``logging.FileHandler``. The log file name will incldue the path to the log directory given
@@ -201,6 +283,7 @@ class Connection:
         Args:
             tag: `str`. A tag name to add to at the end of the log file name for clarity on the
                 log file's purpose.
+            extension: `str`. The extension of the file name.
         """
         if not os.path.exists(LOG_DIR):
             os.mkdir(LOG_DIR)
@@ -211,10 +294,21 @@ class Connection:
         cleaned_igvf_mode = igvf_mode
         for c in bad_characters:
             cleaned_igvf_mode = cleaned_igvf_mode.replace(c, '')
-        filename = "log_iu_" + cleaned_igvf_mode + "_" + tag + ".txt"
+        filename = "log_iu_" + cleaned_igvf_mode + "_" + tag + extension
         filename = os.path.join(LOG_DIR, filename)
         return filename
 
+    def get_submission_journal(self):
+        """
+        Opens the submission journal of the Portal this connection is for. It resides in the
+        directory specified by ``connection.LOG_DIR``, next to the log of POSTed records, in a file
+        named like the log files with the tag 'journal' and the extension '.sqlite3'.
+
+        Returns:
+            `igvf_utils.utils.SubmissionJournal`.
+        """
+        return iuu.SubmissionJournal(self._get_logfile_name("journal", extension=".sqlite3"))
+
     def _add_file_handler(self, logger, level, tag):
         """
         Adds a ``logging.FileHandler`` handler to the specified ``logging`` instance that will log
@@ -236,32 +330,6 @@ class Connection:
         handler.setFormatter(f_formatter)
         logger.addHandler(handler)
 
-    def _parse_aws_upload_stdout(self, line):
-        """
-        Parses the stdout from AWS uploading to read the current amount uploaded and
-        total file size.
-
-        Args:
-            line: The stdout from the aws s3 cp command.
-        """
-        unit_mapping = {
-            "Bytes": 1,
-            "KiB": 1000,
-            "MiB": 1000000,
-            "GiB": 1000000000,
-            "TiB": 1000000000000,
-        }
-        (segment_1, segment_2) = line.split("(")[0].split("/")
-        segment_1 = segment_1.split(" ")
-        segment_2 = segment_2.split(" ")
-
-        current_size = float(segment_1[1])
-        current_size_units = segment_1[2]
-        total_size = float(segment_2[0])
-        total_size_units = segment_2[1]
-
-        return current_size*unit_mapping[current_size_units], total_size*unit_mapping[total_size_units], f"{current_size} {current_size_units}/{total_size} {total_size_units}"
-
     @property
     def auth(self):
         """
@@ -455,7 +523,7 @@ class Connection:
         url = iuu.url_join([self.igvf_mode.url, "search/?"]) + query
         return url
 
-    def search(self, search_args=[], url=None, limit=None):
+    def search(self, search_args=[], url=None, limit=None, fields=None):
         """
         Searches the Portal using the provided query parameters, which will first be URL encoded.
         The user can pass in the query parameters and values via the `search_args` argument, or
@@ -473,6 +541,9 @@ class Connection:
                 query will be extracted from the URL.
             limit: `int`. The number of search results to send from the server. The default means
                 to return all results.
+            fields: `list`. If set, only the specified properties of each search result are
+                returned, which can greatly reduce the size of the response. Embedded properties
+                can be given in dot notation, i.e. 'lab.title'.
 
         Returns:
             `list`: The search results.
@@ -480,6 +551,104 @@ class Connection:
         Raises:
             `requests.exceptions.HTTPError`: The status code is not ok and != 404.
         """
+        search_args = list(search_args) + self._get_field_args(fields)
+        url = self._get_search_url(search_args=search_args, url=url, limit=limit)
+        result = self._get_search_results(url)["@graph"]  # the @graph object is a list
+        self.debug_logger.debug("Search completed with {} hits.".format(len(result)))
+        return result
+
+    def search_iter(self, search_args=[], url=None, page_size=SEARCH_PAGE_SIZE, fields=None):
+        """
+        Like ``self.search()``, but pages through the search results with the `from` and `limit`
+        query parameters and yields the records one at a time. Only a single page of results is
+        held in memory at any time, which makes this suitable for queries with a large number of
+        hits. Any `from` or `limit` query parameter given in `search_args` or `url` is ignored.
+
+        Note that results are paged in the order the Portal sorts them, so records submitted or
+        modified while iterating may be missed or yielded twice. Moreover, Elasticsearch only
+        pages through the first `max_result_window` hits (10,000 by default); narrow down the query
+        if it matches more.
+
+        Args:
+            search_args: `list` of two-item tuples of the form ``[(key, val), (key, val) ,...]``.
+            url: `str`. A URL used to search for records interactively in the IGVF Portal. The
+                query will be extracted from the URL.
+            page_size: `int`. The number of search results to fetch per request.
+            fields: `list`. See ``self.search()``.
+
+        Yields:
+            `dict`: A search result.
+
+        Raises:
+            `requests.exceptions.HTTPError`: The status code is not ok and != 404.
+            igvf_utils.exceptions.SearchIncomplete: A page came back short before reaching the
+                total number of hits reported by the Portal.
+        """
+        query_list = list(search_args)
+        if url:
+            query_list = urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query) + query_list
+        query_list = [x for x in query_list if x[0] not in ("from", "limit")]
+        query_list.extend(self._get_field_args(fields))
+        start = 0
+        while True:
+            page_args = query_list + [("from", str(start)), ("limit", str(page_size))]
+            response_json = self._get_search_results(self._get_search_url(search_args=page_args))
+            page = response_json.get("@graph", [])
+            yield from page
+            start += len(page)
+            total = response_json.get("total")
+            if total is not None and start >= total:
+                break
+            if len(page) < page_size:
+                if total is not None:
+                    raise SearchIncomplete(
+                        "Search stopped after {} of {} hits. Elasticsearch can't page past its"
+                        " max_result_window; narrow down the query.".format(start, total))
+                break
+        self.debug_logger.debug("Search completed with {} hits.".format(start))
+
+    def _get_field_args(self, fields):
+        """
+        Converts a list of property names into `field` query parameters for the search endpoint.
+
+        Args:
+            fields: `list`. Property names, or `None`.
+
+        Returns:
+            `list` of two-item tuples of the form ``[("field", name), ...]``.
+        """
+        if not fields:
+            return []
+        return [("field", f) for f in sorted(set(fields))]
+
+    def _get_search_results(self, url):
+        """
+        Sends a search request to the Portal.
+
+        Args:
+            url: `str`. The search URL, as given by ``self._get_search_url()``.
+
+        Returns:
+            `dict`: The JSON response.
+
+        Raises:
+            `requests.exceptions.HTTPError`: The status code is not ok and != 404.
+        """
+        self.debug_logger.debug("Searching DACC with query {url}.".format(url=url))
+        response = self.session.get(url, timeout=iu.TIMEOUT)
+        status_code = response.status_code
+        if not response.ok and status_code != requests.codes.NOT_FOUND:
+            response.raise_for_status()
+        return response.json()
+
+    def _get_search_url(self, search_args=[], url=None, limit=None):
+        """
+        Builds the URL used by ``self.search()``; see the documentation there for details on the
+        arguments.
+
+        Returns:
+            `str`: The search URL.
+        """
         if url:
             # Format query string into list of tuples:
             url_obj = urllib.parse.urlsplit(url)
@@ -517,19 +686,7 @@ class Connection:
             if self.submission:
                 query_list.append(("datastore", "database"))
 
-        url = self.make_search_url(search_args=query_list)
-        self.debug_logger.debug("Searching DACC with query {url}.".format(url=url))
-        response = requests.get(url,
-                                auth=self.auth,
-                                timeout=iu.TIMEOUT,
-                                headers=iuu.REQUEST_HEADERS_JSON,
-                                verify=False)
-        status_code = response.status_code
-        if not response.ok and status_code != requests.codes.NOT_FOUND:
-            response.raise_for_status()
-        result = response.json()["@graph"]  # the @graph object is a list
-        self.debug_logger.debug("Search completed with {} hits.".format(len(result)))
-        return result
+        return self.make_search_url(search_args=query_list)
 
     def get_profile_from_payload(self, payload):
         """
@@ -597,7 +754,7 @@ class Connection:
         return lookup_ids
 
 
-    def get(self, rec_ids, database=False, ignore404=True, frame=None):
+    def get(self, rec_ids, database=False, ignore404=True, frame=None, fields=None):
         """GET a record from the Portal.
 
         Looks up a record in the Portal and performs a GET request, returning the JSON serialization of
@@ -614,7 +771,11 @@ class Connection:
             ignore404: `bool`. Only matters when none of the passed in record IDs were found on the
                 Portal.  In this case, If set to `True`, then an empty `dict` will be returned.
                 If set to `False`, then an Exception will be raised.
-
+            fields: `list`. If set, only the specified properties of the record are returned.
+                Embedded properties can be given in dot notation, i.e. 'files.file_type'. Since
+                the Portal only supports this on the search endpoint, the record is then looked up
+                through ``self.get_many()``, and thus from the Elasticsearch indices regardless of
+                `database`, falling back to the database for records that aren't indexed yet.
 
         Returns:
             `dict`: The JSON response. Will be empty if no record was found AND ``ignore404=True``.
@@ -623,40 +784,168 @@ class Connection:
             `Exception`: If the server responds with a FORBIDDEN status.
             `requests.exceptions.HTTPError`: The status code is not ok, and the
                 cause isn't due to a 404 (not found) status code when ``ignore404=True``.
+            igvf_utils.exceptions.RecordNotFound: `fields` is set, none of the records were found
+                and ``ignore404=False``.
         """
-        if self.submission:
-            database = True
         if isinstance(rec_ids, str):
             rec_ids = [rec_ids]
+        if fields:
+            results = self.get_many(rec_ids, frame=frame, fields=fields, fallback=True)
+            for r in rec_ids:
+                if results[r]:
+                    return results[r]
+            self.debug_logger.debug("NOT FOUND")
+            if ignore404:
+                return {}
+            raise RecordNotFound("None of the records {} were found.".format(rec_ids))
+        if self.submission:
+            database = True
         status_codes = {}  # key is return code, value is the record ID
         for r in rec_ids:
             r = r.strip("/")
-            url = iuu.url_join([self.igvf_mode.url, r, "?format=json"])
-            if database:
-                url += "&datastore=database"
-            if frame:
-                url += "&frame={frame}".format(frame=frame)
+            url = self._get_record_url(r, database=database, frame=frame)
             self.debug_logger.debug(">>>>>>GET {rec_id} From DACC with URL {url}".format(
                 rec_id=r, url=url))
-            response = requests.get(url,
-                                    auth=self.auth,
-                                    timeout=iu.TIMEOUT,
-                                    headers=iuu.REQUEST_HEADERS_JSON,
-                                    verify=False)
+            response = self.session.get(url, timeout=iu.TIMEOUT)
             if response.ok:
                 return response.json()
             status_codes[response.status_code] = r
 
+        if self._is_ignorable_get_failure(status_codes, ignore404):
+            return {}
+        # At this point in the code, the response is not okay.
+        # Raise the error for last response we got:
+        response.raise_for_status()
+
+    def _get_record_url(self, rec_id, database=False, frame=None):
+        """
+        Builds the URL used by ``self.get()`` to GET a single record.
+
+        Args:
+            rec_id: `str`. A record identifier without any leading or trailing '/'.
+            database: `bool`. See ``self.get()``.
+            frame: `str`. See ``self.get()``.
+
+        Returns:
+            `str`: The URL.
+        """
+        url = iuu.url_join([self.igvf_mode.url, rec_id, "?format=json"])
+        if database:
+            url += "&datastore=database"
+        if frame:
+            url += "&frame={frame}".format(frame=frame)
+        return url
+
+    def _is_ignorable_get_failure(self, status_codes, ignore404):
+        """
+        Inspects the status codes of the failed GET requests done in ``self.get()``.
+
+        Args:
+            status_codes: `dict`. Each key is a returned status code and each value the record ID
+                that was requested.
+            ignore404: `bool`. See ``self.get()``.
+
+        Returns:
+            `bool`: `True` if none of the records were found and ``ignore404=True``, in which case
+            an empty result should be returned; `False` if the error should be raised.
+
+        Raises:
+            `Exception`: If the server responded with a FORBIDDEN status.
+        """
         if requests.codes.FORBIDDEN in status_codes:
             raise Exception(
                 "Access to IGVF record {} is forbidden".format(status_codes[requests.codes.FORBIDDEN]))
         elif requests.codes.NOT_FOUND in status_codes:
             self.debug_logger.debug("NOT FOUND")
             if ignore404:
-                return {}
-        # At this point in the code, the response is not okay.
-        # Raise the error for last response we got:
-        response.raise_for_status()
+                return True
+        return False
+
+    #: Regular expression matching a uuid.
+    UUID_REGEX = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+    #: Regular expression matching an md5sum.
+    MD5SUM_REGEX = re.compile(r"^[0-9a-f]{32}$", re.IGNORECASE)
+
+    def _get_lookup_property(self, rec_id):
+        """
+        Determines which property of a record a given identifier is a value of, for looking up
+        records through the search endpoint in ``self.get_many()``.
+
+        Args:
+            rec_id: `str`. A record identifier, i.e. an `@id`, uuid, alias, md5sum or accession.
+
+        Returns:
+            `tuple`: The name of the property, and the identifier normalized for searching.
+        """
+        rec_id = rec_id.strip()
+        if "/" in rec_id:
+            return "@id", "/" + rec_id.strip("/") + "/"
+        elif self.UUID_REGEX.match(rec_id):
+            return "uuid", rec_id.lower()
+        elif ":" in rec_id:
+            return iu.ALIAS_PROP_NAME, rec_id
+        elif self.MD5SUM_REGEX.match(rec_id):
+            return Profiles.MD5SUM_NAME_PROP_NAME, rec_id.lower()
+        return "accession", rec_id
+
+    def get_many(self, rec_ids, frame=None, fields=None, chunk_size=GET_MANY_CHUNK_SIZE,
+                 fallback=False):
+        """
+        Retrieves many records at once. Unlike ``self.get()``, which sends one GET request per
+        identifier, the identifiers are looked up in batches through the search endpoint, by
+        filtering on the `@id`, `accession`, `aliases`, `uuid` and `md5sum` properties as
+        appropriate for each identifier.
+
+        Search results come from the Elasticsearch indices, so records that were just submitted
+        may not be found there until they are indexed. Set `fallback` when such records are
+        needed; this costs a GET request per identifier that the search doesn't find.
+
+        Args:
+            rec_ids: `list`. Record identifiers, i.e. `@id`, uuid, alias, md5sum or accession
+                values. Each may identify a record of any profile.
+            frame: `str`. A value for the frame query parameter, i.e. 'object'.
+            fields: `list`. If set, only the specified properties of each record are returned.
+            chunk_size: `int`. The number of identifiers looked up per search request.
+            fallback: `bool`. True means to look up each identifier that the search doesn't find
+                again with ``self.get()`` from the database, in which case the full record is
+                returned even if `fields` is set.
+
+        Returns:
+            `dict`: Each key is an identifier in `rec_ids`, and each value the JSON serialization
+            of the corresponding record. The value is an empty `dict` when no record was found.
+
+        Raises:
+            `requests.exceptions.HTTPError`: The status code of a search is not ok and != 404.
+        """
+        # For each property to search on, map each normalized identifier to the identifiers
+        # in rec_ids that it was normalized from.
+        lookups = {}
+        for rec_id in rec_ids:
+            prop_name, value = self._get_lookup_property(rec_id)
+            lookups.setdefault(prop_name, {}).setdefault(value, []).append(rec_id)
+
+        results = {rec_id: {} for rec_id in rec_ids}
+        for prop_name, values in lookups.items():
+            value_list = list(values)
+            for i in range(0, len(value_list), chunk_size):
+                search_args = [("type", "Item")]
+                search_args.extend((prop_name, v) for v in value_list[i:i + chunk_size])
+                if frame:
+                    search_args.append(("frame", frame))
+                if fields:
+                    search_args.extend(self._get_field_args(set(fields) | {prop_name}))
+                for record in self.search(search_args=search_args):
+                    found = record.get(prop_name, [])
+                    if not isinstance(found, list):
+                        found = [found]
+                    for value in found:
+                        for rec_id in values.get(value, []):
+                            results[rec_id] = record
+        if fallback:
+            for rec_id, record in results.items():
+                if not record:
+                    results[rec_id] = self.get(rec_id, database=True, frame=frame)
+        return results
 
     def set_attachment(self, document):
         """
@@ -712,8 +1001,36 @@ class Connection:
         """
         if profile_id not in self.profiles.FILE_PROFILE_ID:
             return
+        if self.upload_queue is not None:
+            self.upload_queue.submit(file_id=rec_id)
+            return
         self.upload_file(file_id=rec_id)
 
+    def enable_upload_queue(self, workers=igvf_utils.upload_queue.DEFAULT_WORKERS,
+                            max_bandwidth=None,
+                            part_concurrency=igvf_utils.upload_queue.DEFAULT_PART_CONCURRENCY):
+        """
+        Makes file uploads after POSTing File records run in the background, so that ``self.post()``
+        returns without waiting for the upload to complete. The uploads are run by an
+        ``igvf_utils.upload_queue.UploadQueue``, available as ``self.upload_queue``; call its
+        ``wait()`` or ``drain()`` method to wait for them to complete and get their outcome.
+
+        Args:
+            workers: `int`. The number of files uploaded concurrently.
+            max_bandwidth: `int`. The maximum number of bytes per second uploaded across all files.
+                Defaults to no limit.
+            part_concurrency: `int`. The maximum number of parts uploaded concurrently across all
+                files.
+
+        Returns:
+            `igvf_utils.upload_queue.UploadQueue`.
+        """
+        if self.upload_queue is None:
+            self.upload_queue = igvf_utils.upload_queue.UploadQueue(
+                self, workers=workers, max_bandwidth=max_bandwidth,
+                part_concurrency=part_concurrency)
+        return self.upload_queue
+
     def after_submit_hooks(self, rec_id, profile_id, method="", upload_file=True):
         """
         Calls after-POST and after-PATCH hooks. This method is called from both the ``post()`` and
@@ -954,8 +1271,8 @@ class Connection:
             upload_file: `bool`. If `False`, when POSTing files the file data will not
                 be uploaded to S3, defaults to `True`. This can be useful if you have
                 custom upload logic. If the files to upload are already on disk, it is
-                recommmended to leave this with the default, which will use `aws s3 cp`
-                to upload them.
+                recommmended to leave this with the default, which will use
+                ``self.upload_file()`` to upload them.
             return_original_status_code: `bool`. Defaults to `False`. If `True`, then
                 will return the original `requests.Response.status_code` of the initial
                 post, in addition to the usual `dict` response.
@@ -984,6 +1301,76 @@ class Connection:
             will be popped out. Furthermore, self.IGVFID_KEY will be popped out if present in the payload.
         """
         self.debug_logger.debug("\nIN post().")
+        profile, url, payload = self._prepare_post_payload(payload)
+        # Run 'before' hooks:
+        payload = self.before_submit_hooks(payload, method=self.POST)
+        aliases, no_alias = self._check_post_payload(
+            profile, url, payload, require_aliases, truncate_long_strings_in_payload_log)
+
+        if self.check_dry_run():
+            return {}
+        response = self.session.post(url, timeout=iu.TIMEOUT, json=payload)
+        #response_json = response.json()["@graph"][0]
+        response_json = response.json()
+        original_status_code = response.status_code
+
+        if response.ok:
+            self.debug_logger.debug("Success.")
+            response_json = response_json["@graph"][0]
+            encid = self._log_posted_record(response_json, aliases)
+            # Run 'after' hooks:
+            self.after_submit_hooks(encid, profile.name, method=self.POST, upload_file=upload_file)
+            if return_original_status_code is True:
+                return (response_json, original_status_code)
+            return response_json
+        elif response.status_code == requests.codes.CONFLICT:
+            self.debug_logger.debug(response_json)
+            # In the case of paired-end FASTQ files, it could also mean that there was a conflict
+            # related to the 'paired_with' property, i.e. the latter is already linked to a FASTQ
+            # file, which could even have been set to a deleted state on the Portal. The server
+            # response in either case would look something like this:
+            #
+            # {
+            #   'detail': "Keys conflict: [('file:paired_with', 'f39320d9-0970-4369-b680-5965a5e85b6f')]",
+            #   'description': 'There was a conflict when trying to complete your request.',
+            #   'code': 409,
+            #   '@type': ['HTTPConflict', 'Error'],
+            #   'title': 'Conflict',
+            #   'status': 'error'}
+            # }
+            #
+            if no_alias:
+                response.raise_for_status()
+            else:
+                existing_record = self.get(rec_ids=aliases, ignore404=True)
+                if not existing_record:
+                    response.raise_for_status()
+                else:
+                    self.log_error("Will not POST '{}' since it already exists with aliases '{}'.".format(aliases[0], existing_record["aliases"]))
+                    if return_original_status_code is True:
+                        return (existing_record, original_status_code)
+                    return existing_record
+
+        else:
+            message = "Failed to POST {}".format(aliases[0])
+            self.log_error(message)
+            self.debug_logger.debug("<<<<<< DACC POST RESPONSE: ")
+            self.debug_logger.debug(iuu.print_format_dict(response_json))
+            response.raise_for_status()
+
+    def _prepare_post_payload(self, payload):
+        """
+        Runs the steps of ``self.post()`` that come before the pre-POST hooks: the payload is
+        copied, its profile is determined, and the defaults for the `award` and `lab`
+        properties are set when missing.
+
+        Args:
+            payload: `dict`. The data to submit.
+
+        Returns:
+            `tuple`: The ``igvf_utils.profiles.IgvfSchema`` of the payload, the URL to POST to, and
+            the copied payload.
+        """
         # Make sure we have a payload that can be converted to valid JSON, and
         # tuples become arrays, ...
         payload = json.loads(json.dumps(payload))
@@ -1004,9 +1391,19 @@ class Connection:
                 if not iu.LAB:
                     raise LabPropertyMissing
                 payload.update(iu.LAB)
+        return profile, url, payload
 
-        # Run 'before' hooks:
-        payload = self.before_submit_hooks(payload, method=self.POST)
+    def _check_post_payload(self, profile, url, payload, require_aliases,
+                            truncate_long_strings_in_payload_log):
+        """
+        Runs the steps of ``self.post()`` that come after the pre-POST hooks: the non-schematic
+        keys are removed from the payload, the aliases are checked, and the payload is validated
+        against the schema of its profile.
+
+        Returns:
+            `tuple`: The aliases to log the record under, and a `bool` that is `True` when the
+            payload doesn't have any aliases.
+        """
         # Remove the non-schematic self.PROFILE_KEY if being used, which was added above since some
         # 'before' hooks may need it. Also check for the `@id` property and remove it too if found.
         try:
@@ -1035,7 +1432,7 @@ class Connection:
         ### This doesn't work as locally I can't use jsonschema to validate a profile with
         ### custom objects specified in the value of a linkTo property.
         self.debug_logger.debug("Validating the payload against the schema")
-        validation_error = iuu.err_context(payload=payload, schema=self.profiles.get_profile_from_id(profile.name).schema)
+        validation_error = profile.validate(payload)
         if validation_error:
            self.log_error("Invalid schema instance of the {} profile.".format(profile.name))
            self.debug_logger.debug("Payload is: {}".format(iuu.print_format_dict(payload)))
@@ -1058,69 +1455,28 @@ class Connection:
                 )
             )
         )
+        return aliases, no_alias
 
-        if self.check_dry_run():
-            return {}
-        response = requests.post(url,
-                                 auth=self.auth,
-                                 timeout=iu.TIMEOUT,
-                                 headers=iuu.REQUEST_HEADERS_JSON,
-                                 json=payload,
-                                 verify=False)
-        #response_json = response.json()["@graph"][0]
-        response_json = response.json()
-        original_status_code = response.status_code
+    def _log_posted_record(self, response_json, aliases):
+        """
+        Logs a record that was successfully POSTED to the posted log file.
 
-        if response.ok:
-            self.debug_logger.debug("Success.")
-            response_json = response_json["@graph"][0]
-            encid = ""
-            try:
-                encid = response_json["accession"]
-            except KeyError:
-                # Some objects don't have an accession, i.e. replicates.
-                encid = response_json["uuid"]
-            self.debug_logger.debug(f"Object posted with identifier: {encid}")
-            self._log_post(aliases=aliases, dacc_id=encid)
-            # Run 'after' hooks:
-            self.after_submit_hooks(encid, profile.name, method=self.POST, upload_file=upload_file)
-            if return_original_status_code is True:
-                return (response_json, original_status_code)
-            return response_json
-        elif response.status_code == requests.codes.CONFLICT:
-            self.debug_logger.debug(response_json)
-            # In the case of paired-end FASTQ files, it could also mean that there was a conflict
-            # related to the 'paired_with' property, i.e. the latter is already linked to a FASTQ
-            # file, which could even have been set to a deleted state on the Portal. The server
-            # response in either case would look something like this:
-            #
-            # {
-            #   'detail': "Keys conflict: [('file:paired_with', 'f39320d9-0970-4369-b680-5965a5e85b6f')]",
-            #   'description': 'There was a conflict when trying to complete your request.',
-            #   'code': 409,
-            #   '@type': ['HTTPConflict', 'Error'],
-            #   'title': 'Conflict',
-            #   'status': 'error'}
-            # }
-            #
-            if no_alias:
-                response.raise_for_status()
-            else:
-                existing_record = self.get(rec_ids=aliases, ignore404=True)
-                if not existing_record:
-                    response.raise_for_status()
-                else:
-                    self.log_error("Will not POST '{}' since it already exists with aliases '{}'.".format(aliases[0], existing_record["aliases"]))
-                    if return_original_status_code is True:
-                        return (existing_record, original_status_code)
-                    return existing_record
+        Args:
+            response_json: `dict`. The JSON serialization of the new record.
+            aliases: `list`. The aliases the record was POSTED with.
 
-        else:
-            message = "Failed to POST {}".format(aliases[0])
-            self.log_error(message)
-            self.debug_logger.debug("<<<<<< DACC POST RESPONSE: ")
-            self.debug_logger.debug(iuu.print_format_dict(response_json))
-            response.raise_for_status()
+        Returns:
+            `str`: The accession of the new record, or its uuid if it doesn't have an accession.
+        """
+        encid = ""
+        try:
+            encid = response_json["accession"]
+        except KeyError:
+            # Some objects don't have an accession, i.e. replicates.
+            encid = response_json["uuid"]
+        self.debug_logger.debug(f"Object posted with identifier: {encid}")
+        self._log_post(aliases=aliases, dacc_id=encid)
+        return encid
 
     def patch(self, payload, raise_403=True, extend_array_values=True):
         """PATCH a record on the Portal.
@@ -1162,44 +1518,15 @@ class Connection:
             return {}
 
         if extend_array_values:
-            for key in payload:
-                if isinstance(payload[key], list):
-                    val = payload[key]
-                    val.extend(rec_json.get(key, []))
-                    # I use rec_json.get(key,[]) above because in a GET request,
-                    # not all props are pulled back when they are empty.
-                    # For ex, in a file object, if the controlled_by prop isn't set, then
-                    # it won't be in the response.
-
-                    ## CHECK FOR DUPLICATES: Be careful as some can be tricky, i.e.
-                    # ['/documents/id1', 'id1']
-                    # such a duplicate should be identified and removed, leaving us with ["id1"].
-                    # Checks for arrays of strings or of dicts.
-                    if len(val) == 0:
-                        continue
-                    if isinstance(val[0], str):
-                        profile_id = self.get_profile_from_payload(payload)
-                        payload[key] = self.profiles.remove_duplicate_associations(val)
-                    elif isinstance(val[0], dict):
-                        payload[key] = iuu.remove_duplicate_objects(val)
+            payload = self._extend_patch_array_values(payload, rec_json)
 
         # Run 'before' hooks:
         payload = self.before_submit_hooks(payload, method=self.PATCH)
-        payload.pop(self.IGVFID_KEY)
-        if self.PROFILE_KEY in payload:
-            # Some client software may add this key in; won't hurt to remove it.
-            payload.pop(self.PROFILE_KEY)
-
-        url = iuu.url_join([self.igvf_mode.url, igvf_id.lstrip("/")])
-        self.debug_logger.debug(
-            ("<<<<<< PATCHING {igvf_id} To IGVF database with URL"
-             " {url} and this payload:\n\n{payload}\n\n").format(
-                 igvf_id=igvf_id, url=url, payload=iuu.print_format_dict(payload)))
+        url = self._prepare_patch_payload(igvf_id, payload)
 
         if self.check_dry_run():
             return {}
-        response = requests.patch(url, auth=self.auth, timeout=iu.TIMEOUT, headers=iuu.REQUEST_HEADERS_JSON,
-                                  json=payload, verify=False)
+        response = self.session.patch(url, timeout=iu.TIMEOUT, json=payload)
         response_json = response.json()
 
         if response.ok:
@@ -1221,6 +1548,65 @@ class Connection:
         self.debug_logger.debug(iuu.print_format_dict(response_json))
         response.raise_for_status()
 
+    def _extend_patch_array_values(self, payload, rec_json):
+        """
+        Extends the array values in a PATCH payload with the corresponding values of the record
+        on the Portal, removing any duplicates. Used by ``self.patch()`` when
+        ``extend_array_values=True``.
+
+        Args:
+            payload: `dict`. The PATCH payload.
+            rec_json: `dict`. The JSON serialization of the record, fetched with ``frame="edit"``.
+
+        Returns:
+            `dict`: The updated payload.
+        """
+        for key in payload:
+            if isinstance(payload[key], list):
+                val = payload[key]
+                val.extend(rec_json.get(key, []))
+                # I use rec_json.get(key,[]) above because in a GET request,
+                # not all props are pulled back when they are empty.
+                # For ex, in a file object, if the controlled_by prop isn't set, then
+                # it won't be in the response.
+
+                ## CHECK FOR DUPLICATES: Be careful as some can be tricky, i.e.
+                # ['/documents/id1', 'id1']
+                # such a duplicate should be identified and removed, leaving us with ["id1"].
+                # Checks for arrays of strings or of dicts.
+                if len(val) == 0:
+                    continue
+                if isinstance(val[0], str):
+                    profile_id = self.get_profile_from_payload(payload)
+                    payload[key] = self.profiles.remove_duplicate_associations(val)
+                elif isinstance(val[0], dict):
+                    payload[key] = iuu.remove_duplicate_objects(val)
+        return payload
+
+    def _prepare_patch_payload(self, igvf_id, payload):
+        """
+        Removes the non-schematic keys from a PATCH payload that has been through the pre-PATCH
+        hooks, and logs the PATCH that is about to be sent.
+
+        Args:
+            igvf_id: `str`. The identifier of the record to PATCH.
+            payload: `dict`. The PATCH payload.
+
+        Returns:
+            `str`: The URL to send the PATCH request to.
+        """
+        payload.pop(self.IGVFID_KEY)
+        if self.PROFILE_KEY in payload:
+            # Some client software may add this key in; won't hurt to remove it.
+            payload.pop(self.PROFILE_KEY)
+
+        url = iuu.url_join([self.igvf_mode.url, igvf_id.lstrip("/")])
+        self.debug_logger.debug(
+            ("<<<<<< PATCHING {igvf_id} To IGVF database with URL"
+             " {url} and this payload:\n\n{payload}\n\n").format(
+                 igvf_id=igvf_id, url=url, payload=iuu.print_format_dict(payload)))
+        return url
+
     def remove_props(self, rec_id, props=[]):
         """Runs a PUT request to remove properties of interest on the specified record.
 
@@ -1269,14 +1655,7 @@ class Connection:
             )
         if self.check_dry_run():
             return
-        response = requests.put(
-            url,
-            auth=self.auth,
-            timeout=iu.TIMEOUT,
-            headers=iuu.REQUEST_HEADERS_JSON,
-            json=editable_json,
-            verify=False
-        )
+        response = self.session.put(url, timeout=iu.TIMEOUT, json=editable_json)
         response.raise_for_status()
         self.debug_logger.debug("Success")
         response_json = response.json()
@@ -1394,14 +1773,7 @@ class Connection:
 
         if self.check_dry_run():
             return {}
-        response = requests.put(
-            url,
-            auth=self.auth,
-            timeout=iu.TIMEOUT,
-            headers=iuu.REQUEST_HEADERS_JSON,
-            json=payload,
-            verify=False
-        )
+        response = self.session.put(url, timeout=iu.TIMEOUT, json=payload)
         response_json = response.json()
 
         if response.ok:
@@ -1424,25 +1796,31 @@ class Connection:
         response.raise_for_status()
 
 
-    def get_fastqfiles_on_exp(self, exp_id):
+    def get_fastqfiles_on_exp(self, exp_id, fields=None):
         """Returns a list of all FASTQ file objects in the experiment.
 
         Args:
             exp_id: `str`. An Experiment identifier.
+            fields: `list`. If set, only the specified properties of each file object are
+                returned. Otherwise, the full embedded file objects are returned.
 
         Returns:
             `list`: Each element is the JSON form of a FASTQ file record.
         """
         fastq_records_json = []
-        exp_json = self.get(exp_id, ignore404=False)
-        files = exp_json["files"]
+        if fields:
+            exp_fields = ["files." + f for f in set(fields) | {"file_type"}]
+            exp_json = self.get(exp_id, ignore404=False, fields=exp_fields)
+        else:
+            exp_json = self.get(exp_id, ignore404=False)
+        files = exp_json.get("files", [])
         for file_json in files:
             if file_json["file_type"] != "fastq":
                 continue  # this is not a file object for a FASTQ file.
             fastq_records_json.append(file_json)
         return fastq_records_json
 
-    def get_fastqfile_replicate_hash(self, exp_id):
+    def get_fastqfile_replicate_hash(self, exp_id, fields=None):
         """
         Given an IGVF experiment ID, gets its JSON representation from the Portal and looks in the
         `original` property to find FASTQ file objects and creates a `dict` organized by replicate
@@ -1451,6 +1829,9 @@ class Connection:
 
         Args:
             exp_id: `str`. An Experiment identifier.
+            fields: `list`. If set, only the specified properties of each file object are
+                included, in addition to those needed to organize the files by replicate.
+                Otherwise, the full embedded file objects are included.
         Returns:
             `dict`: `dict` where each key is a biological_replicate_number.
             The value of each key is another `dict` where each key is a technical_replicate_number.
@@ -1458,7 +1839,13 @@ class Connection:
             1 for forward reads, 2 for reverse reads.  The value
             for a given key of this most inner dictionary is a list of JSON-serialized file objects.
         """
-        fastq_file_records = self.get_fastqfiles_on_exp(exp_id)
+        if fields:
+            fields = set(fields) | {
+                "replicate.biological_replicate_number",
+                "replicate.technical_replicate_number",
+                "paired_end"
+            }
+        fastq_file_records = self.get_fastqfiles_on_exp(exp_id, fields=fields)
         dico = {}
         for file_json in fastq_file_records:
             brn = file_json["replicate"]["biological_replicate_number"]
@@ -1551,10 +1938,8 @@ class Connection:
         """
         self.debug_logger.debug("Attempting to generate new file upload credentials")
 
-        response = requests.post(
+        response = self.session.post(
             iuu.url_join([self.igvf_mode.url, "files", file_id, "@@upload"]),
-            auth=self.auth,
-            headers=iuu.REQUEST_HEADERS_JSON,
             json = {},
             timeout=iu.TIMEOUT)
         response_json = response.json()
@@ -1589,7 +1974,7 @@ class Connection:
 
         # Don't log the full response as it contains sensitive security information.
 
-    def gcp_transfer_urllist(self, file_ids, filename):
+    def gcp_transfer_urllist(self, file_ids, filename, workers=None):
         """
         Creates a "URL list" file to be used by the Google Storage Transfer Service (STS); see documentation at 
         https://cloud.google.com/storage-transfer/docs/create-url-list. Once the URL list is created,
@@ -1598,22 +1983,53 @@ class Connection:
         clicking on your file name (while in the GCP Console) and then copying the URL shown in your 
         Web browser, which can in turn be pasted directly in the Google STS.
 
+        The file records are fetched in batches of ``GET_MANY_CHUNK_SIZE`` through the search
+        endpoint, and the URLs of each batch are resolved by `workers` threads while the next batch
+        is fetched. Lines are written as soon as their URL is resolved, in the order of `file_ids`,
+        to a temporary file that is only moved to `filename` once the list is complete.
+
         Args:
             file_ids: `list` of file identifiers. The corresponding S3 objects must have public read
                 permission as required for the URL list.
             filename: `str`. The output filename in TSV format, which can be fed into the Google STS.
+            workers: `int`. The number of URLs resolved concurrently. Defaults to
+                ``self.pool_maxsize``, the number of connections to the Portal that are pooled.
+
+        Raises:
+            igvf_utils.exceptions.RecordNotFound: A file record doesn't exist.
         """
-        fout = open(filename, 'w')
-        fout.write("TsvHttpData-1.0\n")
-        for i in file_ids:
-            url = self.s3_object_path(rec_id=i, url=True)
-            # One with IGVF API keys can get the URL in a more straightforward manner by doing a GET on
-            # the files @@upload endpoint. But this even requires AWS keys even when the file in 
-            # question is released. For broader community support, the above workaround is in use.
-            rec = self.get(i, ignore404=False)
+        def write_line(fout, rec, future):
             md5 = base64.b64encode(bytes.fromhex(rec["md5sum"]))
-            fout.write("\t".join([url, str(rec["file_size"]), md5.decode("utf-8")]) + "\n")
-        fout.close()
+            fout.write("\t".join([future.result(), str(rec["file_size"]), md5.decode("utf-8")]) + "\n")
+
+        # One with IGVF API keys can get the URL in a more straightforward manner by doing a GET on
+        # the files @@upload endpoint. But this even requires AWS keys even when the file in 
+        # question is released. For broader community support, the redirect of the download URL
+        # is used instead.
+        tmp_filename = "{}.{}.tmp".format(filename, os.getpid())
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers or self.pool_maxsize) as executor, \
+                    open(tmp_filename, "w") as fout:
+                fout.write("TsvHttpData-1.0\n")
+                # The records of the lines to write, in order, along with the future URL of each.
+                pending = collections.deque()
+                for i in range(0, len(file_ids), GET_MANY_CHUNK_SIZE):
+                    chunk = file_ids[i:i + GET_MANY_CHUNK_SIZE]
+                    records = self.get_many(
+                        chunk, fields=["@type", "href", "md5sum", "file_size"], fallback=True)
+                    for file_id in chunk:
+                        rec = records[file_id]
+                        if not rec:
+                            raise RecordNotFound("File '{}' not found.".format(file_id))
+                        pending.append((rec, executor.submit(self._resolve_s3_object_path, rec, url=True)))
+                    while pending and pending[0][1].done():
+                        write_line(fout, *pending.popleft())
+                while pending:
+                    write_line(fout, *pending.popleft())
+            os.replace(tmp_filename, filename)
+        finally:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
 
     def gcp_transfer_from_aws(self, file_ids, gcp_bucket, gcp_project, description="", aws_creds=()):
         """
@@ -1639,9 +2055,8 @@ class Connection:
         Returns:
             `dict`: The JSON response representing the newly created transferJob.
         """
-        s3_paths = []
-        for i in file_ids:
-            s3_paths.append(self.s3_object_path(rec_id=i))
+        s3_object_paths = self.s3_object_paths(file_ids)
+        s3_paths = [s3_object_paths[i] for i in file_ids]
         t = igvf_utils.transfer_to_gcp.Transfer(gcp_project=gcp_project, aws_creds=aws_creds)
         # Figure out the s3 bucket by looking at the first s3 object. All specified s3 files should
         # from the same bucket.
@@ -1649,6 +2064,86 @@ class Connection:
         transfer_job = t.from_s3(s3_bucket=s3_bucket, s3_paths=s3_paths, gcp_bucket=gcp_bucket, description=description)
         return transfer_job
 
+    def gcp_bulk_transfer_from_aws(self, file_ids, gcp_bucket, gcp_project, description="",
+                                   aws_creds=(), manifest=None, wait=True, workers=4):
+        """
+        Like :meth:`gcp_transfer_from_aws`, but for any number of files. The S3 object paths are
+        resolved concurrently with :meth:`s3_object_paths`, and split into transferJobs of at most
+        ``igvf_utils.transfer_to_gcp.MAX_PREFIXES_PER_JOB`` files each, which are created
+        concurrently. See :meth:`igvf_utils.transfer_to_gcp.Transfer.from_s3_batched`.
+
+        Args:
+            file_ids: `list`. IGVF File object identifiers.
+            gcp_bucket: `str`. See :meth:`gcp_transfer_from_aws`.
+            gcp_project: `str`. See :meth:`gcp_transfer_from_aws`.
+            description: `str`. See :meth:`igvf_utils.transfer_to_gcp.Transfer.from_s3_batched`.
+            aws_creds: `tuple`. See :meth:`gcp_transfer_from_aws`.
+            manifest: `str`. If set, the path of a TSV file to write the transferJob of each
+                file to, along with the status of the transferJob; see below.
+            wait: `bool`. True means to wait for the transferJobs to finish with
+                :meth:`igvf_utils.transfer_to_gcp.Transfer.wait_for_jobs`. Otherwise, the status
+                of each file is 'SUBMITTED'.
+            workers: `int`. The number of transferJobs created concurrently.
+
+        Returns:
+            `dict`: The aggregate status, with the keys:
+
+                * jobs: `dict`. Each key is a transferJob name, and each value its final status.
+                * files: `dict`. The number of files with each status.
+                * counters: `dict`. The `counters` of the transferOperations, i.e.
+                  `objectsCopiedToSink`, summed over all transferJobs.
+
+            The Storage Transfer Service only reports statuses per transferJob, so a file is
+            counted with the status of its transferJob, except that files listed in the error log
+            of the transferOperation are 'FAILED'. Since the error log only holds a sample of the
+            errors, a file of a transferJob that 'FAILED', or that 'SUCCESS'fully finished with
+            errors, isn't guaranteed to have been copied or not; compare the `counters` with the
+            number of files, or check the objects in the GCP bucket to be sure.
+        """
+        s3_object_paths = self.s3_object_paths(file_ids)
+        t = igvf_utils.transfer_to_gcp.Transfer(gcp_project=gcp_project, aws_creds=aws_creds)
+        jobs = t.from_s3_batched(
+            s3_paths=[s3_object_paths[i] for i in file_ids],
+            gcp_bucket=gcp_bucket,
+            description=description,
+            workers=workers)
+        job_names = [job["name"] for job, _ in jobs]
+        if wait:
+            metadata = t.wait_for_jobs(job_names)
+        else:
+            metadata = {name: {"status": "SUBMITTED"} for name in job_names}
+
+        # The transferJob and status of each S3 object.
+        file_status = {}
+        for job, s3_paths in jobs:
+            meta = metadata[job["name"]]
+            failed = set()
+            for breakdown in meta.get("errorBreakdowns", []):
+                for entry in breakdown.get("errorLogEntries", []):
+                    failed.add(entry.get("url"))
+            for s3_path in s3_paths:
+                status = "FAILED" if s3_path in failed else meta.get("status")
+                file_status[s3_path] = (job["name"], status or "UNKNOWN")
+
+        counters = {}
+        for meta in metadata.values():
+            for key, value in meta.get("counters", {}).items():
+                counters[key] = counters.get(key, 0) + int(value)
+        files = {}
+        for _, status in file_status.values():
+            files[status] = files.get(status, 0) + 1
+        if manifest:
+            with open(manifest, "w") as fout:
+                fout.write("\t".join(["file_id", "s3_path", "job_name", "job_status"]) + "\n")
+                for i in file_ids:
+                    job_name, status = file_status[s3_object_paths[i]]
+                    fout.write("\t".join([i, s3_object_paths[i], job_name, status]) + "\n")
+        return {
+            "jobs": {name: metadata[name].get("status") for name in job_names},
+            "files": files,
+            "counters": counters,
+        }
+
 
 #    def gsutil_copy_file_to_gcp(self, s3obj, gcp_dest, aws_creds=()):
 #        """
@@ -1689,7 +2184,9 @@ class Connection:
 #            raise S3ToGCPFailed(error_msg)
 #        self.debug_logger.debug("Copy to GCP successful.")
 
-    def upload_file(self, file_id, file_path=None, set_md5sum=False):
+    def upload_file(self, file_id, file_path=None, set_md5sum=False, multipart_chunksize=None,
+                    max_concurrency=igvf_utils.aws_storage.DEFAULT_MAX_CONCURRENCY, progress=True,
+                    callback=None, resumable=None):
         """
         Uploads a file to the Portal for the indicated file record. The file to upload can be
         specified by setting the `file_path` parameter, or by using the value of the IGVF file 
@@ -1718,9 +2215,20 @@ class Connection:
               Normally these two properties would already be set as they are required in the *file* profile,
               however, if the wrong file was originally uploaded, then they must be reset when 
               uploading a new file. 
+            multipart_chunksize: `int`. The minimum part size in bytes for multipart uploads;
+              see ``igvf_utils.aws_storage.S3FileUpload``.
+            max_concurrency: `int`. The number of threads uploading parts of the file concurrently.
+            progress: `bool`. Whether to write a progress bar to STDOUT.
+            callback: callable. Called with the number of bytes transferred as the upload
+              progresses; see ``igvf_utils.aws_storage.S3FileUpload``.
+            resumable: `bool`. For local files, whether to upload with
+              ``igvf_utils.aws_storage.S3FileUpload.upload_resumable()``, so that calling this method
+              again after an interrupted upload only uploads the missing parts. The upload
+              credentials are regenerated if they expire during the upload. Defaults to `True`
+              for local files of at least ``self.resumable_upload_threshold`` bytes.
 
         Raises:
-            igvf_utils.exceptions.FileUploadFailed: The return code of the AWS upload command was non-zero.
+            igvf_utils.exceptions.FileUploadFailed: The upload to AWS S3 failed.
 
         .. _`wiki documentation`: https://github.com/IGVF-DACC/igvf_utils/wiki/Configuration#aws-keys
         """
@@ -1744,89 +2252,44 @@ class Connection:
                         self.profiles.MD5SUM_NAME_PROP_NAME: md5sum,
                         self.profiles.FILE_SIZE_PROP_NAME: file_size})
 
-        cmd_args = "{file_path} {upload_url}".format(file_path=file_path, upload_url=aws_creds["UPLOAD_URL"])
-        if file_path.startswith("gs://"):
-            gs_file = igvf_utils.gc_storage.GSFile(name=file_path)
-            s3 = boto3.client(
-                "s3",
-                aws_access_key_id=aws_creds["AWS_ACCESS_KEY_ID"],
-                aws_secret_access_key=aws_creds["AWS_SECRET_ACCESS_KEY"],
-                aws_session_token=aws_creds["AWS_SESSION_TOKEN"],
-            )
-            s3_uri = aws_creds["UPLOAD_URL"]
-            path_parts = s3_uri.replace("s3://", "").split("/")
-            bucket = path_parts.pop(0)
-            key = "/".join(path_parts)
-            multipart_chunksize = self._calculate_multipart_chunksize(gs_file.size)
-            transfer_config = boto3.s3.transfer.TransferConfig(
-                multipart_chunksize=multipart_chunksize
-            )
-            self.debug_logger.debug("Uploading file %s to %s", gs_file.filename, s3_uri)
-            s3.upload_fileobj(gs_file, bucket, key, Config=transfer_config)
-            self.debug_logger.debug("Finished uploading file %s", gs_file.filename)
-            return
-        else:
-            cmd = "aws s3 cp"
-        cmd += " " + cmd_args
-        self.debug_logger.debug("Running command '{cmd}'.".format(cmd=cmd))
+        upload = igvf_utils.aws_storage.S3FileUpload(
+            upload_url=aws_creds["UPLOAD_URL"],
+            aws_creds=aws_creds,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+            progress=progress,
+            callback=callback,
+            refresh_credentials=lambda: self.extract_aws_upload_credentials(
+                self.regenerate_aws_upload_creds(file_id))
+        )
+        is_local = not file_path.startswith(("s3://", "gs://"))
+        if resumable is None:
+            resumable = (is_local and self.resumable_upload_threshold is not None
+                         and iuu.calculate_file_size(file_path) >= self.resumable_upload_threshold)
+        resumable = resumable and self.upload_journal_dir and is_local
+        self.debug_logger.debug("Uploading file {} to {}.".format(file_path, upload.upload_url))
         if self.check_dry_run():
             return
-        popen = subprocess.Popen(cmd,
-                                 shell=True,
-                                 env=os.environ.update(aws_creds),
-                                 stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE)
-        max_stdout_str_length = 0
-        for line in io.TextIOWrapper(popen.stdout, newline=""):
-            if line.startswith("Completed"):
-                current, total, original_text = self._parse_aws_upload_stdout(line)
-
-                pct_done = current/total
-                completed_scaled = int(pct_done*50)
-                completed_scaled_str = completed_scaled*'█'
-                incompleted_scaled = (50-completed_scaled)
-                incompleted_scaled_str = incompleted_scaled*' '
-
-                report_string = (
-                    f"\rUploading: [{completed_scaled_str}{incompleted_scaled_str}] "
-                    f"{str('{:.2f}%'.format(pct_done*100))} done ({original_text})"
-                )
-                if len(report_string) > max_stdout_str_length:
-                    max_stdout_str_length = len(report_string)
-                padding = ' '*(max_stdout_str_length-len(report_string))
-                sys.stdout.write(report_string + padding)
+        try:
+            if resumable:
+                journal_path = os.path.join(self.upload_journal_dir, file_rec["uuid"] + ".jsonl")
+                upload.upload_resumable(file_path, journal_path)
+            elif file_path.startswith("gs://"):
+                gs_file = igvf_utils.gc_storage.GSFile(name=file_path)
+                try:
+                    upload.upload_fileobj(gs_file, gs_file.size)
+                finally:
+                    gs_file.close()
             else:
-                sys.stdout.write("\n")
-            #sys.stdout.write('\r'+line)
-        popen.wait()
-
-        stdout, stderr = popen.communicate()
-        stdout = stdout.decode("utf-8")
-        stderr = stderr.decode("utf-8")
-        retcode = popen.returncode
-        if retcode:
+                upload.upload(file_path)
+        except (boto3.exceptions.Boto3Error, botocore.exceptions.BotoCoreError,
+                botocore.exceptions.ClientError) as e:
             error_msg = "Failed to upload file '{}' for {}.".format(file_path, file_id)
             self.log_error(error_msg)
-            error_msg = (" Subprocess command '{cmd}' failed with return code '{retcode}'."
-                         " Stdout is '{stdout}'.  Stderr is '{stderr}'.").format(
-                cmd=cmd, retcode=retcode, stdout=stdout, stderr=stderr)
-            self.debug_logger.debug(error_msg)
-            raise FileUploadFailed(error_msg)
+            self.debug_logger.debug(str(e))
+            raise FileUploadFailed("{} {}".format(error_msg, e)) from e
         self.debug_logger.debug("AWS upload successful.")
 
-    def _calculate_multipart_chunksize(self, file_size_bytes: int) -> int:
-        """
-        Calculates the `multipart_chunksize` to use for `boto3` `TransferConfig` to
-        ensure that the file can be uploaded successfully without reaching the 100000
-        part limit. The default values are the same as the defaults for `TransferConfig`
-        """
-        multipart_chunksize = BOTO3_DEFAULT_MULTIPART_CHUNKSIZE * (
-            max((file_size_bytes - 1), 0)
-            // (BOTO3_MULTIPART_MAX_PARTS * BOTO3_DEFAULT_MULTIPART_CHUNKSIZE)
-            + 1
-        )
-        return multipart_chunksize
-
     def get_platforms_on_experiment(self, rec_id):
         """
         Looks at all FASTQ files on the specified experiment, and tallies up the varying sequencing
@@ -1839,7 +2302,8 @@ class Connection:
         Returns:
             `list`: The de-duplicated list of platforms seen on the experiment's FASTQ files.
         """
-        fastq_files = self.get_fastqfiles_on_exp(rec_id)
+        fastq_files = self.get_fastqfiles_on_exp(
+            rec_id, fields=["platform.{}".format(iu.ALIAS_PROP_NAME)])
         platforms = []
         for fastq_json in fastq_files:
             platforms.extend(fastq_json["platform"][iu.ALIAS_PROP_NAME])
@@ -1881,12 +2345,20 @@ class Connection:
         response = self.post(payload=payload)
         return response['uuid']
 
-    def download(self, rec_id, get_stream=False, directory=None):
+    def download(self, rec_id, get_stream=False, directory=None, workers=None, range_size=None,
+                 verify_md5sum=True, host_limiter=None):
         """
         Downloads the contents of the specified file or document object from the IGVF Portal to
         either the calling directory or the indicated download directory. The downloaded file will
         be named as it is on the Portal.
 
+        File records are served by the Portal as a redirect to a presigned S3 URL. The object is then
+        fetched in byte ranges of `range_size` bytes over `workers` concurrent connections (see
+        ``igvf_utils.ranged_download.RangedDownload``), and written to a ``.part`` file that is
+        renamed once complete. Rerunning an interrupted download resumes from the ranges already
+        fetched. Documents, and files that the Portal serves without a redirect, are streamed over
+        a single connection.
+
         Alternatively, you can get a reference to the response object by setting the `get_stream`
         parameter to True. Useful if you want to inspect the response, i.e. see if there was a 
         redirect and where to, or download the byte stream in a customized manner.
@@ -1896,12 +2368,38 @@ class Connection:
            rec_id: `str`. An identifier for a file or document record on the Portal.
            directory: `str`. The full path to the directory in which to download the file. If not
                specified, then the file will be downloaded in the calling directory.
+           workers: `int`. The number of byte ranges fetched concurrently. Defaults to
+               ``igvf_utils.ranged_download.DEFAULT_WORKERS``.
+           range_size: `int`. The size in bytes of each range. Defaults to
+               ``igvf_utils.ranged_download.DEFAULT_RANGE_SIZE``.
+           verify_md5sum: `bool`. True means to check that the downloaded file has the md5sum of the
+               file record, if it has one.
+           host_limiter: ``igvf_utils.ranged_download.HostLimiter``. If set, caps the concurrent
+               requests to the Portal's download URL together with other downloads sharing it.
 
         Returns:
             `str`. The full path to the downloaded file if the `get_stream` parameter is False.
             `requests.models.Response`: The `get_stream` parameter is True.
+
+        Raises:
+            igvf_utils.exceptions.FileDownloadFailed: The downloaded file is incomplete or its
+                md5sum doesn't match the file record.
         """
         rec = self.get(rec_id, ignore404=False)
+        if get_stream:
+            url, auth = self._get_download_url(rec)
+            self.debug_logger.debug("GET file {} from URL {}.".format(rec_id, url))
+            return self._get_download_response(url, auth)
+        return self._download_record(rec, directory=directory, workers=workers,
+                                     range_size=range_size, verify_md5sum=verify_md5sum,
+                                     host_limiter=host_limiter)
+
+    def _get_download_url(self, rec):
+        """
+        Returns:
+            `tuple`: The download URL of a File or Document record on the Portal, and the auth to
+            send with requests for it.
+        """
         # Check whether we need to download a Document or File record.
         rec_type = rec["@type"]
         if "Document" in rec_type:
@@ -1911,63 +2409,290 @@ class Connection:
             file_type = True
             auth = self.auth
         else:
-            raise Exception("This method can only download records of type 'File' and 'Document'; '{}' is neither of these.".format(rec_id))
+            raise Exception("This method can only download records of type 'File' and 'Document'; '{}' is neither of these.".format(rec["@id"]))
         # Formulate download URL:
         if file_type:
             url = iuu.url_join([self.igvf_mode.url, rec["href"].lstrip("/")])
         else:
             url = iuu.url_join([self.igvf_mode.url, "documents", rec["uuid"], rec["attachment"]["href"]])
-        r = requests.get(
+        return url, auth
+
+    def _download_record(self, rec, directory=None, workers=None, range_size=None,
+                         verify_md5sum=True, host_limiter=None):
+        """
+        Downloads the file of a File or Document record; see ``self.download()``.
+
+        Returns:
+            `str`. The full path to the downloaded file.
+        """
+        url, auth = self._get_download_url(rec)
+        file_type = "File" in rec["@type"]
+        self.debug_logger.debug("GET file {} from URL {}.".format(rec["@id"], url))
+        limiter = host_limiter or igvf_utils.ranged_download.HostLimiter()
+        if file_type:
+            def resolve_redirect():
+                with limiter.limit(url):
+                    return self._resolve_download_redirect(url, auth)
+            redirect_url = resolve_redirect()
+            if redirect_url:
+                downloader = igvf_utils.ranged_download.RangedDownload(
+                    redirect_url,
+                    workers=workers or igvf_utils.ranged_download.DEFAULT_WORKERS,
+                    range_size=range_size or igvf_utils.ranged_download.DEFAULT_RANGE_SIZE,
+                    refresh_url=resolve_redirect)
+                try:
+                    downloader.probe()
+                    self.debug_logger.debug("File size: {:,.0f} bytes.".format(downloader.file_size))
+                    filename = downloader.filename or os.path.basename(
+                        urllib.parse.urlsplit(redirect_url).path)
+                    if directory:
+                        filename = os.path.join(directory, filename)
+                    md5sum = rec.get("md5sum") if verify_md5sum else None
+                    downloader.download(filename, md5sum=md5sum)
+                finally:
+                    downloader.close()
+                self.debug_logger.debug("Download complete: {}.".format(filename))
+                return filename
+        with limiter.limit(url):
+            r = self._get_download_response(url, auth)
+        with r:
+            content_length = r.headers.get("Content-Length")
+            if content_length:
+                self.debug_logger.debug("File size: {:,.0f} bytes.".format(int(content_length)))
+            if file_type:
+                filename = r.headers["Content-Disposition"].split("filename=")[-1].strip('"')
+            else:
+                filename = rec["attachment"]["download"]
+            if directory:
+                filename = os.path.join(directory,filename)
+            with open(filename, "wb") as fout:
+                for chunk in r.iter_content(chunk_size=igvf_utils.ranged_download.READ_CHUNK_SIZE):
+                    fout.write(chunk)
+        self.debug_logger.debug("Download complete: {}.".format(filename))
+        return filename
+
+    def _get_download_response(self, url, auth, allow_redirects=True):
+        """
+        Sends a streaming GET request for the raw content at a download URL of the Portal.
+
+        Returns:
+            `requests.models.Response`.
+        """
+        # Don't send the JSON content-type header of the session when fetching raw file content.
+        r = self.session.get(
             url,
             auth=auth,
-            stream = True,
-            timeout=iu.TIMEOUT,
-            verify=False)
+            headers={"content-type": None},
+            stream=True,
+            allow_redirects=allow_redirects,
+            timeout=iu.TIMEOUT)
         r.raise_for_status()
-        content_length = r.headers.get("Content-Length")
-        self.debug_logger.debug("GET file {} from URL {}.".format(rec_id, url))
-        if content_length:
-            self.debug_logger.debug("File size: {:,.0f} bytes.".format(int(content_length)))
-        if file_type:
-            filename = r.headers["Content-Disposition"].split("filename=")[-1]
-        else:
+        return r
+
+    def _resolve_download_redirect(self, url, auth):
+        """
+        Requests a download URL of the Portal without following the redirect that it responds with.
+
+        Returns:
+            `str`: The URL that the Portal redirects to, or None if it doesn't redirect.
+        """
+        r = self._get_download_response(url, auth, allow_redirects=False)
+        r.close()
+        if not r.is_redirect:
+            return None
+        return urllib.parse.urljoin(url, r.headers["Location"])
+
+    def download_many(self, rec_ids, directory=None, workers=4, per_host=None, manifest=None,
+                      range_workers=None, verify_md5sum=True):
+        """
+        Downloads the files of many File or Document records concurrently. The records are looked
+        up in bulk with ``self.get_many()``, which falls back to the database for records that
+        aren't indexed yet, and downloaded with ``self.download()`` by a pool of
+        `workers` threads. Files already in `directory` with the size and md5sum of their record,
+        i.e. from an earlier run, are skipped. A failure to download one file doesn't stop the
+        others from being downloaded.
+
+        Args:
+            rec_ids: `list`. Identifiers of File or Document records on the Portal.
+            directory: `str`. The directory in which to download the files. Defaults to the
+                calling directory.
+            workers: `int`. The number of files downloaded concurrently.
+            per_host: `int`. The maximum number of concurrent requests to the Portal's download
+                URLs. Defaults to ``igvf_utils.ranged_download.DEFAULT_PER_HOST``.
+            manifest: `str`. If set, the path of a TSV file to write the outcome of each download
+                to, with the columns of ``igvf_utils.ranged_download.DownloadResult``. Backslashes,
+                tabs and newlines in the values, i.e. in error messages, are backslash-escaped.
+            range_workers: `int`. The number of byte ranges of each file fetched concurrently;
+                see the `workers` argument of ``self.download()``.
+            verify_md5sum: `bool`. See ``self.download()``.
+
+        Returns:
+            `list`: A ``igvf_utils.ranged_download.DownloadResult`` for each identifier in
+            `rec_ids`, in the same order.
+        """
+        DownloadResult = igvf_utils.ranged_download.DownloadResult
+        records = self.get_many(
+            rec_ids, fields=["@type", "uuid", "href", "md5sum", "file_size", "attachment"],
+            fallback=True)
+        limiter = igvf_utils.ranged_download.HostLimiter(
+            per_host or igvf_utils.ranged_download.DEFAULT_PER_HOST)
+
+        def download(rec_id):
+            rec = records[rec_id]
+            if not rec:
+                return DownloadResult(rec_id, "not_found", "", "", "Record not found.")
+            md5sum = rec.get("md5sum", "")
+            path = self._get_local_download_path(rec, directory)
+            if path and self._is_downloaded(rec, path):
+                self.debug_logger.debug("Skipping download of {}; {} is up to date.".format(
+                    rec_id, path))
+                return DownloadResult(rec_id, "skipped", path, md5sum, "")
+            try:
+                path = self._download_record(
+                    rec, directory=directory, workers=range_workers,
+                    verify_md5sum=verify_md5sum, host_limiter=limiter)
+            except Exception as e:
+                self.log_error("Failed to download {}: {}".format(rec_id, e))
+                return DownloadResult(rec_id, "failed", path or "", md5sum, str(e))
+            return DownloadResult(rec_id, "downloaded", path, md5sum, "")
+
+        def escape(value):
+            return value.replace("\\", "\\\\").replace("\t", "\\t").replace(
+                "\n", "\\n").replace("\r", "\\r")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(download, rec_ids))
+        if manifest:
+            with open(manifest, "w") as fout:
+                fout.write("\t".join(DownloadResult._fields) + "\n")
+                for result in results:
+                    fout.write("\t".join(escape(str(v)) for v in result) + "\n")
+        return results
+
+    @staticmethod
+    def _get_local_download_path(rec, directory=None):
+        """
+        Returns:
+            `str`: The path that ``self.download()`` saves the file of a record to, or None if it
+            isn't known before the download starts.
+        """
+        if "File" in rec["@type"] and rec.get("href"):
+            filename = os.path.basename(rec["href"])
+        elif "Document" in rec["@type"] and rec.get("attachment"):
             filename = rec["attachment"]["download"]
+        else:
+            return None
         if directory:
-            filename = os.path.join(directory,filename)
-        fout = open(filename, "wb")
-        if get_stream:
-            return r
-        # Download in chunks of 512 bytes
-        for line in r.iter_content(chunk_size=512):
-            fout.write(line)
-        fout.close()
-        self.debug_logger.debug("Download complete: {}.".format(filename))
+            return os.path.join(directory, filename)
         return filename
 
+    @staticmethod
+    def _is_downloaded(rec, path):
+        """
+        Returns:
+            `bool`: True if the file at `path` has the size and md5sum of the File record `rec`.
+        """
+        if not rec.get("md5sum") or "file_size" not in rec or not os.path.isfile(path):
+            return False
+        if os.path.getsize(path) != rec["file_size"]:
+            return False
+        return iuu.calculate_md5sum(path) == rec["md5sum"]
+
     def s3_object_path(self, rec_id, url=False):
         """
         Given an IGVF File object's id (such as accession, uuid, alias), returns the full S3 object
         URI, or HTTP/HTTPS URI if url=True. 
 
+        The URI is read from the redirect that the Portal responds with to a request for the file's
+        download URL; the redirect isn't followed, so no file content is transferred. Use
+        :meth:`s3_object_paths` to resolve many files at once.
+
         Args:
             rec_id: `str`. An IGVF object identifier of the record to link the document to.
             url: `bool`. True means to return the HTTP/HTTPS URI of the file rather than the S3 URI.
                  Useful if this is a released file since you can download via the URL.
+
+        Raises:
+            igvf_utils.exceptions.RecordNotFound: The file record doesn't exist.
+        """
+        return self.s3_object_paths([rec_id], url=url)[rec_id]
+
+    def s3_object_paths(self, rec_ids, url=False, workers=None):
+        """
+        Batched version of :meth:`s3_object_path`. The File records are looked up in bulk with
+        ``self.get_many()``, and the redirects of their download URLs are resolved concurrently.
+
+        Args:
+            rec_ids: `list`. IGVF File object identifiers.
+            url: `bool`. See :meth:`s3_object_path`.
+            workers: `int`. The number of download URLs resolved concurrently. Defaults to
+                ``self.pool_maxsize``, the number of connections to the Portal that are pooled.
+
+        Returns:
+            `dict`: Each key is an identifier in `rec_ids`, and each value the S3 URI, or the
+            HTTP/HTTPS URI if url=True, of the file.
+
+        Raises:
+            igvf_utils.exceptions.RecordNotFound: A file record doesn't exist.
+        """
+        records = self.get_many(rec_ids, fields=["@type", "href"], fallback=True)
+        for rec_id, rec in records.items():
+            if not rec:
+                raise RecordNotFound("File record {} was not found.".format(rec_id))
+        return self._resolve_s3_object_paths(records, url=url, workers=workers)
+
+    def _resolve_s3_object_paths(self, records, url=False, workers=None):
+        """
+        Resolves the S3 object paths of File records; see :meth:`s3_object_paths`.
+
+        Args:
+            records: `dict`. Each key is a file identifier, and each value the JSON serialization
+                of its record, with at least the `@type` and `href` properties.
+
+        Returns:
+            `dict`: Each key is a key of `records`, and each value the S3 URI, or the HTTP/HTTPS URI
+            if url=True, of the file.
+        """
+        def resolve(rec_id):
+            return rec_id, self._resolve_s3_object_path(records[rec_id], url=url)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers or self.pool_maxsize) as executor:
+            return dict(executor.map(resolve, records))
+
+    def _resolve_s3_object_path(self, rec, url=False):
+        """
+        Resolves the S3 object path of a single File record; see :meth:`s3_object_paths`.
+        """
+        download_url, auth = self._get_download_url(rec)
+        redirect_url = self._resolve_download_redirect(download_url, auth)
+        if not redirect_url:
+            raise Exception("The download URL {} of {} isn't redirected to S3.".format(
+                download_url, rec["@id"]))
+        return self._parse_s3_redirect_url(redirect_url, url=url)
+
+    @staticmethod
+    def _parse_s3_redirect_url(redirect_url, url=False):
+        """
+        Extracts the location of an S3 object from the URL that the Portal redirects its download
+        URL to. That is either a (presigned) URL of the object, i.e.
+        https://igvf-files.s3.amazonaws.com/2023/05/12/4ae28cf4-c0a7-409f-8d8d-384ba692096a/IGVFFI0000AAAA.fastq.gz?X-Amz-...,
+        or such a URL behind a download proxy, i.e.
+        https://download.encodeproject.org/https://encode-files.s3.amazonaws.com/2017/05/12/...
+
+        Returns:
+            `str`: The S3 URI of the object, or the HTTP/HTTPS URI if url=True.
         """
-        response = self.download(rec_id=rec_id, get_stream=True)
-        redirect_url = response.url
-        # i.e. redirect_url is
-        # https://download.encodeproject.org/https://encode-files.s3.amazonaws.com/2017/05/12/4ae28
-        # cf4-c0a7-409f-8d8d-384ba692096a/ENCFF985JCJ.bigWig?response-content-disposition=attachment%3B%2 ...
         url_obj = urllib.parse.urlsplit(redirect_url)
         url_path = url_obj.path.lstrip("/")
-        # i.e. url_path is 'https://encode-files.s3.amazonaws.com/2017/05/12/4ae28cf4-c0a7-409f-8d8d-384ba692096a/ENCFF985JCJ.bigWig'
+        if re.match(r"https?:/", url_path):
+            url_obj = urllib.parse.urlsplit(url_path)
+        else:
+            url_path = "{}://{}/{}".format(url_obj.scheme, url_obj.netloc, url_path)
+        # i.e. url_path is 'https://igvf-files.s3.amazonaws.com/2023/05/12/4ae28cf4-c0a7-409f-8d8d-384ba692096a/IGVFFI0000AAAA.fastq.gz'
         if url:
             return url_path
-        s3_uri = url_path.replace(url_obj.scheme, "s3")
-        s3_uri = s3_uri.replace(".s3.amazonaws.com", "")
-        print(s3_uri)
-        return s3_uri
+        bucket = url_obj.netloc.split(".s3.")[0].split(".s3-")[0]
+        return "s3://{}/{}".format(bucket, url_obj.path.lstrip("/"))
 
 
 class IgvfMode:
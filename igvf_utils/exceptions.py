@@ -9,9 +9,15 @@ class AwardPropertyMissing(Exception):
     )
 
 
+class FileDownloadFailed(Exception):
+    """
+    Raised when a downloaded file is incomplete or doesn't match the md5sum of its file record.
+    """
+
+
 class FileUploadFailed(Exception):
     """
-    Raised when the AWS CLI returns a non-zero exit status.
+    Raised when uploading a file to AWS S3 fails.
     """
 
 
@@ -58,3 +64,11 @@ class S3ToGCPFailed(Exception):
     Raised when a file from an ENCODE S3 bucket fails to copy to a GCP bucket path.
     """
     pass
+
+
+class SearchIncomplete(Exception):
+    """
+    Raised when paging through search results stops returning hits before the reported total,
+    i.e. once past the Elasticsearch `max_result_window`.
+    """
+    pass
@@ -1,3 +1,4 @@
+import concurrent.futures
 import json
 from abc import ABC, abstractmethod
 from base64 import b64decode
@@ -6,6 +7,11 @@ from typing import Any, Dict, Optional
 from google.cloud.storage.blob import Blob
 from google.cloud.storage.client import Client
 
+#: The default size in bytes of the blocks that ``GSFile`` downloads with each request.
+DEFAULT_BLOCK_SIZE = 8 * 2**20
+#: The default number of blocks that ``GSFile`` downloads ahead of the current position.
+DEFAULT_READ_AHEAD = 4
+
 
 class File(ABC):
     """
@@ -39,6 +45,12 @@ class GSFile(File):
     """
     Wrapper around GCS blob class to better map to portal metadata and provide a read()
     interface for in-memory transfer to s3
+
+    The blob is downloaded in blocks of `block_size` bytes. While the caller consumes one
+    block, the next `read_ahead` blocks are downloaded concurrently by background threads, so
+    that at most ``read_ahead + 1`` blocks are held in memory. Reading sequentially, i.e. by
+    ``boto3``'s ``upload_fileobj()``, thus overlaps the GCS downloads with the consumer's work.
+    Call ``close()`` when done to stop the background threads.
     """
 
     SCHEME = "gs://"
@@ -47,14 +59,20 @@ class GSFile(File):
         self,
         name: str,
         client: Optional[Client] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        read_ahead: int = DEFAULT_READ_AHEAD,
     ) -> None:
         """
         Initializes self.pos to 0 for keeping track of number of bytes read from file.
         """
         super().__init__(name)
         self.pos = 0
+        self.block_size = block_size
+        self.read_ahead = read_ahead
         self._blob: Optional[Blob] = None
         self._client: Optional[Client] = client
+        self._blocks: Dict[int, concurrent.futures.Future] = {}
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
 
     @property
     def blob(self) -> Blob:
@@ -89,22 +107,67 @@ class GSFile(File):
 
     def read(self, num_bytes: Optional[int] = None) -> bytes:
         """
-        `Blob.download_as_string()` takes `start` and `end` kwargs to specify a byte
-        range. These are 0-indexed and inclusive of endpoints. If the position is
-        greater than or equal to the size of the object then we treat that as EOF and
-        return an empty byte string `b''`. As per Python convention, when read() is
-        called with no read size then the remainder of the file is returned.
-        See https://googleapis.dev/python/storage/latest/blobs.html#google.cloud.Blob.download_as_string
+        If the position is greater than or equal to the size of the object then we treat
+        that as EOF and return an empty byte string `b''`. As per Python convention, when
+        read() is called with no read size then the remainder of the file is returned.
+        A block that comes back shorter than expected, i.e. if the object was truncated since
+        its size was read, is also treated as EOF.
+        """
+        remaining = self.size - self.pos
+        if num_bytes is not None and num_bytes >= 0:
+            remaining = min(num_bytes, remaining)
+        chunks = []
+        while remaining > 0:
+            index, offset = divmod(self.pos, self.block_size)
+            block = self._get_block(index)
+            chunk = block[offset:offset + remaining]
+            if not chunk:
+                # The block is short, so there's no more data to read.
+                self._blocks.pop(index, None)
+                break
+            chunks.append(chunk)
+            self.pos += len(chunk)
+            remaining -= len(chunk)
+            if offset + len(chunk) >= len(block):
+                # Consumed the block entirely.
+                self._blocks.pop(index, None)
+        return b"".join(chunks)
+
+    def _fetch_block(self, index: int) -> bytes:
+        """
+        `Blob.download_as_bytes()` takes `start` and `end` kwargs to specify a byte
+        range. These are 0-indexed and inclusive of endpoints.
+        See https://googleapis.dev/python/storage/latest/blobs.html#google.cloud.Blob.download_as_bytes
+        """
+        start = index * self.block_size
+        end = min(start + self.block_size, self.size) - 1
+        return self.blob.download_as_bytes(start=start, end=end)
+
+    def _get_block(self, index: int) -> bytes:
+        """
+        Returns the content of the block at `index`, waiting for it to be downloaded if needed,
+        after scheduling the downloads of the blocks that follow it. Blocks before `index` are
+        discarded, since reads are expected to be sequential.
+        """
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, self.read_ahead), thread_name_prefix="iu_gsfile"
+            )
+        for stale in [i for i in self._blocks if i < index]:
+            self._blocks.pop(stale).cancel()
+        num_blocks = -(-self.size // self.block_size)
+        for i in range(index, min(index + self.read_ahead + 1, num_blocks)):
+            if i not in self._blocks:
+                self._blocks[i] = self._executor.submit(self._fetch_block, i)
+        return self._blocks[index].result()
+
+    def close(self) -> None:
+        """
+        Discards the buffered blocks and stops the background download threads.
         """
-        if self.pos >= self.size:
-            read_bytes = b""
-        else:
-            if num_bytes is None:
-                read_bytes = self.blob.download_as_string(start=self.pos)
-                self.pos += len(read_bytes)
-            else:
-                read_bytes = self.blob.download_as_string(
-                    start=self.pos, end=self.pos + num_bytes - 1
-                )
-                self.pos += num_bytes
-        return read_bytes
+        for future in self._blocks.values():
+            future.cancel()
+        self._blocks.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
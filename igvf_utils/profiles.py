@@ -12,9 +12,12 @@ the terms 'profile' and 'schema' are used interchangeably in this package.
 """
 
 import inflection
+import jsonschema
 import logging
+import os
 import requests
 import json
+import urllib
 
 import igvf_utils as iu
 import igvf_utils.utils as iuu
@@ -43,8 +46,13 @@ class IgvfSchema:
         self.name = name
         self.schema = schema
         self._properties = None
+        self._property_index = None
+        self._identifying_property_names = None
+        self._required_property_names = None
+        self._link_property_names = None
         self._non_writable_props = None
         self._writable_props = None
+        self._validator = None
 
     @property
     def properties(self):
@@ -53,16 +61,77 @@ class IgvfSchema:
             `list[IgvfSchemaProperty]`: A list of properties in the schema
         """
         if self._properties is None:
-            props = []
-            for prop_name, prop in self.schema["properties"].items():
-                is_identifying = prop_name in self.identifying_properties
-                is_required = prop_name in self.required_properties
-                props.append(
-                    IgvfSchemaProperty(prop_name, prop, is_required, is_identifying)
-                )
-            self._properties = props
+            self._properties = list(self.property_index.values())
         return self._properties
 
+    @property
+    def property_index(self):
+        """
+        Built once per schema.
+
+        Returns:
+            `dict`: Each key is a property name and each value the corresponding
+            `IgvfSchemaProperty`.
+        """
+        if self._property_index is None:
+            identifying = self.identifying_property_names
+            required = self.required_property_names
+            self._property_index = {
+                prop_name: IgvfSchemaProperty(
+                    prop_name, prop, prop_name in required, prop_name in identifying)
+                for prop_name, prop in self.schema["properties"].items()
+            }
+        return self._property_index
+
+    @property
+    def property_names(self):
+        """
+        Returns:
+            `dict_keys`: The names of the properties in the schema; supports constant-time
+            membership tests.
+        """
+        return self.property_index.keys()
+
+    @property
+    def validator(self):
+        """
+        A `jsonschema` validator for the schema, with format checking enabled. It is created on
+        first use and then reused for every payload validated against the schema, so that the
+        schema is checked and its `$ref` references are resolved only once.
+
+        Returns:
+            A `jsonschema` validator instance of the class matching the schema's `$schema`.
+        """
+        if self._validator is None:
+            cls = jsonschema.validators.validator_for(self.schema)
+            self._validator = cls(self.schema, format_checker=cls.FORMAT_CHECKER)
+        return self._validator
+
+    def validate(self, payload):
+        """
+        Validates a payload against the schema.
+
+        Args:
+            payload: `dict`. The payload to validate.
+
+        Returns:
+            `None` if the payload is valid, otherwise the two-item tuple described in
+            ``igvf_utils.utils.err_context()``.
+        """
+        return iuu.err_context(payload, self.schema, validator=self.validator)
+
+    def validate_many(self, payloads):
+        """
+        Validates many payloads against the schema, reusing ``self.validator`` for all of them.
+
+        Args:
+            payloads: `list` of `dict`. The payloads to validate.
+
+        Returns:
+            `list`: For each payload, in order, the return value of ``self.validate()``.
+        """
+        return [self.validate(payload) for payload in payloads]
+
     def get_property_from_name(self, name):
         """
         Args:
@@ -72,10 +141,9 @@ class IgvfSchema:
         Raises:
             `ValueError` if a property with `name` is not found.
         """
-        for prop in self.properties:
-            if prop.name == name:
-                return prop
-        raise ValueError("Could not find property {} in schema".format(name))
+        if name not in self.property_index:
+            raise ValueError("Could not find property {} in schema".format(name))
+        return self.property_index[name]
 
     @property
     def identifying_properties(self):
@@ -85,13 +153,23 @@ class IgvfSchema:
         """
         return self.schema["identifyingProperties"]
 
+    @property
+    def identifying_property_names(self):
+        """
+        Returns:
+            `frozenset`: The identifying property names.
+        """
+        if self._identifying_property_names is None:
+            self._identifying_property_names = frozenset(self.identifying_properties)
+        return self._identifying_property_names
+
     @property
     def has_award(self):
         """
         Returns:
             `bool`: Indicates if the schema has an `award` property present.
         """
-        return iu.AWARD_PROP_NAME in [p.name for p in self._properties]
+        return iu.AWARD_PROP_NAME in self.property_index
 
     @property
     def has_alias(self):
@@ -99,31 +177,30 @@ class IgvfSchema:
         Returns:
             `bool`: Indicates if the schema has an `alias` property present.
         """
-        return iu.ALIAS_PROP_NAME in [p.name for p in self._properties]
+        return iu.ALIAS_PROP_NAME in self.property_index
 
     @property
     def non_writable_props(self):
         """
-        A list of the property names that are non-writable. These are determined as
+        A `frozenset` of the property names that are non-writable. These are determined as
         properties in the schema whose subschemas include the property
         ``Profile.NOT_SUBMITTABLE_FLAG`` or the property ``Profile.READ_ONLY_FLAG``.
         """
         if self._non_writable_props is None:
-            for prop in self.properties:
-                if prop.is_not_submittable or prop.is_read_only:
-                    self.non_writable_props.append(prop.name)
+            self._non_writable_props = frozenset(
+                prop.name for prop in self.properties
+                if prop.is_not_submittable or prop.is_read_only
+            )
         return self._non_writable_props
 
     @property
     def writable_props(self):
         """
-        A list of the property names that are writable, which are those that don't
+        A `frozenset` of the property names that are writable, which are those that don't
         fall into the self.non_writable_props category.
         """
         if self._writable_props is None:
-            for prop in self.properties:
-                if not prop.is_not_submittable and not prop.is_read_only:
-                    self.writable_props.append(prop.name)
+            self._writable_props = frozenset(self.property_names) - self.non_writable_props
         return self._writable_props
 
     @property
@@ -140,6 +217,29 @@ class IgvfSchema:
         """
         return self.schema.get("required", [])
 
+    @property
+    def required_property_names(self):
+        """
+        Returns:
+            `frozenset`: The names in ``self.required_properties``.
+        """
+        if self._required_property_names is None:
+            self._required_property_names = frozenset(self.required_properties)
+        return self._required_property_names
+
+    @property
+    def link_property_names(self):
+        """
+        Returns:
+            `frozenset`: The names of the properties whose values, or array items, reference other
+            records, as marked by the `linkTo` keyword.
+        """
+        if self._link_property_names is None:
+            self._link_property_names = frozenset(
+                prop.name for prop in self.properties
+                if "linkTo" in prop.schema or "linkTo" in prop.schema.get("items", {}))
+        return self._link_property_names
+
     def filter_non_writable_props(self, rec_json, keep_identifying=False):
         """
         Filters out the non-writable properties from a record, using
@@ -153,7 +253,7 @@ class IgvfSchema:
         Returns:
             `dict`: The input minus any keys that aren't writable.
         """
-        for key in rec_json.keys():
+        for key in list(rec_json):
             prop = self.get_property_from_name(key)
             if keep_identifying and prop.is_identifying:
                 continue
@@ -170,6 +270,8 @@ class IgvfSchemaProperty:
     #: indicates whether the object is submittable.
     NOT_SUBMITTABLE_FLAG = "notSubmittable"
 
+    __slots__ = ("name", "schema", "is_required", "is_identifying")
+
     def __init__(self, prop_name, schema, is_required, is_identifying):
         """
         Indicates whether the provided property name is one that a user can submit when
@@ -223,6 +325,12 @@ class Profiles:
     payload passed to ``igvf_utils.connection.Connection.post()``.  This class is used
     to ensure that the profile specified there is a known profile on the Portal.
 
+    The profiles are cached on disk in the directory ``igvf_utils.CACHE_DIR``, in a file per Portal
+    host. When the cached copy is present, the Portal is only asked whether the profiles changed
+    since they were cached, by means of the `ETag` and `Last-Modified` response headers, and the
+    profiles are downloaded again only when they did. In offline mode, the cached copy is used
+    without contacting the Portal at all.
+
     Args:
         igvf_url: str. The portal URL being submitted to.
     """
@@ -252,14 +360,131 @@ class Profiles:
     #: Constant storing a property name of the File subclasses.
     FILE_SIZE_PROP_NAME = "file_size"
 
-    def __init__(self, igvf_url):
+    def __init__(self, igvf_url, session=None, cache_dir=None, offline=None):
         """
         Args:
             igvf_url: `str`. The igvf_url as specified by Connection.igvf_mode.url.
+            session: `requests.Session`. If set, the profiles are requested through this session,
+                i.e. ``igvf_utils.connection.Connection.session``, in order to reuse its
+                connections.
+            cache_dir: `str`. The directory to cache the profiles in. Defaults to
+                ``igvf_utils.CACHE_DIR``. Set to an empty string to disable the cache.
+            offline: `bool`. If `True`, then the cached profiles are used without checking the
+                Portal for changes; the Portal is only contacted when there is no cached copy.
+                Defaults to ``igvf_utils.OFFLINE``.
         """
         self.igvf_url = igvf_url
+        self.session = session
+        self.cache_dir = iu.CACHE_DIR if cache_dir is None else cache_dir
+        self.offline = iu.OFFLINE if offline is None else offline
         self._profiles = None
 
+    @property
+    def cache_file(self):
+        """
+        The path to the file caching the profiles of the Portal host in ``self.igvf_url``, or
+        `None` if caching is disabled. The response headers used for revalidation are stored
+        alongside it, in a file with the extension `.meta.json`.
+        """
+        if not self.cache_dir:
+            return None
+        host = urllib.parse.urlsplit(self.igvf_url).netloc or self.igvf_url
+        host = "".join(c if c.isalnum() or c in "-." else "_" for c in host)
+        return os.path.join(self.cache_dir, "profiles", host + ".json")
+
+    def _read_cache(self):
+        """
+        Reads the cached profiles.
+
+        Returns:
+            `tuple`: The cached profiles and the cached response headers (each a `dict`), or
+            ``(None, {})`` if there is no usable cached copy.
+        """
+        cache_file = self.cache_file
+        if not cache_file or not os.path.exists(cache_file):
+            return None, {}
+        try:
+            with open(cache_file) as fh:
+                profiles = json.load(fh)
+            meta = {}
+            meta_file = cache_file[:-len(".json")] + ".meta.json"
+            if os.path.exists(meta_file):
+                with open(meta_file) as fh:
+                    meta = json.load(fh)
+        except (OSError, ValueError) as e:
+            DEBUG_LOGGER.debug("Ignoring unreadable profiles cache {}: {}".format(cache_file, e))
+            return None, {}
+        return profiles, meta
+
+    def _write_cache(self, profiles, meta):
+        """
+        Caches the profiles and the response headers needed to revalidate them. Each file is
+        written to a temporary file first and then moved into place, so that concurrent
+        processes never read a partially written cache.
+
+        Args:
+            profiles: `dict`. The profiles as returned by the Portal.
+            meta: `dict`. The `ETag` and `Last-Modified` response headers.
+        """
+        cache_file = self.cache_file
+        if not cache_file:
+            return
+        meta_file = cache_file[:-len(".json")] + ".meta.json"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            for path, content in ((cache_file, profiles), (meta_file, meta)):
+                tmp_path = "{}.{}.tmp".format(path, os.getpid())
+                with open(tmp_path, "w") as fh:
+                    json.dump(content, fh)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            DEBUG_LOGGER.debug("Could not write profiles cache {}: {}".format(cache_file, e))
+
+    def _fetch_profiles(self):
+        """
+        Retrieves the profiles document from the Portal, or from the cache when it's known to be
+        up to date; see the class documentation for details.
+
+        Returns:
+            `dict`: The profiles as returned by the Portal.
+        """
+        cached_profiles, meta = self._read_cache()
+        if cached_profiles is not None and self.offline:
+            DEBUG_LOGGER.debug("Using cached profiles from {}.".format(self.cache_file))
+            return cached_profiles
+
+        url = iuu.url_join([self.igvf_url, iu.PROFILES_URL, "?format=json"])
+        headers = dict(iuu.REQUEST_HEADERS_JSON)
+        if cached_profiles is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        get = self.session.get if self.session is not None else requests.get
+        try:
+            response = get(url, timeout=iu.TIMEOUT, headers=headers)
+        except requests.exceptions.ConnectionError:
+            if cached_profiles is None:
+                raise
+            DEBUG_LOGGER.debug("Portal unreachable; using cached profiles from {}.".format(
+                self.cache_file))
+            return cached_profiles
+
+        if cached_profiles is not None and response.status_code == requests.codes.NOT_MODIFIED:
+            DEBUG_LOGGER.debug("Profiles unchanged; using cached profiles from {}.".format(
+                self.cache_file))
+            return cached_profiles
+        try:
+            profiles = response.json()
+        except json.decoder.JSONDecodeError:
+            raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
+        if response.ok:
+            self._write_cache(profiles, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            })
+        return profiles
+
     def _get_profiles(self):
         """
         Creates a dictionary storing all public profiles on the Portal.
@@ -273,13 +498,7 @@ class Profiles:
             `/profiles/genetic_modification.json`. The corresponding key in this `dict`
             is `genetic_modification`.
         """
-        url = iuu.url_join([self.igvf_url, iu.PROFILES_URL, "?format=json"])
-        try:
-            profiles = requests.get(url,
-                                    timeout=iu.TIMEOUT,
-                                    headers=iuu.REQUEST_HEADERS_JSON).json()
-        except json.decoder.JSONDecodeError:
-            raise Exception("JSONDecodeError: Check that your URL specified in -m is correct.")
+        profiles = self._fetch_profiles()
         # Remove the "private" profiles, since these have differing semantics.
         private_profiles = [x for x in profiles if x.startswith("_") or x.startswith("Testing")]  # i.e. _subtypes
         for i in private_profiles:
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+Contains the ``RangedDownload`` class for downloading large files, such as the S3 objects that
+the Portal redirects file downloads to, over several concurrent connections.
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import threading
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import igvf_utils as iu
+from igvf_utils.exceptions import FileDownloadFailed
+import igvf_utils.utils as iuu
+
+
+#: A debug ``logging`` instance.
+DEBUG_LOGGER = logging.getLogger(iu.DEBUG_LOGGER_NAME + "." + __name__)
+
+#: The default number of byte ranges that ``RangedDownload`` fetches concurrently.
+DEFAULT_WORKERS = 8
+#: The default size in bytes of the byte ranges that ``RangedDownload`` fetches.
+DEFAULT_RANGE_SIZE = 64 * 2**20
+#: The size in bytes of the chunks in which each response body is read and written.
+READ_CHUNK_SIZE = 2**20
+#: The suffix of the file that a download is written to until it is complete.
+PART_SUFFIX = ".part"
+#: The suffix of the journal recording which ranges of a ``PART_SUFFIX`` file are complete.
+JOURNAL_SUFFIX = ".part.jsonl"
+#: The default number of concurrent requests that ``HostLimiter`` allows per host.
+DEFAULT_PER_HOST = 4
+
+#: The outcome of downloading a record with ``igvf_utils.connection.Connection.download_many()``.
+#: `status` is one of 'downloaded', 'skipped' (a matching file was already present), 'not_found' or
+#: 'failed'; `error` is the empty string unless the download failed.
+DownloadResult = collections.namedtuple(
+    "DownloadResult", ["rec_id", "status", "path", "md5sum", "error"])
+
+
+def _pwrite(fd, data, offset, lock):
+    """
+    Writes `data` at `offset` in the file open as `fd` without moving a shared file position;
+    falls back to a locked seek and write where ``os.pwrite()`` isn't available.
+    """
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+    else:
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            os.write(fd, data)
+
+
+class HostLimiter:
+    """
+    Caps the number of concurrent requests sent to each host, so that many threads downloading at
+    once don't flood a single endpoint, i.e. the Portal's redirecting download URLs::
+
+        limiter = HostLimiter(per_host=2)
+        with limiter.limit(url):
+            requests.get(url)
+
+    Args:
+        per_host: `int`. The maximum number of concurrent requests per host.
+    """
+
+    def __init__(self, per_host=DEFAULT_PER_HOST):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def limit(self, url):
+        """
+        Blocks until fewer than `per_host` requests to the host of `url` are in progress, and
+        holds a slot for the duration of the ``with`` block.
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            yield
+
+
+class RangedDownload:
+    """
+    Downloads a URL by fetching byte ranges of it concurrently, each written straight to its
+    position in a preallocated ``PART_SUFFIX`` file. The completed ranges are recorded in a journal
+    next to it, so that an interrupted download resumes where it left off when run again with the
+    same destination. Once all ranges are fetched, the md5sum is optionally verified and the file
+    is renamed to its final name.
+
+    Requests are sent without the Portal's API keys, as the URL is expected to be a presigned URL
+    that the Portal redirected to. When the server doesn't support range requests, the file is
+    streamed over a single connection instead.
+
+    Args:
+        url: `str`. The URL to download.
+        workers: `int`. The number of ranges fetched concurrently.
+        range_size: `int`. The size in bytes of each range.
+        refresh_url: callable. If set, called without arguments when the server responds with a
+            403 status, i.e. because a presigned URL expired, and must return a new URL for the
+            same content.
+    """
+
+    def __init__(self, url, workers=DEFAULT_WORKERS, range_size=DEFAULT_RANGE_SIZE,
+                 refresh_url=None):
+        self.url = url
+        self.workers = workers
+        self.range_size = range_size
+        self.refresh_url = refresh_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        #: The size of the file in bytes, set by :meth:`probe`.
+        self.file_size = None
+        #: The file name given by the `Content-Disposition` response header, set by :meth:`probe`.
+        self.filename = None
+        #: Whether the server supports range requests, set by :meth:`probe`.
+        self.supports_ranges = None
+        self._url_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def _get(self, headers):
+        """
+        Sends a streaming GET request for ``self.url``, refreshing the URL once if it is rejected
+        with a 403 status.
+        """
+        url = self.url
+        response = self.session.get(url, headers=headers, stream=True, timeout=iu.TIMEOUT)
+        if response.status_code == requests.codes.FORBIDDEN and self.refresh_url is not None:
+            response.close()
+            with self._url_lock:
+                if self.url == url:
+                    DEBUG_LOGGER.debug("Download URL rejected; requesting a new one.")
+                    self.url = self.refresh_url()
+            response = self.session.get(self.url, headers=headers, stream=True, timeout=iu.TIMEOUT)
+        return response
+
+    def probe(self):
+        """
+        Requests the first byte of the file to find out its size and name, and whether the server
+        supports range requests.
+        """
+        response = self._get({"Range": "bytes=0-0"})
+        with response:
+            if response.status_code == requests.codes.REQUESTED_RANGE_NOT_SATISFIABLE:
+                # An empty file.
+                self.file_size = 0
+                self.supports_ranges = True
+            else:
+                response.raise_for_status()
+                if response.status_code == requests.codes.PARTIAL_CONTENT:
+                    self.file_size = int(response.headers["Content-Range"].rsplit("/", 1)[-1])
+                    self.supports_ranges = True
+                else:
+                    self.file_size = int(response.headers.get("Content-Length", -1))
+                    self.supports_ranges = False
+            disposition = response.headers.get("Content-Disposition", "")
+            if "filename=" in disposition:
+                self.filename = disposition.split("filename=")[-1].strip('"')
+
+    def download(self, filename, md5sum=None):
+        """
+        Downloads the file.
+
+        Args:
+            filename: `str`. The path to download the file to.
+            md5sum: `str`. If set, the md5sum that the downloaded file must have.
+
+        Returns:
+            `str`: `filename`.
+
+        Raises:
+            igvf_utils.exceptions.FileDownloadFailed: The downloaded file doesn't have the expected
+                size or md5sum. The partial download is removed in this case.
+            `requests.exceptions.HTTPError`: A request failed. The partial download is kept, to be
+                resumed later.
+        """
+        if self.file_size is None:
+            self.probe()
+        part_path = filename + PART_SUFFIX
+        journal_path = filename + JOURNAL_SUFFIX
+        if self.supports_ranges:
+            self._download_ranges(part_path, journal_path)
+        else:
+            self._download_stream(part_path)
+        if self.file_size >= 0 and os.path.getsize(part_path) != self.file_size:
+            self._discard(part_path, journal_path)
+            raise FileDownloadFailed("Downloaded {} bytes of {} but expected {}.".format(
+                os.path.getsize(part_path), filename, self.file_size))
+        if md5sum:
+            actual_md5sum = iuu.md5sum_local_file(part_path)
+            if actual_md5sum != md5sum:
+                self._discard(part_path, journal_path)
+                raise FileDownloadFailed("The md5sum of {} is {} but expected {}.".format(
+                    filename, actual_md5sum, md5sum))
+        os.replace(part_path, filename)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        return filename
+
+    @staticmethod
+    def _discard(part_path, journal_path):
+        for path in (part_path, journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _read_journal(self, journal_path):
+        """
+        Returns:
+            `set`: The indices of the ranges already downloaded, or an empty set if the journal
+            doesn't exist or belongs to a download of different size or range size.
+        """
+        if not os.path.exists(journal_path):
+            return set()
+        header = None
+        done = set()
+        with open(journal_path) as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if header is None:
+                    header = entry
+                else:
+                    done.add(entry["range"])
+        if header != {"file_size": self.file_size, "range_size": self.range_size}:
+            return set()
+        return done
+
+    def _download_ranges(self, part_path, journal_path):
+        done = set()
+        if os.path.exists(part_path) and os.path.getsize(part_path) == self.file_size:
+            done = self._read_journal(journal_path)
+        if not done:
+            with open(journal_path, "w") as fh:
+                fh.write(json.dumps({"file_size": self.file_size, "range_size": self.range_size}) + "\n")
+            with open(part_path, "wb") as fh:
+                fh.truncate(self.file_size)
+        num_ranges = -(-self.file_size // self.range_size)
+        missing = [i for i in range(num_ranges) if i not in done]
+        DEBUG_LOGGER.debug("Downloading {} of {} ranges of {} bytes.".format(
+            len(missing), num_ranges, self.range_size))
+        fd = os.open(part_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        journal_lock = threading.Lock()
+        try:
+            def fetch(index):
+                start = index * self.range_size
+                end = min(start + self.range_size, self.file_size) - 1
+                response = self._get({"Range": "bytes={}-{}".format(start, end)})
+                with response:
+                    response.raise_for_status()
+                    if response.status_code != requests.codes.PARTIAL_CONTENT:
+                        raise FileDownloadFailed(
+                            "Expected a partial response for range {}-{}.".format(start, end))
+                    offset = start
+                    for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                        _pwrite(fd, chunk, offset, self._write_lock)
+                        offset += len(chunk)
+                if offset != end + 1:
+                    raise FileDownloadFailed("Range {}-{} ended after {} bytes.".format(
+                        start, end, offset - start))
+                with journal_lock:
+                    with open(journal_path, "a") as fh:
+                        fh.write(json.dumps({"range": index}) + "\n")
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for future in [executor.submit(fetch, i) for i in missing]:
+                    future.result()
+        finally:
+            os.close(fd)
+
+    def _download_stream(self, part_path):
+        response = self._get({})
+        with response:
+            response.raise_for_status()
+            with open(part_path, "wb") as fout:
+                for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                    fout.write(chunk)
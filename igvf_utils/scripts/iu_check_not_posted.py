@@ -8,9 +8,9 @@
 ###
 
 """
-Checks if the specified record identifiers are found on the Portal or not by doing a GET request
-on each one. If a 404 (not found) response is returned, then this identifier is written to the
-specified output file.
+Checks if the specified record identifiers are found on the Portal or not by looking them up in
+batches through the search endpoint. Any identifier that isn't found is written to the specified
+output file. Records that were just submitted may not be found until they are indexed.
 """
 
 import argparse
@@ -51,17 +51,21 @@ def main():
     conn = Connection(igvf_mode)
 
     fh = open(infile, 'r')
-    fout = open(outfile, 'w')
+    rec_ids = []
     for line in fh:
         rec_id = line.strip()
         if not rec_id or rec_id.startswith("#"):
             continue
-        rec = conn.get(rec_id, ignore404=True)
-        if not rec:
+        rec_ids.append(rec_id)
+    fh.close()
+
+    records = conn.get_many(rec_ids, fields=["uuid"])
+    fout = open(outfile, 'w')
+    for rec_id in rec_ids:
+        if not records[rec_id]:
             print("'{}' not found.".format(rec_id))
             fout.write(rec_id + "\n")
     fout.close()
-    fh.close()
 
 
 if __name__ == "__main__":
@@ -35,6 +35,9 @@ def get_parser():
       one per line. Empty lines and lines starting with a '#' are skipped.""")
     parser.add_argument("-o", "--outfile", required=True, help="""
       The output URL list file name.""")
+    parser.add_argument("-w", "--workers", type=int, help="""
+      The number of file URLs to resolve concurrently. Defaults to the size of the connection
+      pool to the Portal.""")
 
     return parser
 
@@ -50,7 +53,7 @@ def main():
         # Default igvf_mode taken from environment variable IGVF_MODE.
         conn = iuc.Connection()
 
-    file_ids = args.file_ids
+    file_ids = args.file_ids or []
     infile = args.infile
     if infile:
         fh = open(infile)
@@ -61,7 +64,7 @@ def main():
             file_ids.append(line)
         fh.close()
             
-    conn.gcp_transfer_urllist(file_ids=file_ids, filename=outfile)
+    conn.gcp_transfer_urllist(file_ids=file_ids, filename=outfile, workers=args.workers)
 
 if __name__ == "__main__":
     main()
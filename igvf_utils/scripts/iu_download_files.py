@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Downloads the files of many File or Document records from the IGVF Portal concurrently. Files
+already present in the download directory with the size and md5sum of their record are skipped,
+so that the script can be rerun to complete an interrupted batch. The outcome of each download is
+written to a TSV manifest.
+"""
+
+import argparse
+import os
+import sys
+
+import igvf_utils.connection as iuc
+from igvf_utils.parent_argparser import igvf_login_parser
+import igvf_utils.ranged_download
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        parents=[igvf_login_parser],
+        formatter_class=argparse.RawTextHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("-f", "--file-ids", nargs="+", help="""
+      An alternative to --infile, one or more IGVF file or document identifiers.""")
+    group.add_argument("-i", "--infile", help="""
+      An alternative to --file-ids, the path to a file containing one or more identifiers,
+      one per line. Empty lines and lines starting with a '#' are skipped.""")
+    parser.add_argument("-d", "--directory", default=".", help="""
+      The directory to download the files to. Defaults to the current directory.""")
+    parser.add_argument("-o", "--manifest", help="""
+      The output TSV manifest of the downloads. Defaults to 'download_manifest.tsv' in the
+      download directory.""")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="""
+      The number of files to download concurrently. Defaults to 4.""")
+    parser.add_argument("--per-host", type=int,
+                        default=igvf_utils.ranged_download.DEFAULT_PER_HOST, help="""
+      The maximum number of concurrent requests to the Portal's download URLs. Defaults to {}.
+      """.format(igvf_utils.ranged_download.DEFAULT_PER_HOST))
+    parser.add_argument("--range-workers", type=int,
+                        default=igvf_utils.ranged_download.DEFAULT_WORKERS, help="""
+      The number of byte ranges of each file to download concurrently. Defaults to {}.
+      """.format(igvf_utils.ranged_download.DEFAULT_WORKERS))
+    return parser
+
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+    # Connect to the Portal
+    igvf_mode = args.igvf_mode
+    if igvf_mode:
+        conn = iuc.Connection(igvf_mode)
+    else:
+        # Default igvf_mode taken from environment variable IGVF_MODE.
+        conn = iuc.Connection()
+
+    file_ids = args.file_ids or []
+    if args.infile:
+        with open(args.infile) as fh:
+            for line in fh:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                file_ids.append(line)
+
+    os.makedirs(args.directory, exist_ok=True)
+    manifest = args.manifest or os.path.join(args.directory, "download_manifest.tsv")
+    results = conn.download_many(
+        file_ids,
+        directory=args.directory,
+        workers=args.workers,
+        per_host=args.per_host,
+        manifest=manifest,
+        range_workers=args.range_workers)
+    failed = [r for r in results if r.status in ("failed", "not_found")]
+    if failed:
+        print("{} of {} downloads failed; see {}.".format(len(failed), len(results), manifest))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ doesn't support the accession property, then the uuid will be returned.
 import argparse
 import igvf_utils
 from igvf_utils.connection import Connection
+from igvf_utils.exceptions import RecordNotFound
 from igvf_utils.parent_argparser import igvf_login_parser
 # igvf_login_parser contains the arguments needed for logging in to the
 # IGVF Portal, including which env.
@@ -59,29 +60,40 @@ def main():
     conn = Connection(igvf_mode=igvf_mode)
 
     fh = open(infile, 'r')
-    fout = open(outfile, 'w')
-    for line in fh:
+    lines = fh.readlines()
+    fh.close()
+    # The alias on each line, or None for lines to copy over as is.
+    aliases = []
+    for line in lines:
         alias = line.strip("\n").split("\t")[0]
         if not alias or alias.startswith("#"):
-            fout.write(line)
+            aliases.append(None)
             continue
-        alias_lab_prefix = alias.split(":", 1)
         try:
             lab_prefix, alias_name = alias.split(":", 1)
         except ValueError:
             if not submitter_lab:
                 raise Exception("Unknown submitting lab name for alias {}. See description for --submitter-lab argument.".format(alias))
             alias = submitter_lab + ":" + alias
-        rec = conn.get(rec_ids=alias, ignore404=False)
+        aliases.append(alias)
+
+    records = conn.get_many([a for a in aliases if a], fields=["accession", "uuid"], fallback=True)
+    fout = open(outfile, 'w')
+    for line, alias in zip(lines, aliases):
+        if alias is None:
+            fout.write(line)
+            continue
+        rec = records[alias]
+        if not rec:
+            raise RecordNotFound("Record with alias '{}' not found.".format(alias))
         try:
             dacc_id = rec["accession"]
         except KeyError:
             dacc_id = rec["uuid"]
         line = [line.strip("\n")]
-        outline = line.append(dacc_id)
+        line.append(dacc_id)
         fout.write("\t".join(line) + "\n")
     fout.close()
-    fh.close()
 
 if __name__ == "__main__":
     main()
@@ -13,6 +13,7 @@ Retrieves the aliases for the given set of DCC record identifiers.
 
 import argparse
 from igvf_utils.connection import Connection
+from igvf_utils.exceptions import RecordNotFound
 from igvf_utils.parent_argparser import igvf_login_parser
 # igvf_login_parser contains the arguments needed for logging in to the
 # IGVF Portal, including which env.
@@ -47,20 +48,29 @@ def main():
     conn = Connection(igvf_mode=igvf_mode)
 
     fh = open(infile, 'r')
+    lines = fh.readlines()
+    fh.close()
+    # The record ID on each line, or None for lines to copy over as is.
+    rec_ids = []
+    for line in lines:
+        rec_id = line.strip("\n").split("\t")[0]
+        if not rec_id or rec_id.startswith("#"):
+            rec_id = None
+        rec_ids.append(rec_id)
+
+    records = conn.get_many([r for r in rec_ids if r], fields=["aliases"], fallback=True)
     fout = open(outfile, 'w')
-    for line in fh:
-        rec = line.strip("\n").split("\t")[0]
-        if not rec or rec.startswith("#"):
+    for line, rec_id in zip(lines, rec_ids):
+        if rec_id is None:
             fout.write(line)
             continue
-        rec = conn.get(rec_ids=rec, ignore404=False)
-        aliases = rec["aliases"]
-        for a in aliases:
-            line = [line.strip("\n")]
-            outline = line.extend(aliases)
-            fout.write("\t".join(line) + "\n")
+        rec = records[rec_id]
+        if not rec:
+            raise RecordNotFound("Record '{}' not found.".format(rec_id))
+        line = [line.strip("\n")]
+        line.extend(rec.get("aliases", []))
+        fout.write("\t".join(line) + "\n")
     fout.close()
-    fh.close()
 
 
 if __name__ == "__main__":
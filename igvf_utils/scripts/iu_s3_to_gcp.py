@@ -49,6 +49,14 @@ def get_parser():
         AWS credentials. Provide them in the form `AWS_ACCESS_KEY_ID:AWS_SECRET_ACCESS_KEY`.
         Ideally, they'll be stored in the environment in variables by the same names. However, 
         for additional flexibility you can specify them here as well.""")
+    parser.add_argument("-o", "--manifest", help="""
+        The output TSV file listing the transfer job of each file and the job's status. Files
+        in the error log of their job are listed as FAILED, but as the log only holds a sample of
+        the errors, the status of a job that had errors doesn't say whether a given file was
+        copied.""")
+    parser.add_argument("--no-wait", action="store_true", help="""
+        Don't wait for the transfer jobs to finish. Files are split into jobs of at most 1000 files
+        each, and by default the script polls the jobs until they have all finished.""")
     return parser
 
 def main():
@@ -66,7 +74,7 @@ def main():
         # Default igvf_mode taken from environment variable IGVF_MODE.
         conn = iuc.Connection()
 
-    file_ids = args.file_ids
+    file_ids = args.file_ids or []
     infile = args.infile
     if infile:
         fh = open(infile)
@@ -79,8 +87,10 @@ def main():
             
     gcp_bucket = args.gcpbucket
     gcp_project = args.gcpproject
-    conn.gcp_transfer_from_aws(file_ids=file_ids, gcp_bucket=gcp_bucket, gcp_project=gcp_project, 
-                      description=desc, aws_creds=aws_creds)
+    status = conn.gcp_bulk_transfer_from_aws(
+        file_ids=file_ids, gcp_bucket=gcp_bucket, gcp_project=gcp_project, description=desc,
+        aws_creds=aws_creds, manifest=args.manifest, wait=not args.no_wait)
+    print(json.dumps(status, indent=4))
 
 if __name__ == "__main__":
     main()
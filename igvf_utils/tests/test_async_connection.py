@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the AsyncConnection class in the async_connection module.
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from igvf_utils.async_connection import AsyncConnection
+
+
+@pytest.fixture
+def async_conn(mocker):
+    mocker.patch("requests.get")
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    return AsyncConnection("https://www.foo.bar", no_log_file=True)
+
+
+def test_async_connection_get(async_conn):
+    def handler(request):
+        if request.url.path == "/IGVFSM000AAA/":
+            return httpx.Response(200, json={"accession": "IGVFSM000AAA"})
+        return httpx.Response(404, json={})
+
+    async def run():
+        async_conn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with async_conn:
+            found = await async_conn.get(["missing", "IGVFSM000AAA"])
+            missing = await async_conn.get("missing")
+        return found, missing
+
+    found, missing = asyncio.run(run())
+    assert found == {"accession": "IGVFSM000AAA"}
+    assert missing == {}
+    assert async_conn._client is None
+
+
+def test_async_connection_search(async_conn):
+    def handler(request):
+        assert request.url.params["type"] == "Biosample"
+        assert request.url.params["limit"] == "all"
+        return httpx.Response(200, json={"@graph": [{"accession": "IGVFSM000AAA"}]})
+
+    async def run():
+        async_conn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with async_conn:
+            return await async_conn.search([("type", "Biosample")])
+
+    assert asyncio.run(run()) == [{"accession": "IGVFSM000AAA"}]
+
+
+@pytest.fixture
+def profile(mocker):
+    profile = mocker.Mock(has_award=False, has_alias=True)
+    profile.name = "lab"
+    profile.validate.return_value = None
+    return profile
+
+
+def test_async_connection_post_runs_hooks(async_conn, mocker, profile):
+    mocker.patch.object(async_conn.conn, "get_profile_from_payload", return_value=profile)
+    mocker.patch.object(async_conn.conn, "_log_post")
+    before = mocker.patch.object(
+        async_conn.conn, "before_submit_hooks", side_effect=lambda payload, method: payload)
+    after = mocker.patch.object(async_conn.conn, "after_submit_hooks")
+
+    def handler(request):
+        assert request.method == "POST"
+        assert request.url.path == "/lab"
+        assert request.headers["content-type"] == "application/json"
+        return httpx.Response(201, json={"@graph": [{"uuid": "u1", "accession": "IGVFLB000AAA"}]})
+
+    async def run():
+        async_conn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with async_conn:
+            return await async_conn.post({"_profile": "lab", "aliases": ["foo:a"]})
+
+    assert asyncio.run(run()) == {"uuid": "u1", "accession": "IGVFLB000AAA"}
+    before.assert_called_once()
+    assert before.call_args.kwargs == {"method": "post"}
+    after.assert_called_once_with("IGVFLB000AAA", "lab", method="post", upload_file=True)
+
+
+def test_async_connection_patch_extends_arrays(async_conn, mocker, profile):
+    mocker.patch.object(async_conn.conn.profiles, "get_profile_from_id", return_value=profile)
+    mocker.patch.object(async_conn.conn, "get_profile_from_payload", return_value=profile)
+    mocker.patch.object(
+        async_conn.conn, "before_submit_hooks", side_effect=lambda payload, method: payload)
+    after = mocker.patch.object(async_conn.conn, "after_submit_hooks")
+    patched = {}
+
+    def handler(request):
+        if request.method == "GET":
+            assert request.url.params["frame"] == "edit"
+            return httpx.Response(200, json={"aliases": ["foo:a"]})
+        patched.update(json.loads(request.content))
+        return httpx.Response(200, json={"@graph": [{"uuid": "u1", "@id": "/labs/a/"}]})
+
+    async def run():
+        async_conn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with async_conn:
+            return await async_conn.patch({"_igvf_id": "labs/a", "aliases": ["foo:b"]})
+
+    assert asyncio.run(run()) == {"uuid": "u1", "@id": "/labs/a/"}
+    assert sorted(patched["aliases"]) == ["foo:a", "foo:b"]
+    after.assert_called_once_with("u1", "lab", method="patch", upload_file=True)
+
+
+def test_async_connection_download(async_conn, tmp_path):
+    def handler(request):
+        if request.url.path == "/IGVFFI0000AAAA/":
+            return httpx.Response(200, json={
+                "@type": ["SequenceFile", "File"],
+                "href": "/sequence-files/IGVFFI0000AAAA/@@download/IGVFFI0000AAAA.fastq.gz"})
+        assert "content-type" not in request.headers
+        return httpx.Response(
+            200, content=b"ACGT",
+            headers={"Content-Disposition": "attachment; filename=IGVFFI0000AAAA.fastq.gz"})
+
+    async def run():
+        async_conn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with async_conn:
+            return await async_conn.download("IGVFFI0000AAAA", directory=str(tmp_path))
+
+    filename = asyncio.run(run())
+    assert filename == str(tmp_path / "IGVFFI0000AAAA.fastq.gz")
+    assert (tmp_path / "IGVFFI0000AAAA.fastq.gz").read_bytes() == b"ACGT"
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests functions and classes in the aws_storage module.
+"""
+
+import os
+
+import botocore.exceptions
+import pytest
+
+from igvf_utils import aws_storage
+
+
+AWS_CREDS = {
+    "AWS_ACCESS_KEY_ID": "id",
+    "AWS_SECRET_ACCESS_KEY": "secret",
+    "AWS_SESSION_TOKEN": "token",
+}
+
+
+@pytest.mark.parametrize(
+    "file_size,expected",
+    [
+        (0, 8_388_608),
+        (8_388_608 * 10_000, 8_388_608),
+        (8_388_608 * 10_000 + 1, 16_777_216),
+    ]
+)
+def test_calculate_multipart_chunksize(file_size, expected):
+    assert aws_storage.calculate_multipart_chunksize(file_size) == expected
+
+
+def test_s3_file_upload_local_file(mocker, tmp_path):
+    client = mocker.patch("boto3.client").return_value
+    local_file = tmp_path / "reads.fastq.gz"
+    local_file.write_bytes(b"ACGT")
+    upload = aws_storage.S3FileUpload(
+        "s3://bucket/2023/uuid/IGVFFI0000AAAA.fastq.gz", AWS_CREDS, max_concurrency=4,
+        progress=False)
+    upload.upload(str(local_file))
+    args, kwargs = client.upload_file.call_args
+    assert args == (str(local_file), "bucket", "2023/uuid/IGVFFI0000AAAA.fastq.gz")
+    assert kwargs["Config"].max_concurrency == 4
+    assert kwargs["Callback"] is None
+
+
+def test_s3_file_upload_resumes_from_journal(mocker, tmp_path):
+    client = mocker.patch("boto3.client").return_value
+    local_file = tmp_path / "reads.fastq.gz"
+    local_file.write_bytes(b"A" * 10 + b"C" * 5)
+    journal_path = str(tmp_path / "journal.jsonl")
+    upload = aws_storage.S3FileUpload(
+        "s3://bucket/key.fastq.gz", AWS_CREDS, multipart_chunksize=10, progress=False)
+    stat = local_file.stat()
+    upload._write_journal_line(journal_path, {
+        "file_path": str(local_file.resolve()),
+        "file_size": 15,
+        "mtime_ns": stat.st_mtime_ns,
+        "upload_url": "s3://bucket/key.fastq.gz",
+        "upload_id": "upload-1",
+        "part_size": 10,
+    }, mode="w")
+    client.list_parts.return_value = {"Parts": [{"PartNumber": 1, "ETag": '"e1"', "Size": 10}]}
+    client.upload_part.return_value = {"ETag": '"e2"'}
+    upload.upload_resumable(str(local_file), journal_path)
+    client.create_multipart_upload.assert_not_called()
+    client.upload_part.assert_called_once_with(
+        Bucket="bucket", Key="key.fastq.gz", UploadId="upload-1", PartNumber=2, Body=b"C" * 5)
+    client.complete_multipart_upload.assert_called_once_with(
+        Bucket="bucket", Key="key.fastq.gz", UploadId="upload-1",
+        MultipartUpload={"Parts": [{"ETag": '"e1"', "PartNumber": 1},
+                                   {"ETag": '"e2"', "PartNumber": 2}]})
+    assert not os.path.exists(journal_path)
+
+
+def test_s3_file_upload_aborts_stale_upload(mocker, tmp_path):
+    client = mocker.patch("boto3.client").return_value
+    local_file = tmp_path / "reads.fastq.gz"
+    local_file.write_bytes(b"ACGT")
+    journal_path = str(tmp_path / "journal.jsonl")
+    upload = aws_storage.S3FileUpload("s3://bucket/key.fastq.gz", AWS_CREDS, progress=False)
+    # The file was modified since the interrupted upload.
+    upload._write_journal_line(journal_path, {
+        "file_path": str(local_file.resolve()), "file_size": 3, "upload_id": "upload-1"}, mode="w")
+    client.create_multipart_upload.return_value = {"UploadId": "upload-2"}
+    client.upload_part.return_value = {"ETag": '"e1"'}
+    client.complete_multipart_upload.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "InvalidPart"}}, "CompleteMultipartUpload")
+    with pytest.raises(botocore.exceptions.ClientError):
+        upload.upload_resumable(str(local_file), journal_path)
+    client.list_parts.assert_not_called()
+    assert [c.kwargs["UploadId"] for c in client.abort_multipart_upload.call_args_list] == [
+        "upload-1", "upload-2"]
+    assert not os.path.exists(journal_path)
+
+
+def test_s3_file_upload_refreshes_expired_credentials(mocker, tmp_path):
+    clients = [mocker.Mock(), mocker.Mock()]
+    mocker.patch("boto3.client", side_effect=clients)
+    expired = botocore.exceptions.ClientError(
+        {"Error": {"Code": "ExpiredToken"}}, "CreateMultipartUpload")
+    clients[0].create_multipart_upload.side_effect = expired
+    clients[1].create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    clients[1].upload_part.return_value = {"ETag": '"e1"'}
+    refresh_credentials = mocker.Mock(return_value=AWS_CREDS)
+    local_file = tmp_path / "reads.fastq.gz"
+    local_file.write_bytes(b"ACGT")
+    upload = aws_storage.S3FileUpload(
+        "s3://bucket/key.fastq.gz", AWS_CREDS, progress=False,
+        refresh_credentials=refresh_credentials)
+    upload.upload_resumable(str(local_file), str(tmp_path / "journal.jsonl"))
+    refresh_credentials.assert_called_once_with()
+    clients[1].complete_multipart_upload.assert_called_once()
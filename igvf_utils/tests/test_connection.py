@@ -11,13 +11,14 @@
 Tests logic in the Connection class in the connection module.
 """
 
+import itertools
 import os
 import unittest
 
 import igvf_utils as iu
 import igvf_utils.tests
 from igvf_utils.connection import Connection, IgvfMode, IgvfModes
-from igvf_utils.exceptions import ProfileNotSpecified
+from igvf_utils.exceptions import ProfileNotSpecified, RecordNotFound, SearchIncomplete
 from igvf_utils import profiles
 
 import pytest
@@ -62,6 +63,155 @@ def test_igvf_modes_get_mode():
     assert igvf_modes.get_mode("baz")
 
 
+def test_connection_session_is_pooled_and_shared(mocker):
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    conn = Connection("https://www.foo.bar", no_log_file=True, pool_maxsize=4)
+    session = conn.session
+    assert conn.session is session
+    assert session.auth == ("key", "secret")
+    assert session.headers["content-type"] == "application/json"
+    assert session.get_adapter("https://www.foo.bar")._pool_maxsize == 4
+
+
+def test_connection_get_uses_session(mocker):
+    mocker.patch("requests.get")
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    response = mocker.Mock(ok=True)
+    response.json.return_value = {"accession": "IGVFSM000AAA"}
+    session_get = mocker.patch.object(conn.session, "get", return_value=response)
+    assert conn.get("IGVFSM000AAA") == {"accession": "IGVFSM000AAA"}
+    session_get.assert_called_once_with(
+        "https://www.foo.bar/IGVFSM000AAA/?format=json", timeout=iu.TIMEOUT
+    )
+
+
+def test_connection_close_as_context_manager(mocker):
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    with Connection("https://www.foo.bar", no_log_file=True) as conn:
+        session = conn.session
+        close = mocker.patch.object(session, "close")
+    close.assert_called_once_with()
+    assert conn._session is None
+
+
+def test_get_many_batches_identifiers_by_property(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    records = [
+        {"@id": "/samples/IGVFSM000AAA/", "accession": "IGVFSM000AAA", "aliases": ["lab:a"]},
+        {"@id": "/samples/IGVFSM000BBB/", "accession": "IGVFSM000BBB", "aliases": ["lab:b"]},
+    ]
+
+    def search(search_args):
+        params = dict(search_args)
+        if "accession" in params:
+            return [r for r in records if ("accession", r["accession"]) in search_args]
+        return [r for r in records if ("aliases", r["aliases"][0]) in search_args]
+
+    mocker.patch.object(conn, "search", side_effect=search)
+    res = conn.get_many(
+        ["IGVFSM000AAA", "lab:a", "lab:b", "IGVFSM000CCC"], fields=["accession"], chunk_size=1
+    )
+    assert res == {
+        "IGVFSM000AAA": records[0],
+        "lab:a": records[0],
+        "lab:b": records[1],
+        "IGVFSM000CCC": {},
+    }
+    assert conn.search.call_count == 4
+    assert ("field", "aliases") in conn.search.call_args_list[-1].kwargs["search_args"]
+
+
+def test_get_many_fallback_to_get_is_opt_in(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    record = {"@id": "/samples/IGVFSM000AAA/", "accession": "IGVFSM000AAA"}
+    mocker.patch.object(conn, "search", return_value=[])
+    get = mocker.patch.object(conn, "get", side_effect=lambda rec_id, **kwargs: {
+        "IGVFSM000AAA": record}.get(rec_id, {}))
+    res = conn.get_many(["IGVFSM000AAA", "lab:b"], frame="object", fields=["accession"])
+    assert res == {"IGVFSM000AAA": {}, "lab:b": {}}
+    get.assert_not_called()
+    res = conn.get_many(
+        ["IGVFSM000AAA", "lab:b"], frame="object", fields=["accession"], fallback=True)
+    assert res == {"IGVFSM000AAA": record, "lab:b": {}}
+    get.assert_any_call("IGVFSM000AAA", database=True, frame="object")
+    assert get.call_count == 2
+
+
+def test_search_iter_pages_through_results(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    pages = [
+        {"@graph": [{"uuid": "1"}, {"uuid": "2"}], "total": 5},
+        {"@graph": [{"uuid": "3"}, {"uuid": "4"}], "total": 5},
+        {"@graph": [{"uuid": "5"}], "total": 5},
+    ]
+    get_results = mocker.patch.object(conn, "_get_search_results", side_effect=pages)
+    res = conn.search_iter(
+        [("type", "File")], url="https://www.foo.bar/search/?lab.title=Foo&limit=all", page_size=2)
+    assert [r["uuid"] for r in res] == ["1", "2", "3", "4", "5"]
+    urls = [c.args[0] for c in get_results.call_args_list]
+    assert urls[-1] == (
+        "https://www.foo.bar/search/?from=4&lab.title=Foo&limit=2&type=File"
+    )
+
+
+def test_search_iter_raises_when_results_are_truncated(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    pages = [
+        {"@graph": [{"uuid": "1"}, {"uuid": "2"}], "total": 5},
+        {"@graph": [], "total": 5},
+    ]
+    mocker.patch.object(conn, "_get_search_results", side_effect=pages)
+    res = conn.search_iter([("type", "File")], page_size=2)
+    assert [r["uuid"] for r in itertools.islice(res, 2)] == ["1", "2"]
+    with pytest.raises(SearchIncomplete):
+        next(res)
+
+
+def test_search_with_fields(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    get_results = mocker.patch.object(conn, "_get_search_results", return_value={"@graph": []})
+    conn.search([("type", "File")], fields=["md5sum", "accession"])
+    assert get_results.call_args.args[0] == (
+        "https://www.foo.bar/search/?field=accession&field=md5sum&type=File&limit=all"
+    )
+
+
+def test_get_with_fields_uses_get_many(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    get_many = mocker.patch.object(
+        conn, "get_many", return_value={"foo:a": {}, "IGVFFI0000AAAA": {"file_size": 3}})
+    res = conn.get(["foo:a", "IGVFFI0000AAAA"], fields=["file_size"])
+    assert res == {"file_size": 3}
+    get_many.assert_called_once_with(
+        ["foo:a", "IGVFFI0000AAAA"], frame=None, fields=["file_size"], fallback=True)
+    get_many.return_value = {"foo:a": {}}
+    assert conn.get("foo:a", fields=["file_size"]) == {}
+    with pytest.raises(RecordNotFound):
+        conn.get("foo:a", fields=["file_size"], ignore404=False)
+
+
+@pytest.mark.parametrize(
+    "rec_id,expected",
+    [
+        ("samples/IGVFSM000AAA", ("@id", "/samples/IGVFSM000AAA/")),
+        ("e44c59cc-f14a-4722-a9c5-2fe63c2b9533", ("uuid", "e44c59cc-f14a-4722-a9c5-2fe63c2b9533")),
+        ("lab:alias", ("aliases", "lab:alias")),
+        ("a3e7cb3df359d0642ab0edd33ea7e93e", ("md5sum", "a3e7cb3df359d0642ab0edd33ea7e93e")),
+        ("IGVFSM000AAA", ("accession", "IGVFSM000AAA")),
+    ],
+)
+def test_get_lookup_property(mocker, rec_id, expected):
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    assert conn._get_lookup_property(rec_id) == expected
+
+
 class TestConnection(unittest.TestCase):
     """Tests the ``encode_utils.connection.py`` module.
     """
@@ -242,5 +392,180 @@ class TestConnection(unittest.TestCase):
         )
 
 
+def test_post_file_sets_md5sum_and_uploads(mocker, tmp_path):
+    mocker.patch("requests.get")
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    mocker.patch("igvf_utils.utils.get_checksum_cache", return_value=None)
+    reads = tmp_path / "reads.fastq.gz"
+    reads.write_bytes(b"ACGT")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    profiles_response = mocker.Mock(status_code=200, ok=True, headers={})
+    profiles_response.json.return_value = {
+        "SequenceFile": {
+            "$id": "/profiles/sequence_file.json",
+            "$schema": "http://json-schema.org/draft-04/schema#",
+            "type": "object",
+            "properties": {
+                "aliases": {"type": "array"},
+                "submitted_file_name": {"type": "string"},
+                "md5sum": {"type": "string"},
+                "file_size": {"type": "integer"},
+            },
+            "required": ["md5sum", "file_size"],
+            "identifyingProperties": ["aliases", "md5sum"],
+        },
+        "_subtypes": {},
+    }
+    conn._profiles = profiles.Profiles(
+        "https://www.foo.bar/", session=mocker.Mock(**{"get.return_value": profiles_response}),
+        cache_dir=str(tmp_path))
+    post_response = mocker.Mock(ok=True, status_code=201)
+    post_response.json.return_value = {"@graph": [{"accession": "IGVFFI0000AAAA"}]}
+    session_post = mocker.patch.object(conn.session, "post", return_value=post_response)
+    upload_file = mocker.patch.object(conn, "upload_file")
+    conn.post({conn.PROFILE_KEY: "sequence_file", "aliases": ["lab:reads"],
+               "submitted_file_name": str(reads)})
+    payload = session_post.call_args.kwargs["json"]
+    assert payload["md5sum"] == "f1f8f4bf413b16ad135722aa4591043e"
+    assert payload["file_size"] == 4
+    upload_file.assert_called_once_with(file_id="IGVFFI0000AAAA")
+
+
+def test_upload_queue_runs_uploads_in_background(mocker):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+
+    def fake_upload_file(file_id, **kwargs):
+        if file_id == "bad":
+            raise Exception("expired")
+
+    upload_file = mocker.patch.object(conn, "upload_file", side_effect=fake_upload_file)
+    queue = conn.enable_upload_queue(workers=2, max_bandwidth=10**9, part_concurrency=8)
+    good = queue.submit("good")
+    queue.submit("bad")
+    assert queue.get_future("good") is good
+    assert queue.get_future("other") is None
+    results = queue.drain()
+    assert [(r.file_id, r.error) for r in results] == [("good", ""), ("bad", "expired")]
+    assert upload_file.call_args.kwargs["max_concurrency"] == 4
+    assert upload_file.call_args.kwargs["callback"] == queue.limiter.consume
+
+
+def test_download_many_skips_present_files(mocker, tmp_path):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    (tmp_path / "A.fastq.gz").write_bytes(b"ACGT")
+    mocker.patch.object(conn, "get_many", return_value={
+        "A": {"@id": "/sequence-files/A/", "@type": ["SequenceFile", "File"],
+              "href": "/sequence-files/A/@@download/A.fastq.gz",
+              "md5sum": "f1f8f4bf413b16ad135722aa4591043e", "file_size": 4},
+        "B": {"@id": "/sequence-files/B/", "@type": ["SequenceFile", "File"],
+              "href": "/sequence-files/B/@@download/B.fastq.gz", "md5sum": "abc", "file_size": 4},
+        "C": {},
+    })
+    mocker.patch("igvf_utils.utils.get_checksum_cache", return_value=None)
+    download_record = mocker.patch.object(
+        conn, "_download_record", side_effect=Exception("Bad\tresponse:\nTimeout"))
+    manifest = tmp_path / "manifest.tsv"
+    results = conn.download_many(["A", "B", "C"], directory=str(tmp_path), manifest=str(manifest))
+    assert [r.status for r in results] == ["skipped", "failed", "not_found"]
+    download_record.assert_called_once()
+    lines = manifest.read_text().splitlines()
+    assert lines[0] == "rec_id\tstatus\tpath\tmd5sum\terror"
+    assert lines[2] == "B\tfailed\t{}\tabc\tBad\\tresponse:\\nTimeout".format(
+        tmp_path / "B.fastq.gz")
+
+
+@pytest.mark.parametrize("redirect_url,url,expected", [
+    ("https://igvf-files.s3.amazonaws.com/2023/05/12/abc/IGVFFI0000AAAA.fastq.gz?X-Amz-Signature=x",
+     False, "s3://igvf-files/2023/05/12/abc/IGVFFI0000AAAA.fastq.gz"),
+    ("https://igvf-files.s3.amazonaws.com/2023/05/12/abc/IGVFFI0000AAAA.fastq.gz?X-Amz-Signature=x",
+     True, "https://igvf-files.s3.amazonaws.com/2023/05/12/abc/IGVFFI0000AAAA.fastq.gz"),
+    ("https://download.encodeproject.org/https://encode-files.s3.amazonaws.com/2017/ENCFF985JCJ.bigWig?a=b",
+     False, "s3://encode-files/2017/ENCFF985JCJ.bigWig"),
+])
+def test_parse_s3_redirect_url(redirect_url, url, expected):
+    assert Connection._parse_s3_redirect_url(redirect_url, url=url) == expected
+
+
+def test_s3_object_paths_doesnt_follow_redirects(mocker):
+    mocker.patch("requests.get")
+    mocker.patch.dict(os.environ, {"IGVF_API_KEY": "key", "IGVF_SECRET_KEY": "secret"})
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    mocker.patch.object(conn, "get_many", return_value={
+        i: {"@id": "/sequence-files/{}/".format(i), "@type": ["SequenceFile", "File"],
+            "href": "/sequence-files/{0}/@@download/{0}.fastq.gz".format(i)}
+        for i in ["A", "B"]
+    })
+    mocker.patch.object(conn, "_get_download_url", side_effect=lambda rec: (rec["href"], ()))
+    session_get = mocker.patch.object(conn.session, "get")
+    session_get.return_value.is_redirect = True
+    session_get.return_value.headers = {
+        "Location": "https://igvf-files.s3.amazonaws.com/2023/A.fastq.gz?X-Amz-Signature=x"}
+    assert conn.s3_object_paths(["A", "B"]) == {
+        "A": "s3://igvf-files/2023/A.fastq.gz", "B": "s3://igvf-files/2023/A.fastq.gz"}
+    assert session_get.call_args.kwargs["allow_redirects"] is False
+
+
+def test_gcp_transfer_urllist(mocker, tmp_path):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    mocker.patch.object(conn, "get_many", side_effect=lambda ids, fields, fallback: {
+        i: {"@id": "/sequence-files/{}/".format(i), "@type": ["File"], "href": i,
+            "md5sum": "f1f8f4bf413b16ad135722aa4591043e", "file_size": 4}
+        for i in ids
+    })
+    mocker.patch.object(conn, "_resolve_s3_object_path",
+                        side_effect=lambda rec, url: "https://bucket.s3.amazonaws.com/" + rec["href"])
+    outfile = tmp_path / "urls.tsv"
+    conn.gcp_transfer_urllist(["A", "B"], str(outfile), workers=2)
+    assert outfile.read_text().splitlines() == [
+        "TsvHttpData-1.0",
+        "https://bucket.s3.amazonaws.com/A\t4\t8fj0v0E7Fq0TVyKqRZEEPg==",
+        "https://bucket.s3.amazonaws.com/B\t4\t8fj0v0E7Fq0TVyKqRZEEPg==",
+    ]
+
+
+def test_gcp_transfer_urllist_leaves_no_partial_file(mocker, tmp_path):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    mocker.patch.object(conn, "get_many", side_effect=lambda ids, fields, fallback: {i: {} for i in ids})
+    outfile = tmp_path / "urls.tsv"
+    with pytest.raises(RecordNotFound):
+        conn.gcp_transfer_urllist(["A"], str(outfile))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_gcp_bulk_transfer_from_aws_manifest(mocker, tmp_path):
+    mocker.patch("requests.get")
+    conn = Connection("https://www.foo.bar", no_log_file=True)
+    paths = {i: "s3://bucket/{}.fastq.gz".format(i) for i in ["A", "B", "C"]}
+    mocker.patch.object(conn, "s3_object_paths", return_value=paths)
+    transfer = mocker.patch("igvf_utils.transfer_to_gcp.Transfer").return_value
+    transfer.from_s3_batched.return_value = [
+        ({"name": "job-1"}, [paths["A"], paths["B"]]),
+        ({"name": "job-2"}, [paths["C"]]),
+    ]
+    transfer.wait_for_jobs.return_value = {
+        "job-1": {"status": "FAILED", "counters": {"objectsCopiedToSink": "1"},
+                  "errorBreakdowns": [{"errorLogEntries": [{"url": paths["B"]}]}]},
+        "job-2": {"status": "SUCCESS", "counters": {"objectsCopiedToSink": "1"}},
+    }
+    manifest = tmp_path / "manifest.tsv"
+    res = conn.gcp_bulk_transfer_from_aws(
+        ["A", "B", "C"], "gcp-bucket", "project", manifest=str(manifest))
+    assert res == {
+        "jobs": {"job-1": "FAILED", "job-2": "SUCCESS"},
+        "files": {"FAILED": 2, "SUCCESS": 1},
+        "counters": {"objectsCopiedToSink": 2},
+    }
+    assert manifest.read_text().splitlines() == [
+        "file_id\ts3_path\tjob_name\tjob_status",
+        "A\ts3://bucket/A.fastq.gz\tjob-1\tFAILED",
+        "B\ts3://bucket/B.fastq.gz\tjob-1\tFAILED",
+        "C\ts3://bucket/C.fastq.gz\tjob-2\tSUCCESS",
+    ]
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the GSFile class in the gc_storage module.
+"""
+
+from igvf_utils.gc_storage import GSFile
+
+
+class FakeBlob:
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.requested_ranges = []
+
+    def download_as_bytes(self, start, end):
+        self.requested_ranges.append((start, end))
+        return self.data[start:end + 1]
+
+
+def test_gsfile_read_in_blocks():
+    data = bytes(range(256)) * 40
+    gs_file = GSFile("gs://bucket/reads.fastq.gz", block_size=1000, read_ahead=2)
+    gs_file._blob = FakeBlob(data)
+    chunks = []
+    while True:
+        chunk = gs_file.read(700)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    gs_file.close()
+    assert b"".join(chunks) == data
+    assert gs_file.pos == len(data)
+    assert sorted(gs_file._blob.requested_ranges) == [
+        (i, min(i + 1000, len(data)) - 1) for i in range(0, len(data), 1000)
+    ]
+
+
+def test_gsfile_read_rest():
+    data = b"ACGT" * 100
+    gs_file = GSFile("gs://bucket/reads.fastq.gz", block_size=64)
+    gs_file._blob = FakeBlob(data)
+    assert gs_file.read(10) == data[:10]
+    assert gs_file.read() == data[10:]
+    assert gs_file.read(10) == b""
+    gs_file.close()
+
+
+def test_gsfile_read_stops_at_short_block():
+    data = b"ACGT" * 100
+    gs_file = GSFile("gs://bucket/reads.fastq.gz", block_size=64)
+    gs_file._blob = FakeBlob(data)
+    # The object was truncated after its size was read.
+    gs_file._blob.data = data[:100]
+    assert gs_file.read() == data[:100]
+    assert gs_file.read(10) == b""
+    gs_file.close()
@@ -10,12 +10,18 @@
 """
 """
 
+import concurrent.futures
 import json
 import os
 import unittest
 
+import pytest
+
 import igvf_utils.tests
 from igvf_utils import utils
+from igvf_utils.MetaDataRegistration import iu_register
+from igvf_utils.profiles import IgvfSchema
+from igvf_utils.upload_queue import UploadResult
 
 DATA_DIR = os.path.join(igvf_utils.tests.DATA_DIR)
 REGISTER_DIR = os.path.join(DATA_DIR, "register")
@@ -60,5 +66,163 @@ class TestRegister(unittest.TestCase):
         self.assertEqual(utils.strip_alias_prefix(alias), "B-167")
 
 
+@pytest.mark.parametrize("workers", [1, 3])
+def test_submit_payloads_keeps_input_order_and_isolates_failures(workers):
+    def submit(payload):
+        if payload["name"] == "bad":
+            raise ValueError("invalid payload")
+        if payload["name"] == "old":
+            return {"accession": "IGVFSM000OLD"}, 409
+        return {"accession": "IGVFSM000" + payload["name"].upper()}, 201
+
+    payloads = ({"name": name} for name in ["aaa", "bad", "old", "bbb"])
+    results = iu_register.submit_payloads(payloads, submit, workers=workers)
+    assert [r.row for r in results] == [1, 2, 3, 4]
+    assert [r.status for r in results] == [
+        iu_register.SUCCESS, iu_register.FAILED, iu_register.CONFLICT, iu_register.SUCCESS
+    ]
+    assert results[0].record_id == "IGVFSM000AAA"
+    assert results[1].error == "invalid payload"
+    assert results[2].record_id == "IGVFSM000OLD"
+
+
+def test_set_file_checksums(monkeypatch, tmp_path):
+    monkeypatch.setattr("igvf_utils.CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(utils, "_checksum_cache", None)
+    reads = tmp_path / "reads.txt"
+    reads.write_text("ACGT")
+    payloads = [
+        {"_profile": "sequence_file", "submitted_file_name": str(reads)},
+        {"_profile": "sequence_file", "submitted_file_name": str(reads), "md5sum": "set"},
+        {"_profile": "lab", "submitted_file_name": str(reads)},
+    ]
+    iu_register.set_file_checksums(payloads, workers=2)
+    assert payloads[0]["md5sum"] == "f1f8f4bf413b16ad135722aa4591043e"
+    assert payloads[0]["file_size"] == 4
+    assert payloads[1]["md5sum"] == "set"
+    assert "md5sum" not in payloads[2]
+
+
+def test_plan_submission_orders_by_references():
+    schemas = {
+        "tissue": IgvfSchema("tissue", {
+            "properties": {"aliases": {"type": "array"}}, "identifyingProperties": ["aliases"]}),
+        "library": IgvfSchema("library", {
+            "properties": {
+                "aliases": {"type": "array"},
+                "samples": {"type": "array", "items": {"type": "string", "linkTo": "Sample"}},
+            },
+            "identifyingProperties": ["aliases"],
+        }),
+    }
+    payloads = [
+        {"_profile": "library", "aliases": ["lab:lib-1"], "samples": ["lab:tissue-1"]},
+        {"_profile": "tissue", "aliases": ["lab:tissue-1"]},
+        {"_profile": "tissue", "aliases": ["lab:tissue-2"]},
+        {"_profile": "library", "aliases": ["lab:lib-2"], "samples": ["lab:tissue-2", "IGVFSM000AAA"]},
+    ]
+    levels, dependencies = iu_register.plan_submission(payloads, schemas)
+    assert levels == [[1, 2], [0, 3]]
+    assert dependencies[3] == {2}
+
+    def submit(payload):
+        if payload["aliases"] == ["lab:tissue-2"]:
+            raise ValueError("invalid payload")
+        return {"accession": "IGVFSM000AAA"}, 201
+
+    results = iu_register.submit_planned_payloads(payloads, levels, dependencies, submit, workers=2)
+    assert [r.row for r in results] == [1, 2, 3, 4]
+    assert [r.status for r in results] == [
+        iu_register.SUCCESS, iu_register.SUCCESS, iu_register.FAILED, iu_register.FAILED
+    ]
+    assert results[3].error == "Depends on failed rows [3]."
+
+    payloads[1]["samples"] = ["lab:lib-1"]
+    schemas["tissue"] = schemas["library"]
+    with pytest.raises(ValueError):
+        iu_register.plan_submission(payloads, schemas)
+
+
+def test_journal_submissions_resume(tmp_path):
+    journal = utils.SubmissionJournal(str(tmp_path / "journal.sqlite3"))
+    calls = []
+
+    def submit(payload):
+        calls.append(payload["name"])
+        if payload["name"] == "bad":
+            raise ValueError("invalid payload")
+        return {"accession": "IGVFSM000" + payload["name"].upper()}, 201
+
+    payloads = [{"name": "aaa"}, {"name": "bad"}]
+    results = iu_register.submit_payloads(
+        payloads, iu_register.journal_submissions(submit, journal, "post"), workers=2)
+    assert [r.status for r in results] == [iu_register.SUCCESS, iu_register.FAILED]
+
+    calls.clear()
+    results = iu_register.submit_payloads(
+        payloads, iu_register.journal_submissions(submit, journal, "post", resume=True), workers=2)
+    assert calls == ["bad"]
+    assert results[0] == iu_register.RowResult(1, iu_register.SKIPPED, "IGVFSM000AAA", "")
+    # A PATCH of the same row is a different submission.
+    iu_register.journal_submissions(submit, journal, "patch", resume=True)({"name": "aaa"})
+    assert calls == ["bad", "aaa"]
+
+
+def test_journal_submissions_waits_for_queued_upload(mocker, tmp_path):
+    journal = utils.SubmissionJournal(str(tmp_path / "journal.sqlite3"))
+    conn = mocker.Mock()
+    future = concurrent.futures.Future()
+    conn.upload_queue.get_future.side_effect = lambda file_id: future
+    submit = mocker.Mock(return_value=({"accession": "IGVFFI0000AAAA"}, 201))
+    payload = {"_profile": "sequence_file", "aliases": ["lab:a"]}
+    row_key = journal.row_key(payload, "post")
+
+    iu_register.journal_submissions(submit, journal, "post", conn=conn)(payload)
+    assert journal.get(row_key) == ("IGVFFI0000AAAA", iu_register.UPLOAD_PENDING)
+    future.set_result(UploadResult("IGVFFI0000AAAA", None, "Upload failed."))
+    assert journal.get(row_key) == ("IGVFFI0000AAAA", iu_register.UPLOAD_PENDING)
+
+    # The failed upload is retried on resume, and the row is done once it succeeds.
+    future = concurrent.futures.Future()
+    res = iu_register.journal_submissions(submit, journal, "post", resume=True, conn=conn)(payload)
+    assert res == ("IGVFFI0000AAAA", iu_register.SKIPPED)
+    submit.assert_called_once()
+    conn.after_submit_file_cloud_upload.assert_called_once_with("IGVFFI0000AAAA", "sequence_file")
+    future.set_result(UploadResult("IGVFFI0000AAAA", None, ""))
+    assert journal.get(row_key) == ("IGVFFI0000AAAA", iu_register.SUCCESS)
+
+
+def test_skip_existing_records(mocker):
+    conn = mocker.Mock()
+    conn.get_many.return_value = {
+        "lab:tissue-1": {"accession": "IGVFSM000AAA", "description": "old", "sample_terms": ["/x/"]},
+        "lab:tissue-2": {},
+    }
+    schema = IgvfSchema("tissue", {
+        "properties": {
+            "aliases": {"type": "array"},
+            "description": {"type": "string"},
+            "sample_terms": {"type": "array", "items": {"type": "string", "linkTo": "SampleTerm"}},
+        },
+        "identifyingProperties": ["aliases"],
+    })
+    payloads = [
+        {"aliases": ["lab:tissue-1"], "description": "new", "sample_terms": ["UBERON:1"]},
+        {"aliases": ["lab:tissue-2"]},
+    ]
+    existing = iu_register.find_existing_records(conn, payloads)
+    assert list(existing) == ["lab:tissue-1"]
+    assert conn.get_many.call_args.kwargs["fallback"] is False
+    assert iu_register.diff_existing_record(payloads[0], existing["lab:tissue-1"], schema) == {
+        "aliases": (["lab:tissue-1"], None), "description": ("new", "old")}
+
+    submit = mocker.Mock(return_value=({"accession": "IGVFSM000BBB"}, 201))
+    results = iu_register.submit_payloads(
+        payloads, iu_register.skip_existing_records(conn, submit, existing, schema=schema))
+    assert [(r.status, r.record_id) for r in results] == [
+        (iu_register.EXISTS, "IGVFSM000AAA"), (iu_register.SUCCESS, "IGVFSM000BBB")]
+    submit.assert_called_once_with(payloads[1])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the Profiles and IgvfSchema classes in the profiles module.
+"""
+
+import pytest
+
+from igvf_utils.profiles import IgvfSchema, Profiles
+
+
+PROFILES_JSON = {
+    "Lab": {"$id": "/profiles/lab.json", "properties": {}, "identifyingProperties": []},
+    "_subtypes": {},
+}
+
+
+def make_response(mocker, status_code, json_data=None, headers={}):
+    response = mocker.Mock(status_code=status_code, ok=status_code < 400, headers=headers)
+    response.json.return_value = json_data
+    return response
+
+
+@pytest.fixture
+def session(mocker):
+    return mocker.Mock()
+
+
+def test_profiles_cached_and_revalidated(mocker, session, tmp_path):
+    session.get.return_value = make_response(
+        mocker, 200, PROFILES_JSON, headers={"ETag": '"abc"'})
+    profiles = Profiles("https://www.foo.bar/", session=session, cache_dir=str(tmp_path))
+    assert list(profiles.profiles) == ["lab"]
+    assert profiles.cache_file == str(tmp_path / "profiles" / "www.foo.bar.json")
+
+    session.get.reset_mock()
+    session.get.return_value = make_response(mocker, 304)
+    profiles = Profiles("https://www.foo.bar/", session=session, cache_dir=str(tmp_path))
+    assert list(profiles.profiles) == ["lab"]
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+
+
+def test_profiles_offline_uses_cache(mocker, session, tmp_path):
+    session.get.return_value = make_response(mocker, 200, PROFILES_JSON)
+    Profiles("https://www.foo.bar/", session=session, cache_dir=str(tmp_path)).profiles
+    session.get.reset_mock()
+    profiles = Profiles(
+        "https://www.foo.bar/", session=session, cache_dir=str(tmp_path), offline=True)
+    assert list(profiles.profiles) == ["lab"]
+    session.get.assert_not_called()
+
+
+def test_schema_validator_reused():
+    schema = IgvfSchema("lab", {
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "email": {"type": "string", "format": "email"}},
+        "required": ["name"],
+    })
+    results = schema.validate_many(
+        [{"name": "a"}, {"email": "a@b.org"}, {"name": "a", "email": "x"}])
+    assert results[0] is None
+    assert results[1][0] == "'name' is a required property"
+    assert "is not a 'email'" in results[2][0]
+    assert schema.validator is schema.validator
+
+
+def test_schema_property_index():
+    schema = IgvfSchema("lab", {
+        "properties": {
+            "name": {"type": "string"},
+            "aliases": {"type": "array"},
+            "uuid": {"type": "string", "readonly": True},
+            "status": {"type": "string", "notSubmittable": True},
+        },
+        "required": ["name"],
+        "identifyingProperties": ["uuid", "aliases"],
+    })
+    assert schema.get_property_from_name("name").is_required
+    assert schema.get_property_from_name("uuid").is_identifying
+    with pytest.raises(ValueError):
+        schema.get_property_from_name("foo")
+    assert schema.has_alias and not schema.has_award
+    assert schema.writable_props == {"name", "aliases"}
+    assert schema.non_writable_props == {"uuid", "status"}
+    assert schema.filter_non_writable_props(
+        {"name": "a", "uuid": "b", "status": "c"}) == {"name": "a"}
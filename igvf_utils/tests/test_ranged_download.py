@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the RangedDownload class in the ranged_download module.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+from igvf_utils.exceptions import FileDownloadFailed
+from igvf_utils import ranged_download
+
+
+CONTENT = bytes(range(256)) * 40
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers={}):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class FakeSession:
+    """Serves CONTENT with support for single byte ranges."""
+
+    def __init__(self):
+        self.ranges = []
+
+    def get(self, url, headers, **kwargs):
+        start, end = headers["Range"].split("=")[1].split("-")
+        start, end = int(start), int(end)
+        self.ranges.append((start, end))
+        return FakeResponse(206, CONTENT[start:end + 1], {
+            "Content-Range": "bytes {}-{}/{}".format(start, end, len(CONTENT)),
+            "Content-Disposition": 'attachment; filename="reads.fastq.gz"',
+        })
+
+
+@pytest.fixture
+def downloader():
+    download = ranged_download.RangedDownload("https://s3/reads", workers=3, range_size=1000)
+    download.session = FakeSession()
+    return download
+
+
+def test_ranged_download(downloader, tmp_path):
+    filename = str(tmp_path / "reads.fastq.gz")
+    downloader.probe()
+    assert downloader.filename == "reads.fastq.gz"
+    assert downloader.file_size == len(CONTENT)
+    downloader.download(filename, md5sum=hashlib.md5(CONTENT).hexdigest())
+    with open(filename, "rb") as fh:
+        assert fh.read() == CONTENT
+    assert not (tmp_path / "reads.fastq.gz.part.jsonl").exists()
+
+
+def test_ranged_download_resumes(downloader, tmp_path):
+    filename = str(tmp_path / "reads.fastq.gz")
+    part = tmp_path / "reads.fastq.gz.part"
+    part.write_bytes(CONTENT[:2000] + b"\0" * (len(CONTENT) - 2000))
+    (tmp_path / "reads.fastq.gz.part.jsonl").write_text("\n".join([
+        json.dumps({"file_size": len(CONTENT), "range_size": 1000}),
+        json.dumps({"range": 0}),
+        json.dumps({"range": 1}),
+    ]) + "\n")
+    downloader.download(filename)
+    # Only the probe and the ranges not in the journal are requested.
+    assert (0, 999) not in downloader.session.ranges[1:]
+    assert (1000, 1999) not in downloader.session.ranges
+    with open(filename, "rb") as fh:
+        assert fh.read() == CONTENT
+
+
+def test_ranged_download_md5sum_mismatch(downloader, tmp_path):
+    filename = str(tmp_path / "reads.fastq.gz")
+    with pytest.raises(FileDownloadFailed):
+        downloader.download(filename, md5sum="0" * 32)
+    assert list(tmp_path.iterdir()) == []
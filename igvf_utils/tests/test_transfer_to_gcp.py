@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the Transfer class in the transfer_to_gcp module.
+"""
+
+import pytest
+
+from igvf_utils import transfer_to_gcp
+
+
+@pytest.fixture
+def transfer(mocker):
+    build = mocker.patch("googleapiclient.discovery.build")
+    build.return_value.transferJobs.return_value.create.side_effect = lambda body: mocker.Mock(
+        **{"execute.return_value": {"name": "transferJobs/" + body["description"]}})
+    mocker.patch("builtins.print")
+    return transfer_to_gcp.Transfer("my-project", aws_creds=("id", "secret"))
+
+
+def test_from_s3_batched_splits_jobs(transfer):
+    s3_paths = ["s3://bucket-a/f{}".format(i) for i in range(2500)] + ["s3://bucket-b/g"]
+    jobs = transfer.from_s3_batched(s3_paths, "gcp-bucket", description="batch")
+    assert [len(paths) for _, paths in jobs] == [1000, 1000, 500, 1]
+    assert [job["name"] for job, _ in jobs][-1] == "transferJobs/batch (4/4)"
+    assert jobs[3][1] == ["s3://bucket-b/g"]
+
+
+def test_from_s3_rejects_too_many_paths(transfer):
+    with pytest.raises(ValueError):
+        transfer.from_s3("bucket", ["f{}".format(i) for i in range(1001)], "gcp-bucket")
+
+
+def test_wait_for_jobs_backs_off(mocker, transfer):
+    sleep = mocker.patch("time.sleep")
+    list_operations = mocker.patch.object(transfer, "_list_operations", side_effect=[
+        [], [{"metadata": {"status": "IN_PROGRESS"}}], [{"metadata": {"status": "SUCCESS"}}]])
+    results = transfer.wait_for_jobs(["transferJobs/1"], poll_interval=1, max_poll_interval=3)
+    assert results == {"transferJobs/1": {"status": "SUCCESS"}}
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 3]
+    assert list_operations.call_count == 3
@@ -25,6 +25,7 @@ to read the documentation about the contents of that file.
   Contains 40 FASTQ records.
 """
 
+import hashlib
 import json
 import os
 import unittest
@@ -101,5 +102,32 @@ def test_truncate_long_strings_in_objects(input, expected):
     assert result == expected
 
 
+def test_calculate_md5_sum_cached(tmp_path, monkeypatch):
+    """Tests that ``calculate_md5_sum()`` uses the checksum cache, and hashes a file again once
+    it was modified.
+    """
+    monkeypatch.setattr("igvf_utils.CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "_checksum_cache", None)
+    infile = tmp_path / "reads.txt"
+    infile.write_text("ACGT")
+    md5sum = utils.calculate_md5sum(str(infile))
+    key = utils.ChecksumCache.file_key(str(infile))
+    assert utils.get_checksum_cache().get(key) == md5sum
+    utils.get_checksum_cache().set(key, "cached")
+    assert utils.calculate_md5sum(str(infile)) == "cached"
+    infile.write_text("ACGTACGT")
+    os.utime(infile, ns=(key[2] + 10**9, key[2] + 10**9))
+    assert utils.calculate_md5sum(str(infile)) == "cc0af3a4fedb18378b4b57b98068e69f"
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("content", [b"", b"ACGT" * 1000])
+def test_md5sum_local_file(tmp_path, use_mmap, content):
+    infile = tmp_path / "reads.txt"
+    infile.write_bytes(content)
+    md5sum = utils.md5sum_local_file(str(infile), buffer_size=1024, use_mmap=use_mmap)
+    assert md5sum == hashlib.md5(content).hexdigest()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -46,13 +46,25 @@ Then use the following commands to create and set up your Cloud Composer environ
 .. _cloud-platform scope: https://developers.google.com/identity/protocols/googlescopes#storagetransferv1
 """
 
+import collections
+import concurrent.futures
 import datetime
 import json
 import os
+import time
 import googleapiclient.discovery 
 #pip install google-api-python-client (details https://developers.google.com/api-client-library/python/)
 # List of APIs that google-api-python-client can use at https://developers.google.com/api-client-library/python/apis/
 
+#: The maximum number of entries in the `includePrefixes` list of a transferJob.
+MAX_PREFIXES_PER_JOB = 1000
+#: The number of seconds to wait before first checking on the transferOperations of a transferJob.
+POLL_INTERVAL = 10
+#: The maximum number of seconds to wait between checks on the transferOperations of a transferJob.
+MAX_POLL_INTERVAL = 300
+#: The statuses of a transferOperation that has finished running.
+FINAL_STATUSES = ("SUCCESS", "FAILED", "ABORTED")
+
 class AwsCredentialsMissing(Exception):
     """
     Raised when a method needs AWS credentials but can't find them.
@@ -169,6 +181,66 @@ class Transfer:
 
         .. _`following permissions`: https://cloud.google.com/storage-transfer/docs/iam-transfer#source-permissions
         """
+        if type(s3_paths) == str:
+            s3_paths = [s3_paths]
+        params = self._s3_job_params(s3_bucket, s3_paths, gcp_bucket, overwrite_existing, description)
+        return self._create_job(params)
+
+    def from_s3_batched(self, s3_paths, gcp_bucket, overwrite_existing=False, description="",
+                        workers=4):
+        """
+        Like :meth:`from_s3`, but for any number of S3 objects, possibly from several buckets. The
+        objects are grouped by bucket and split into transferJobs of at most
+        ``MAX_PREFIXES_PER_JOB`` objects each, which are created concurrently.
+
+        Args:
+            s3_paths: `list`. The S3 URIs of the objects to transfer, i.e. s3://bucket/path/to/obj.
+            gcp_bucket: `str`. The name of the GCP bucket.
+            overwrite_existing: `bool`. See :meth:`from_s3`.
+            description: `str`. A description for the transferJobs, to which the job number is
+                appended. Defaults to the path of the first S3 object of each job.
+            workers: `int`. The number of transferJobs created concurrently.
+
+        Returns:
+            `list`: Each item is a tuple of the JSON response representing a newly created
+            transferJob and the list of the S3 URIs that it transfers.
+        """
+        by_bucket = collections.OrderedDict()
+        for s3_path in s3_paths:
+            if s3_path.startswith("s3://"):
+                s3_path = s3_path[len("s3://"):]
+            bucket, path = s3_path.split("/", 1)
+            by_bucket.setdefault(bucket, []).append(path)
+        batches = []
+        for bucket, paths in by_bucket.items():
+            paths = list(collections.OrderedDict.fromkeys(paths))
+            for i in range(0, len(paths), MAX_PREFIXES_PER_JOB):
+                batches.append((bucket, paths[i:i + MAX_PREFIXES_PER_JOB]))
+
+        def create(num, batch):
+            bucket, paths = batch
+            desc = "{} ({}/{})".format(description, num + 1, len(batches)) if description else ""
+            params = self._s3_job_params(bucket, paths, gcp_bucket, overwrite_existing, desc)
+            # Client objects of googleapiclient aren't thread-safe, so each thread builds its own.
+            job = self._create_job(params, storagetransfer=self._build_client())
+            return job, ["s3://{}/{}".format(bucket, p.lstrip("/")) for p in paths]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(create, range(len(batches)), batches))
+
+    @staticmethod
+    def _build_client():
+        return googleapiclient.discovery.build('storagetransfer', 'v1')
+
+    def _s3_job_params(self, s3_bucket, s3_paths, gcp_bucket, overwrite_existing=False, description=""):
+        """
+        Returns:
+            `dict`: The body of a request to create a one-off transferJob that copies the specified
+            objects of an S3 bucket; see :meth:`from_s3`.
+
+        Raises:
+            `ValueError`: There are more than ``MAX_PREFIXES_PER_JOB`` S3 paths.
+        """
         # See api documentation at https://developers.google.com/resources/api-libraries/documentation/storagetransfer/v1/python/latest/storagetransfer_v1.transferJobs.html.
         if not self.aws_creds[0] and not self.aws_creds[1]:
             raise AwsCredentialsMissing(("Error: In order to create a transferJob, you need to "
@@ -176,11 +248,12 @@ class Transfer:
                                          "in your environment.".format(self.__class__.__name__)))
         #See example at https://cloud.google.com/storage-transfer/docs/create-client and
         # https://github.com/GoogleCloudPlatform/python-docs-samples/blob/master/storage/transfer_service/aws_request.py.
-    
-        if type(s3_paths) == str:
-            s3_paths = [s3_paths]
 
         s3_paths = list(set(s3_paths))
+        if len(s3_paths) > MAX_PREFIXES_PER_JOB:
+            raise ValueError(
+                "A transferJob can copy at most {} S3 objects, but {} were given; use "
+                "from_s3_batched() instead.".format(MAX_PREFIXES_PER_JOB, len(s3_paths)))
         # The transferJobs API doc specifies not to include leading '/'.
         s3_paths = [x.lstrip("/") for x in s3_paths]
     
@@ -197,8 +270,6 @@ class Transfer:
         # If no end date is set, a daily transferJob is created that runs indefinitely. 
         # So, we need to avoid these last two scenarios and stick with a one-time transferJob.
         now = datetime.datetime.now(tz=datetime.timezone.utc)
-        hour = now.hour
-        minute = now.minute
         params["schedule"] = {
             "scheduleStartDate": {
                 "year": now.year,
@@ -231,8 +302,21 @@ class Transfer:
             params["transferSpec"]["transferOptions"] = {
                 "overwriteObjectsAlreadyExistingInSink": True
             }
-    
-        job = self.storagetransfer.transferJobs().create(body=params).execute() #dict
+        return params
+
+    def _create_job(self, params, storagetransfer=None):
+        """
+        Creates a transferJob.
+
+        Args:
+            params: `dict`. The body of the request.
+            storagetransfer: The client to use. Defaults to ``self.storagetransfer``.
+
+        Returns:
+            `dict`: The JSON response representing the newly created transferJob.
+        """
+        storagetransfer = storagetransfer or self.storagetransfer
+        job = storagetransfer.transferJobs().create(body=params).execute() #dict
         job_id = job["name"].split("/")[-1]
         print("Created transfer job with ID {}\n{}".format(job_id, json.dumps(job, indent=4)))
         return job
@@ -296,11 +380,7 @@ class Transfer:
             params["transferSpec"]["transferOptions"] = {
                 "overwriteObjectsAlreadyExistingInSink": True
             }
-    
-        job = self.storagetransfer.transferJobs().create(body=params).execute() #dict
-        job_id = job["name"].split("/")[-1]
-        print("Created transfer job with ID {}\n{}".format(job_id, json.dumps(job, indent=4)))
-        return job
+        return self._create_job(params)
     
     def get_transfers_from_job(self, transferjob_name):
         """
@@ -345,4 +425,53 @@ class Transfer:
         """
         meta = self.get_transfers_from_job(transferjob_name=transferjob_name)[0]["metadata"]
         return meta["status"]
-    
+
+    def wait_for_jobs(self, transferjob_names, poll_interval=POLL_INTERVAL,
+                      max_poll_interval=MAX_POLL_INTERVAL, timeout=None):
+        """
+        Polls the transferOperations of one-off transferJobs until they have all finished. The
+        wait between polls doubles each time, starting at `poll_interval` seconds, up to
+        `max_poll_interval` seconds.
+
+        Args:
+            transferjob_names: `list`. The values of the `name` key in the dictionaries returned by
+                :meth:`from_s3`, :meth:`from_s3_batched` or :meth:`from_urllist`.
+            poll_interval: `int`. The number of seconds to wait before the first poll.
+            max_poll_interval: `int`. The maximum number of seconds between polls.
+            timeout: `int`. If set, the number of seconds after which to stop waiting.
+
+        Returns:
+            `dict`: Each key is a transferJob name, and each value the `metadata` of its
+            transferOperation. The `status` of the metadata is one of ``FINAL_STATUSES``, unless the
+            timeout was reached first; it is None if no transferOperation was started yet.
+        """
+        results = {name: {"status": None} for name in transferjob_names}
+        pending = list(transferjob_names)
+        start = time.monotonic()
+        interval = poll_interval
+        while pending:
+            time.sleep(interval)
+            for name in list(pending):
+                operations = self._list_operations(name)
+                if not operations:
+                    continue
+                results[name] = operations[0].get("metadata", {})
+                if results[name].get("status") in FINAL_STATUSES:
+                    pending.remove(name)
+            if timeout is not None and time.monotonic() - start >= timeout:
+                break
+            interval = min(interval * 2, max_poll_interval)
+        return results
+
+    def _list_operations(self, transferjob_name):
+        """
+        Like :meth:`get_transfers_from_job`, but returns an empty list when the transferJob has no
+        transferOperations yet.
+        """
+        filt = {}
+        filt["project_id"] = self.gcp_project
+        filt["job_names"] = [transferjob_name]
+        query = self.storagetransfer.transferOperations().list(
+            name="transferOperations",
+            filter=json.dumps(filt))
+        return query.execute().get("operations", [])
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Contains the ``UploadQueue`` class for uploading the files of many File records concurrently in
+the background, under a common bandwidth and part concurrency budget::
+
+    conn = Connection("sandbox")
+    queue = conn.enable_upload_queue(workers=4, max_bandwidth=100 * 2**20)
+    for payload in payloads:
+        conn.post(payload)  # Returns as soon as the upload is queued.
+    for result in queue.drain():
+        if result.error:
+            print("Failed to upload {}: {}".format(result.file_id, result.error))
+"""
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+#: The default number of files that ``UploadQueue`` uploads concurrently.
+DEFAULT_WORKERS = 4
+#: The default number of parts that ``UploadQueue`` uploads concurrently across all files.
+DEFAULT_PART_CONCURRENCY = 16
+
+#: The outcome of uploading a file through ``UploadQueue``. `error` is the empty string if the
+#: upload succeeded, otherwise the error message.
+UploadResult = collections.namedtuple("UploadResult", ["file_id", "file_path", "error"])
+
+
+class BandwidthLimiter:
+    """
+    A token bucket shared by all threads uploading data. Each thread calls :meth:`consume` with the
+    number of bytes it has sent, and is made to sleep for as long as needed to keep the overall
+    rate at `bytes_per_second`.
+    """
+
+    def __init__(self, bytes_per_second, burst=None):
+        """
+        Args:
+            bytes_per_second: `int`. The maximum sustained rate.
+            burst: `int`. The number of bytes that may be sent at once after an idle period.
+                Defaults to `bytes_per_second`.
+        """
+        self.rate = bytes_per_second
+        self.capacity = burst or bytes_per_second
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, num_bytes):
+        """
+        Takes `num_bytes` tokens from the bucket, blocking until the bucket has refilled enough to
+        cover them. The bucket may go into debt, so that concurrent callers queue up behind each
+        other.
+
+        Args:
+            num_bytes: `int`. The number of bytes sent. Negative values, which `boto3` reports when
+                it retries a part, are ignored.
+        """
+        if num_bytes <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= num_bytes
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class UploadQueue:
+    """
+    Uploads files for File records with a pool of worker threads, so that submitting the records
+    doesn't have to wait for their files to upload. Each upload goes through
+    ``igvf_utils.connection.Connection.upload_file()``, which requests fresh upload credentials for
+    the file right before uploading it, so credentials don't expire while a file waits in the
+    queue.
+
+    The part concurrency budget is split evenly between the workers, and the bandwidth budget is
+    shared through a single :class:`BandwidthLimiter`.
+
+    Args:
+        conn: `igvf_utils.connection.Connection` instance.
+        workers: `int`. The number of files uploaded concurrently.
+        max_bandwidth: `int`. The maximum number of bytes per second uploaded across all files.
+            Defaults to no limit.
+        part_concurrency: `int`. The maximum number of parts uploaded concurrently across all files.
+    """
+
+    def __init__(self, conn, workers=DEFAULT_WORKERS, max_bandwidth=None,
+                 part_concurrency=DEFAULT_PART_CONCURRENCY):
+        self.conn = conn
+        self.workers = workers
+        #: The number of parts uploaded concurrently per file.
+        self.max_concurrency = max(1, part_concurrency // workers)
+        self.limiter = BandwidthLimiter(max_bandwidth) if max_bandwidth else None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="iu_upload")
+        self._futures = []
+        self._futures_by_file_id = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.drain()
+
+    def submit(self, file_id, file_path=None, set_md5sum=False):
+        """
+        Queues the upload of a file; see ``igvf_utils.connection.Connection.upload_file()`` for the
+        arguments.
+
+        Returns:
+            `concurrent.futures.Future`: Resolves to an :data:`UploadResult`.
+        """
+        self.conn.debug_logger.debug("Queueing upload of {}.".format(file_id))
+        future = self._executor.submit(self._upload, file_id, file_path, set_md5sum)
+        with self._lock:
+            self._futures.append(future)
+            self._futures_by_file_id[file_id] = future
+        return future
+
+    def get_future(self, file_id):
+        """
+        Args:
+            file_id: `str`. The identifier that the upload of a file was queued with.
+
+        Returns:
+            `concurrent.futures.Future`: The future of the last upload queued for the file, as
+            returned by :meth:`submit`, or `None` if none was queued.
+        """
+        with self._lock:
+            return self._futures_by_file_id.get(file_id)
+
+    def _upload(self, file_id, file_path, set_md5sum):
+        callback = self.limiter.consume if self.limiter else None
+        try:
+            self.conn.upload_file(
+                file_id=file_id,
+                file_path=file_path,
+                set_md5sum=set_md5sum,
+                max_concurrency=self.max_concurrency,
+                # Progress bars of concurrent uploads would overwrite each other.
+                progress=False,
+                callback=callback
+            )
+        except Exception as e:
+            self.conn.log_error("Failed to upload file for {}: {}".format(file_id, e))
+            return UploadResult(file_id=file_id, file_path=file_path, error=str(e))
+        self.conn.debug_logger.debug("Finished uploading file for {}.".format(file_id))
+        return UploadResult(file_id=file_id, file_path=file_path, error="")
+
+    def wait(self):
+        """
+        Blocks until all uploads queued so far have completed. More uploads can be queued
+        afterwards.
+
+        Returns:
+            `list` of :data:`UploadResult`, for the uploads queued since the last call to this
+            method, in the order they were queued.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        return [f.result() for f in futures]
+
+    def drain(self):
+        """
+        Like :meth:`wait`, and then shuts down the worker threads; no more uploads can be queued.
+
+        Returns:
+            `list` of :data:`UploadResult`.
+        """
+        results = self.wait()
+        self._executor.shutdown(wait=True)
+        return results
@@ -10,15 +10,19 @@
 Contains utilities that don't require authorization on the DACC servers.
 """
 
+import concurrent.futures
 import hashlib
 import io
 import json
 import jsonschema
 import logging
+import mmap
 import os
 import PIL.Image
 import requests
+import sqlite3
 import subprocess
+import threading
 
 import exifread
 
@@ -30,6 +34,189 @@ import igvf_utils.gc_storage
 #: Stores the HTTP headers to indicate JSON content in a request.
 REQUEST_HEADERS_JSON = {'content-type': 'application/json'}
 
+#: The size in bytes of the buffer that ``md5sum_local_file()`` reads files into. Large reads
+#: keep the number of system calls and interpreter iterations per GB low.
+HASH_BUFFER_SIZE = 16 * 2**20
+
+#: The name of the SQLite database in ``igvf_utils.CACHE_DIR`` that caches the md5sums of local
+#: files; see ``ChecksumCache``.
+CHECKSUM_CACHE_FILENAME = "checksums.sqlite3"
+
+
+class ChecksumCache:
+    """
+    A persistent cache of the md5sums of local files, stored in a SQLite database. An entry is
+    keyed by the absolute path of the file and only used while the size, modification time and
+    inode of the file are unchanged, so modified or replaced files are hashed again. The database
+    can be shared by concurrent threads and processes.
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: `str`. The path to the SQLite database, which is created if needed.
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS md5sums (path TEXT PRIMARY KEY, size INTEGER,"
+                    " mtime_ns INTEGER, inode INTEGER, md5sum TEXT)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def file_key(file_path):
+        """
+        Args:
+            file_path: `str`. The path to a local file.
+
+        Returns:
+            `tuple`: The absolute path, size, modification time in nanoseconds and inode of the file.
+        """
+        stat = os.stat(file_path)
+        return os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def get(self, key):
+        """
+        Args:
+            key: `tuple`. The file key, as returned by ``self.file_key()``.
+
+        Returns:
+            `str`: The cached md5sum, or `None` if there is no entry for the key or the cache
+            can't be read.
+        """
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT md5sum FROM md5sums WHERE path=? AND size=? AND mtime_ns=? AND inode=?",
+                    key).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logging.debug("Checksum cache {} not readable: {}".format(self.db_path, e))
+            return None
+        return row[0] if row else None
+
+    def set(self, key, md5sum):
+        """
+        Caches the md5sum of a file, replacing any entry for an earlier version of it.
+
+        Args:
+            key: `tuple`. The file key, as returned by ``self.file_key()``.
+            md5sum: `str`.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO md5sums VALUES (?, ?, ?, ?, ?)",
+                                 tuple(key) + (md5sum,))
+        except (sqlite3.Error, OSError) as e:
+            logging.debug("Checksum cache {} not writable: {}".format(self.db_path, e))
+
+
+_checksum_cache = None
+
+
+def get_checksum_cache():
+    """
+    Returns:
+        `ChecksumCache`: The checksum cache in ``igvf_utils.CACHE_DIR``, or `None` if
+        ``igvf_utils.CACHE_DIR`` is set to an empty value.
+    """
+    global _checksum_cache
+    if not iu.CACHE_DIR:
+        return None
+    if _checksum_cache is None:
+        _checksum_cache = ChecksumCache(os.path.join(iu.CACHE_DIR, CHECKSUM_CACHE_FILENAME))
+    return _checksum_cache
+
+
+class SubmissionJournal:
+    """
+    A local record of the input rows that were submitted to the Portal, stored in a SQLite
+    database. Each row is keyed by a hash of its payload and the method it was submitted with (see
+    ``self.row_key()``), and maps to the identifier of the resulting record on the Portal, so that
+    a rerun of an interrupted submission can skip the rows that were already submitted without
+    contacting the Portal. Every entry is committed as soon as it is recorded, so the journal
+    survives a crash of the submitting process. The database can be shared by concurrent threads.
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: `str`. The path to the SQLite database, which is created if needed.
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rows (row_key TEXT PRIMARY KEY, profile TEXT,"
+                    " record_id TEXT, status TEXT, submitted_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def row_key(payload, method):
+        """
+        Args:
+            payload: `dict`. The payload of an input row, before it is submitted.
+            method: `str`. The method that the row is submitted with, i.e. 'post' or 'patch'.
+
+        Returns:
+            `str`: The SHA-256 hex digest of the method and the canonical JSON serialization of
+            the payload.
+        """
+        canonical = json.dumps([method, payload], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, row_key):
+        """
+        Args:
+            row_key: `str`. The key of an input row, as returned by ``self.row_key()``.
+
+        Returns:
+            `tuple`: The record identifier and status of the row, or `None` if it isn't journaled.
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT record_id, status FROM rows WHERE row_key=?", (row_key,)).fetchone()
+
+    def record(self, row_key, profile, record_id, status):
+        """
+        Records the submission of an input row, replacing any earlier entry for it.
+
+        Args:
+            row_key: `str`. The key of the row, as returned by ``self.row_key()``.
+            profile: `str`. The profile of the submitted record.
+            record_id: `str`. The identifier of the record on the Portal.
+            status: `str`. The outcome of the submission.
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rows (row_key, profile, record_id, status)"
+                    " VALUES (?, ?, ?, ?)", (row_key, profile, record_id, status))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
 def is_jpg_or_tiff(filename):
     """
     Checks if the provided file is an image file that is formatted as either JPEG or TIFF.
@@ -190,41 +377,92 @@ def get_record_id(rec):
         return rec["uuid"]
     raise Exception("Could not extract an uptream identifier for IGVF record '{}'.".format(rec))
 
-def err_context(payload, schema):
+def err_context(payload, schema, validator=None):
     """
     Validates the schema instance against the provided JSON schema.
 
     Args:
         payload: dict.
         schema: dict.
+        validator: A `jsonschema` validator instance for `schema`, such as
+            ``igvf_utils.profiles.IgvfSchema.validator``. When validating many payloads against
+            the same schema, passing one in avoids checking the schema and building a new
+            validator for each payload.
 
     Returns:
         `None` if there aren't any instance validation errors. Otherwise, a two-item tuple
         where the first item is the main error message; the second is a dictionary-based
         error hash that contains the contextual errors. This latter item may be empty.
     """
-    try:
-        jsonschema.validate(payload,schema)
-    except jsonschema.exceptions.ValidationError as err:
-        main_msg = err.message
-        messages = []
-        schema_paths = []
-        for i in err.context:
-            messages.append(i.message)
-            schema_paths.append(list(i.absolute_schema_path))
-        context = {}
-        for i in range(len(schema_paths)):
-            context["->".join([str(x) for x in schema_paths[i]])] = messages[i]
-        return main_msg, context
-
-
-def calculate_md5sum(file_path):
+    if validator is not None:
+        err = jsonschema.exceptions.best_match(validator.iter_errors(payload))
+        if err is None:
+            return None
+    else:
+        try:
+            jsonschema.validate(payload,schema)
+            return None
+        except jsonschema.exceptions.ValidationError as e:
+            err = e
+    main_msg = err.message
+    messages = []
+    schema_paths = []
+    for i in err.context:
+        messages.append(i.message)
+        schema_paths.append(list(i.absolute_schema_path))
+    context = {}
+    for i in range(len(schema_paths)):
+        context["->".join([str(x) for x in schema_paths[i]])] = messages[i]
+    return main_msg, context
+
+
+def md5sum_local_file(file_path, buffer_size=HASH_BUFFER_SIZE, use_mmap=False):
+    """
+    Calculates the md5sum of a local file. The file is either read with ``readinto()`` into a
+    single reused buffer, so that no new `bytes` object is allocated per read, or memory-mapped,
+    in which case the hashed data is paged in by the kernel without any copy into user space.
+
+    Args:
+        file_path: `str`. The path to a local file.
+        buffer_size: `int`. The number of bytes read, or hashed from the memory map, at a time.
+        use_mmap: `bool`. Whether to memory-map the file instead of reading it.
+
+    Returns:
+        `str`: The md5sum.
+    """
+    m = hashlib.md5()
+    with open(file_path, "rb", buffering=0) as fh:
+        if use_mmap:
+            if os.fstat(fh.fileno()).st_size == 0:
+                # Empty files can't be memory-mapped.
+                return m.hexdigest()
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, len(view), buffer_size):
+                        m.update(view[offset:offset + buffer_size])
+                finally:
+                    view.release()
+        else:
+            buf = bytearray(buffer_size)
+            view = memoryview(buf)
+            while True:
+                num_bytes = fh.readinto(buf)
+                if not num_bytes:
+                    break
+                m.update(view[:num_bytes])
+    return m.hexdigest()
+
+
+def calculate_md5sum(file_path, use_cache=True):
     """
     Calculates the md5sum for a local file or a S3 URI. If an S3 URI, the md5sum will be set as
-    the objects ETag.
+    the objects ETag. The md5sums of local files are cached, see ``get_checksum_cache()``, so that
+    a file is only hashed again once it was modified.
 
     Args:
         file_path: `str`. The path to a local file or an S3 URI, i.e. s3://bucket-name/key.
+        use_cache: `bool`. Set to `False` to hash a local file even if its md5sum is cached.
 
     Returns:
         `str`: The md5sum.
@@ -236,19 +474,43 @@ def calculate_md5sum(file_path):
         return igvf_utils.aws_storage.S3Object(s3_uri=file_path).md5sum()
     elif file_path.startswith("gs:"):
         return igvf_utils.gc_storage.GSFile(name=file_path).md5sum
-    m = hashlib.md5()
     # Assume local file
     if not os.path.exists(file_path):
         msg = "File path '{}' does not exist.".format(file_path)
         logging.error(msg)
         raise FileNotFoundError(msg)
-    with open(file_path, 'rb') as fh:
-        while True:
-            chunk = fh.read(2**16)
-            if not chunk:
-                break
-            m.update(chunk)
-    return m.hexdigest()
+    cache = get_checksum_cache()
+    key = ChecksumCache.file_key(file_path)
+    if cache is not None and use_cache:
+        md5sum = cache.get(key)
+        if md5sum:
+            return md5sum
+    md5sum = md5sum_local_file(file_path)
+    # Don't cache the md5sum if the file was modified while hashing it.
+    if cache is not None and ChecksumCache.file_key(file_path) == key:
+        cache.set(key, md5sum)
+    return md5sum
+
+
+def calculate_md5sums(file_paths, workers=4):
+    """
+    Calculates the md5sums of many files concurrently with a pool of threads; ``hashlib`` releases
+    the GIL while hashing, so the files are effectively hashed in parallel.
+
+    Args:
+        file_paths: iterable of `str`. Paths to local files or S3 or GCS URIs; see
+            ``calculate_md5sum()``. Duplicates are only hashed once.
+        workers: `int`. The maximum number of files read at the same time.
+
+    Returns:
+        `dict`: Each key is a path in `file_paths` and each value its md5sum.
+
+    Raises:
+        `FileNotFoundError`: One of the given file paths does not exist.
+    """
+    file_paths = list(dict.fromkeys(file_paths))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(file_paths, executor.map(calculate_md5sum, file_paths)))
 
 
 def calculate_file_size(file_path):